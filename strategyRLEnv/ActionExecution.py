@@ -0,0 +1,75 @@
+import numpy as np
+
+from strategyRLEnv.map.map_settings import LandType
+
+# The execute functions apply a batch of validated actions of one type, at most one
+# per tile, and return the reward of every action. Index i is the action of agent
+# agent_ids[i] on tile tile_ids[i].
+
+
+def charge(env, agent_ids: np.ndarray, amounts) -> None:
+    """
+    Take the summed amounts of all actions from the money of their agents.
+    """
+    totals = np.zeros(len(env.agents), dtype=np.result_type(amounts))
+    np.add.at(totals, agent_ids, amounts)
+    for agent_id in np.unique(agent_ids).tolist():
+        env.agents[agent_id].money -= totals[agent_id].item()
+
+
+def execute_each(env, agent_ids: np.ndarray, tile_ids: np.ndarray, action_class):
+    """
+    Execute the actions one by one, for actions creating or removing game objects
+    with rewards depending on them.
+    """
+    rewards = np.empty(len(tile_ids), dtype=np.float64)
+    for i, (agent_id, tile_id) in enumerate(zip(agent_ids.tolist(), tile_ids.tolist())):
+        action = action_class(env.agents[agent_id], env.map.tile_position(tile_id))
+        rewards[i] = action.execute(env)
+    return rewards
+
+
+def execute_claim(env, agent_ids: np.ndarray, tile_ids: np.ndarray):
+    agents = [env.agents[agent_id] for agent_id in agent_ids.tolist()]
+    env.map.claim_tiles(agents, tile_ids)
+    for agent, tile_id in zip(agents, tile_ids.tolist()):
+        position = env.map.tile_position(tile_id)
+        agent.add_claimed_tile(position)
+        agent.update_local_visibility(position)
+
+    settings = env.compiled_settings
+    claim_id = settings.action_ids["claim"]
+    charge(env, agent_ids, settings.cost[claim_id])
+    return np.full(len(tile_ids), settings.reward[claim_id])
+
+
+def execute_build(
+    env,
+    agent_ids: np.ndarray,
+    tile_ids: np.ndarray,
+    action_class,
+    mountain_cost_factor=1,
+):
+    """
+    Build the buildings of action_class, see BuildAction.execute.
+
+    :param mountain_cost_factor: cost factor of buildings on mountains
+    """
+    if len(tile_ids) == 0:
+        return np.empty(0, dtype=np.float64)
+
+    for agent_id, tile_id in zip(agent_ids.tolist(), tile_ids.tolist()):
+        position = env.map.tile_position(tile_id)
+        action = action_class(env.agents[agent_id], position)
+        action.perform_build(env)
+        env.map.get_tile(position).update(env)
+        env.map.trigger_surrounding_tile_update(position)
+
+    settings = env.compiled_settings
+    action_id = settings.action_ids[action.building_type.value]
+    costs = np.full(len(tile_ids), settings.cost[action_id])
+    if mountain_cost_factor != 1:
+        mountain = env.map.planes["land_type"][tile_ids] == LandType.MOUNTAIN.value
+        costs[mountain] *= mountain_cost_factor
+    charge(env, agent_ids, costs)
+    return np.full(len(tile_ids), settings.reward[action_id])
@@ -1,137 +1,233 @@
-import random
 from typing import Any, List
 
 import numpy as np
 
-from strategyRLEnv.actions.BuildCityAction import BuildCityAction
-from strategyRLEnv.actions.BuildFarmAction import BuildFarmAction
-from strategyRLEnv.actions.BuildMineAction import BuildMineAction
-from strategyRLEnv.actions.BuildRoadAction import (BuildBridgeAction,
-                                                   BuildRoadAction)
-from strategyRLEnv.actions.ClaimAction import ClaimAction
-from strategyRLEnv.actions.DestroyAction import DestroyAction
-from strategyRLEnv.actions.PlaceUnitAction import PlaceUnitAction
-from strategyRLEnv.actions.WithdrawUnitAction import WithdrawUnitAction
+from strategyRLEnv.ActionMasks import MaskState
+from strategyRLEnv.ActionRegistry import action_handlers
 from strategyRLEnv.Agent import Agent, AgentState
 from strategyRLEnv.map.MapPosition import MapPosition
 
 
 def create_action(agent: Agent, action_type, position: MapPosition):
-    if action_type == "claim":
-        return ClaimAction(agent, position)
-    elif action_type == "build_city":
-        return BuildCityAction(agent, position)
-    elif action_type == "build_road":
-        return BuildRoadAction(agent, position)
-    elif action_type == "build_bridge":
-        return BuildBridgeAction(agent, position)
-    elif action_type == "build_farm":
-        return BuildFarmAction(agent, position)
-    elif action_type == "build_mine":
-        return BuildMineAction(agent, position)
-    elif action_type == "destroy":
-        return DestroyAction(agent, position)
-    elif action_type == "place_unit":
-        return PlaceUnitAction(agent, position)
-    elif action_type == "withdraw_unit":
-        return WithdrawUnitAction(agent, position)
-    # elif action_type == "move":
-    #     return MoveAction(agent, position)
-    else:
-        # Handle unknown action type
+    """
+    Action of the registered type, None for unknown types and waiting.
+    """
+    handler = action_handlers.get(action_type)
+    if handler is None:
         return None
+    return handler.create(agent, position)
+
+
+def random_priority(action_manager, agent_ids: np.ndarray) -> np.ndarray:
+    return np.zeros(len(agent_ids), dtype=np.int64)
+
+
+def lowest_money_priority(action_manager, agent_ids: np.ndarray) -> np.ndarray:
+    money = [agent.money for agent in action_manager.env.agents]
+    return np.array(money, dtype=np.float64)[agent_ids]
+
+
+def round_robin_priority(action_manager, agent_ids: np.ndarray) -> np.ndarray:
+    # the agent going first moves on by one every turn
+    return (agent_ids - action_manager.turn) % len(action_manager.env.agents)
+
+
+# conflict resolution setting -> function returning the priority of the agent of every
+# action, the lowest priority on a tile wins, ties are broken randomly
+conflict_policies = {
+    "random": random_priority,
+    "lowest_money_first": lowest_money_priority,
+    "round_robin": round_robin_priority,
+}
 
 
 class ActionManager:
     """
-    Manages the application of movement actions within the environment,
-    detecting conflicts when multiple agents attempt to move to the same tile
-    and randomly resolving those conflicts.
+    Applies the actions of all agents within the environment.
+
+    The actions of a step are grouped by type and validated per type with array
+    operations against the state before the step. When several valid actions target
+    the same tile the conflict policy picks the winner, the winners of every type are
+    then executed together.
     """
 
     def __init__(self, env):
         self.env = env
 
-        self.actions_definition = self.env.env_settings.get("actions")
-        self.invalid_action_penalty = self.actions_definition.get(
-            "invalid_action_penalty"
-        )
-
-        # Define a structured array with the fields 'action' and 'agent_id'.
-        self.conflict_map = {}
+        self.invalid_action_penalty = self.env.compiled_settings.invalid_action_penalty
+
+        policy = self.env.env_settings.get("conflict_resolution", "random")
+        if policy not in conflict_policies:
+            raise ValueError(
+                "conflict_resolution should be one of {}".format(
+                    list(conflict_policies)
+                )
+            )
+        self.conflict_policy = conflict_policies[policy]
+        # turns applied since the last reset, see round_robin_priority
+        self.turn = 0
+
+        # handler of every enabled action id, see register_action
+        settings = self.env.compiled_settings
+        self.handlers = []
+        for name in settings.action_names[: settings.num_enabled_actions]:
+            if name not in action_handlers:
+                raise ValueError(f"Unknown action type {name} enabled in the actions")
+            self.handlers.append(action_handlers[name])
+
+    def reset(self):
+        self.turn = 0
 
     def apply_actions(self, actions: Any):
         """
-        Processes the movement actions of all agents, resolves conflicts,
-        and returns the outcomes for each agent.
+        Validates and executes the actions of all agents, resolving conflicts on tiles.
 
         Args:
-            actions (List[Dict[str, Any]]): List of action dictionaries from each agent.
-            agents (List[Agent]): List of agent instances.
+            actions: int array (agents, actions per agent, 3) or nested lists of
+                [action_id, x, y] per agent, lists may differ in length and hold None.
 
         Returns:
-            Dict[int, Dict[str, Any]]: A dictionary mapping agent IDs to their action outcomes.
+            rewards: reward of every agent, the reward of its last executed action or
+                the invalid action penalty if none was executed.
+            dones: always False, agents die while the environment state is updated.
         """
-
         agents = self.env.agents
         rewards = np.full(len(agents), self.invalid_action_penalty, dtype=float)
         dones = np.zeros(len(agents), dtype=bool)
 
-        for agent, agent_actions in zip(agents, actions):
-            proposed_turn_actions = []
-            if agent.state == AgentState.DONE:
-                continue
-
-            for action in agent_actions:
-                if action is None:
-                    continue
+        agent_ids, action_ids, xs, ys = self.flatten_actions(actions)
 
-                action_type = self.env.action_mapping.get(action[0])
-                if action_type == "wait":
-                    continue
-
-                if action_type is None:
-                    # Handle unknown action type
-                    raise ValueError(f"Unknown action type: {action[0]}")
+        active = np.array([agent.state != AgentState.DONE for agent in agents])
+        keep = active[agent_ids]
+        agent_ids, action_ids, xs, ys = (
+            agent_ids[keep],
+            action_ids[keep],
+            xs[keep],
+            ys[keep],
+        )
 
-                x = action[1]
-                y = action[2]
-                position = MapPosition(x, y)
+        unknown = (action_ids < 0) | (action_ids >= len(self.handlers))
+        if unknown.any():
+            raise ValueError(f"Unknown action type: {action_ids[unknown][0]}")
+
+        game_map = self.env.map
+        on_map = (0 <= xs) & (xs < game_map.width) & (0 <= ys) & (ys < game_map.height)
+        tile_ids = xs * game_map.height + ys
+
+        # validate every action type against the state before the step
+        valid = np.zeros(len(action_ids), dtype=bool)
+        for action_id in np.unique(action_ids[on_map]).tolist():
+            group = np.flatnonzero((action_ids == action_id) & on_map)
+            valid[group] = self.handlers[action_id].validate_batch(
+                self.env, agent_ids[group], tile_ids[group]
+            )
+        proposed = np.flatnonzero(valid)
+
+        winners = proposed[
+            self.resolve_conflicts(tile_ids[proposed], agent_ids[proposed])
+        ]
+
+        action_rewards = np.zeros(len(action_ids), dtype=float)
+        for action_id in np.unique(action_ids[winners]).tolist():
+            group = winners[action_ids[winners] == action_id]
+            action_rewards[group] = self.handlers[action_id].execute_batch(
+                self.env, agent_ids[group], tile_ids[group]
+            )
+
+        # every agent gets the reward of its last executed action
+        last_first = winners[::-1]
+        _, last = np.unique(agent_ids[last_first], return_index=True)
+        rewards[agent_ids[last_first[last]]] = action_rewards[last_first[last]]
+
+        self.turn += 1
+        return rewards, dones
 
-                action = create_action(agent, action_type, position)
+    def flatten_actions(self, actions: Any):
+        """
+        Agent ids, action ids, x and y of all submitted actions in submission order.
+        Actions of agent indices beyond the agents of the environment are dropped.
+        """
+        num_agents = len(self.env.agents)
+        if isinstance(actions, np.ndarray):
+            actions = np.asarray(actions[:num_agents], dtype=np.int64)
+            if actions.ndim != 3 or actions.shape[2] != 3:
+                raise ValueError(
+                    "actions should be an int array (agents, actions, 3), got shape {}".format(
+                        actions.shape
+                    )
+                )
+            agent_ids = np.repeat(np.arange(len(actions)), actions.shape[1])
+            flat = actions.reshape(-1, 3)
+        else:
+            rows = [
+                (agent_id, action[0], action[1], action[2])
+                for agent_id, agent_actions in zip(range(num_agents), actions)
+                for action in agent_actions
+                if action is not None
+            ]
+            flat = np.array(rows, dtype=np.int64).reshape(-1, 4)
+            agent_ids = flat[:, 0]
+            flat = flat[:, 1:]
+        return agent_ids, flat[:, 0], flat[:, 1], flat[:, 2]
+
+    def resolve_conflicts(
+        self, tile_ids: np.ndarray, agent_ids: np.ndarray
+    ) -> np.ndarray:
+        """
+        Pick one winner among the actions on every tile.
 
-                if action.validate(self.env):
-                    proposed_turn_actions.append(action)
-                    position_key = action.position
-                    self.conflict_map.setdefault(position_key, []).append(action)
+        On contested tiles the action of the agent with the lowest priority of the
+        conflict policy wins. Ties are broken with random keys drawn from the
+        environment's np_random, so seeded environments resolve conflicts
+        reproducibly.
 
-        determined_actions = self.resolve_conflict()
+        Returns:
+            indices into tile_ids of the winners, in ascending order.
+        """
+        order = np.argsort(tile_ids, kind="stable")
+        sorted_tiles = tile_ids[order]
+        first = np.ones(len(order), dtype=bool)
+        np.not_equal(sorted_tiles[1:], sorted_tiles[:-1], out=first[1:])
+        if first.all():
+            return np.arange(len(tile_ids))
+
+        priority = self.conflict_policy(self, agent_ids)
+        keys = self.env.np_random.random(len(tile_ids))
+        order = np.lexsort((keys, priority, tile_ids))
+        return np.sort(order[first])
+
+    def action_masks(self, out=None):
+        """
+        Validity of every action type on every tile for every agent.
 
-        # Execute actions
-        for action in determined_actions:
-            agent_id = action.agent.id
-            reward = action.execute(self.env)
-            rewards[agent_id] = reward
-            dones[agent_id] = False
+        Computed with array operations over the map, the masks agree with the validate
+        methods of the actions. Actions of done agents are never applied, their masks
+        are all False.
 
-        # Clear the conflict map for the next turn
-        self.conflict_map = {}
+        Args:
+            out: optional bool array (agents, action types, width, height) to fill.
 
-        return rewards, dones
+        Returns:
+            bool array (agents, action types, width, height), action types in the order
+            of env.action_mapping.
+        """
+        game_map = self.env.map
+        shape = (
+            len(self.env.agents),
+            len(self.env.action_mapping),
+            game_map.width,
+            game_map.height,
+        )
+        if out is None:
+            out = np.empty(shape, dtype=bool)
 
-    def resolve_conflict(self):
-        winner_actions = []
-        for position, actions_at_position in self.conflict_map.items():
-            if len(actions_at_position) == 1:
-                winner_actions.append(actions_at_position[0])
+        state = MaskState(self.env)
+        for agent, agent_masks in zip(self.env.agents, out):
+            if agent.state == AgentState.DONE:
+                agent_masks.fill(False)
                 continue
 
-            # Implement your conflict resolution strategy here.
-            # What when multiple actions of same agent on same position?
-            # what how do the different actions interact with each other? of different agents
-
-            # For fairness, we can randomly select a winner.
-            winner = random.choice(actions_at_position)
-            winner_actions.append(winner)
-
-        return winner_actions
+            state.for_agent(agent)
+            for handler, action_mask in zip(self.handlers, agent_masks):
+                handler.fill_mask(state, action_mask)
+        return out
@@ -0,0 +1,352 @@
+from functools import cached_property
+
+import numpy as np
+
+from strategyRLEnv.map.Map import check_valid_agent_id, neighbour_offsets
+from strategyRLEnv.map.map_settings import (ALLOWED_BUILDING_PLACEMENTS,
+                                            BUILDING_IDS, NO_BUILDING,
+                                            OWNER_DEFAULT_TILE, BuildingType,
+                                            LandType, conquer_threshold,
+                                            max_agent_id)
+
+
+class MaskState:
+    """
+    Arrays shared by the masks of all agents and action types of one step.
+
+    The agent independent arrays are computed once, on first use. The agent
+    dependent arrays are set by for_agent before the masks of an agent are computed.
+    """
+
+    def __init__(self, env):
+        game_map = env.map
+        self.env = env
+        self.map = game_map
+        self.settings = env.compiled_settings
+
+        self.owner = game_map.ownership_map
+        self.unclaimed = self.owner == OWNER_DEFAULT_TILE
+        self.building = game_map.building_map
+        self.has_building = self.building != NO_BUILDING
+        self.no_building = ~self.has_building
+        self.unit_owner = game_map.unit_owner_map
+        self.no_unit = self.unit_owner == OWNER_DEFAULT_TILE
+        self.mountain = game_map.landtype_map == LandType.MOUNTAIN.value
+        self._land_allows = {}
+
+        self.agent_id = None
+        self.money = None
+        self.visible = np.empty(self.owner.shape, dtype=bool)
+        self.own = np.empty(self.owner.shape, dtype=bool)
+        self.own_unit = np.empty(self.owner.shape, dtype=bool)
+        self.no_enemy_unit = np.empty(self.owner.shape, dtype=bool)
+
+    def for_agent(self, agent):
+        self.agent_id = agent.id
+        self.money = agent.money
+        if check_valid_agent_id(agent.id):
+            bits = np.right_shift(self.map.visibility_map, agent.id)
+            np.bitwise_and(bits, 1, out=bits)
+            np.not_equal(bits, 0, out=self.visible)
+        else:
+            self.visible.fill(False)
+        np.equal(self.owner, agent.id, out=self.own)
+        np.equal(self.unit_owner, agent.id, out=self.own_unit)
+        np.logical_or(self.no_unit, self.own_unit, out=self.no_enemy_unit)
+
+    def can_pay(self, action_name, factor=1):
+        cost = self.settings.cost[self.settings.action_ids[action_name]]
+        return self.money >= cost * factor
+
+    def land_allows(self, placement):
+        allows = self._land_allows.get(placement)
+        if allows is None:
+            allowed = [
+                land_type.value for land_type in ALLOWED_BUILDING_PLACEMENTS[placement]
+            ]
+            allows = np.isin(self.map.landtype_map, allowed)
+            self._land_allows[placement] = allows
+        return allows
+
+    def own_neighbours(self):
+        return count_neighbours(self.own)
+
+    def own_unit_neighbours(self):
+        return count_neighbours(self.own_unit)
+
+    @cached_property
+    def city_sites(self):
+        radius = self.settings.city_clearance_radius
+        return self.map.city_site_mask(radius)
+
+    @cached_property
+    def next_to_road_or_bridge(self):
+        counts = self.map.adjacency_counts(1, diagonal=False)
+        shape = self.owner.shape
+        connected = counts[BUILDING_IDS[BuildingType.ROAD]].reshape(shape) > 0
+        connected |= counts[BUILDING_IDS[BuildingType.BRIDGE]].reshape(shape) > 0
+        return connected
+
+    @cached_property
+    def first_city_owner(self):
+        """
+        Owner of the first city next to every tile, in the order of
+        tile_is_next_to_building_type, OWNER_DEFAULT_TILE without a city.
+        """
+        city_id = BUILDING_IDS[BuildingType.CITY]
+        first_owner = np.full(
+            self.owner.shape, OWNER_DEFAULT_TILE, dtype=self.owner.dtype
+        )
+        # later neighbours first, earlier ones overwrite them
+        for dx, dy in reversed(list(zip(*neighbour_offsets(1, False)))):
+            dx, dy = int(dx), int(dy)
+            city = shifted(self.building, dx, dy, NO_BUILDING) == city_id
+            owner = shifted(self.owner, dx, dy, OWNER_DEFAULT_TILE)
+            np.copyto(first_owner, owner, where=city)
+        return first_owner
+
+
+class TileBatchState:
+    """
+    The arrays of MaskState gathered for a batch of single actions, index i holds the
+    values of the action of agent agent_ids[i] on tile tile_ids[i].
+
+    The mask functions fill the validity of every action of the batch with the same
+    conditions they use for the whole map.
+    """
+
+    def __init__(self, env, agent_ids: np.ndarray, tile_ids: np.ndarray):
+        game_map = env.map
+        self.env = env
+        self.map = game_map
+        self.settings = env.compiled_settings
+        self.tile_ids = tile_ids
+
+        planes = game_map.planes
+        self.owner = planes["tile_ownership"][tile_ids]
+        self.unclaimed = self.owner == OWNER_DEFAULT_TILE
+        self.building = planes["buildings"][tile_ids]
+        self.has_building = self.building != NO_BUILDING
+        self.no_building = ~self.has_building
+        self.unit_owner = game_map.unit_owner_map.reshape(-1)[tile_ids]
+        self.no_unit = self.unit_owner == OWNER_DEFAULT_TILE
+        self.mountain = planes["land_type"][tile_ids] == LandType.MOUNTAIN.value
+        self._land_allows = {}
+
+        self.agent_id = agent_ids
+        self.money = np.array([agent.money for agent in env.agents], dtype=np.float64)[
+            agent_ids
+        ]
+        valid_agent = (0 <= agent_ids) & (agent_ids < max_agent_id)
+        bits = np.right_shift(
+            planes["visibility"][tile_ids], np.where(valid_agent, agent_ids, 0)
+        )
+        self.visible = ((bits & 1) != 0) & valid_agent
+        self.own = self.owner == agent_ids
+        self.own_unit = self.unit_owner == agent_ids
+        self.no_enemy_unit = self.no_unit | self.own_unit
+
+    def can_pay(self, action_name, factor=1):
+        cost = self.settings.cost[self.settings.action_ids[action_name]]
+        return self.money >= cost * factor
+
+    def land_allows(self, placement):
+        allows = self._land_allows.get(placement)
+        if allows is None:
+            allowed = [
+                land_type.value for land_type in ALLOWED_BUILDING_PLACEMENTS[placement]
+            ]
+            allows = np.isin(self.map.planes["land_type"][self.tile_ids], allowed)
+            self._land_allows[placement] = allows
+        return allows
+
+    def own_neighbours(self):
+        return self._count_neighbours(self.map.planes["tile_ownership"])
+
+    def own_unit_neighbours(self):
+        return self._count_neighbours(self.map.unit_owner_map.reshape(-1))
+
+    def _count_neighbours(self, owner_plane):
+        """
+        Number of the direct neighbours of every tile the plane assigns to the agent.
+        """
+        neighbour_ids = self.neighbour_ids
+        own = owner_plane[neighbour_ids] == self.agent_id[:, None]
+        own &= neighbour_ids >= 0
+        return np.count_nonzero(own, axis=1)
+
+    @cached_property
+    def neighbour_ids(self):
+        return self.map.neighbour_tile_ids(self.tile_ids, 1, diagonal=True)
+
+    @cached_property
+    def city_sites(self):
+        radius = self.settings.city_clearance_radius
+        return self.map.city_counts(radius).reshape(-1)[self.tile_ids] == 0
+
+    @cached_property
+    def next_to_road_or_bridge(self):
+        counts = self.map.adjacency_counts(1, diagonal=False)
+        road = counts[BUILDING_IDS[BuildingType.ROAD], self.tile_ids] > 0
+        bridge = counts[BUILDING_IDS[BuildingType.BRIDGE], self.tile_ids] > 0
+        return road | bridge
+
+    @cached_property
+    def first_city_owner(self):
+        neighbour_ids = self.map.neighbour_tile_ids(self.tile_ids, 1, diagonal=False)
+        city = (
+            self.map.planes["buildings"][neighbour_ids]
+            == BUILDING_IDS[BuildingType.CITY]
+        )
+        city &= neighbour_ids >= 0
+        first = neighbour_ids[np.arange(len(self.tile_ids)), np.argmax(city, axis=1)]
+        return np.where(
+            city.any(axis=1),
+            self.map.planes["tile_ownership"][first],
+            OWNER_DEFAULT_TILE,
+        )
+
+
+def shifted(array, dx, dy, fill):
+    """
+    Array holding array[x + dx, y + dy] at x, y and fill off the map.
+    """
+    width, height = array.shape
+    out = np.full_like(array, fill)
+    out[max(-dx, 0) : width - max(dx, 0), max(-dy, 0) : height - max(dy, 0)] = array[
+        max(dx, 0) : width + min(dx, 0), max(dy, 0) : height + min(dy, 0)
+    ]
+    return out
+
+
+def count_neighbours(mask, diagonal=True):
+    """
+    Number of the direct neighbours of every tile for which mask is True.
+    """
+    width, height = mask.shape
+    padded = np.pad(mask, 1)
+    counts = np.zeros(mask.shape, dtype=np.int8)
+    for dx, dy in zip(*neighbour_offsets(1, diagonal)):
+        counts += padded[1 + dx : 1 + dx + width, 1 + dy : 1 + dy + height]
+    return counts
+
+
+# The mask functions fill out with the validity of one action type, for all tiles of
+# one agent with a MaskState or for a batch of actions with a TileBatchState.
+
+
+def build_mask(state, building_type, out):
+    """
+    Conditions of BuildAction.validate, affordable on every tile.
+    """
+    np.logical_and(state.visible, state.land_allows(building_type), out=out)
+    out &= state.no_building
+    out &= state.no_enemy_unit
+
+
+def claim_mask(state, out):
+    can_pay = state.can_pay("claim")
+    if not np.any(can_pay):
+        out.fill(False)
+        return
+    np.logical_and(state.unclaimed, state.visible, out=out)
+    out &= state.no_enemy_unit
+    out &= state.own_neighbours() > 0
+    out &= can_pay
+
+
+def build_city_mask(state, out):
+    can_pay = state.can_pay("build_city")
+    if not np.any(can_pay):
+        out.fill(False)
+        return
+    build_mask(state, BuildingType.CITY, out)
+    # tiles with a building are excluded already, the city counts never include the tile itself
+    out &= state.city_sites
+    out &= state.own | state.unclaimed
+    out &= can_pay
+
+
+def road_bridge_mask(state, building_type, out):
+    """
+    Next to a road or bridge, or the first city in the neighbourhood is the agent's own.
+    """
+    build_mask(state, building_type, out)
+    out &= state.next_to_road_or_bridge | (state.first_city_owner == state.agent_id)
+
+
+def build_road_mask(state, out):
+    # roads on mountains cost twice as much, see BuildRoadAction.get_cost
+    can_pay = state.can_pay("build_road")
+    can_pay_mountain = state.can_pay("build_road", 2)
+    if not np.any(can_pay | can_pay_mountain):
+        out.fill(False)
+        return
+    road_bridge_mask(state, BuildingType.ROAD, out)
+    out &= np.where(state.mountain, can_pay_mountain, can_pay)
+
+
+def build_bridge_mask(state, out):
+    can_pay = state.can_pay("build_bridge")
+    if not np.any(can_pay):
+        out.fill(False)
+        return
+    road_bridge_mask(state, BuildingType.BRIDGE, out)
+    out &= can_pay
+
+
+def build_farm_mask(state, out):
+    can_pay = state.can_pay("build_farm")
+    if not np.any(can_pay):
+        out.fill(False)
+        return
+    build_mask(state, BuildingType.FARM, out)
+    out &= state.own
+    out &= can_pay
+
+
+def build_mine_mask(state, out):
+    can_pay = state.can_pay("build_mine")
+    if not np.any(can_pay):
+        out.fill(False)
+        return
+    build_mask(state, BuildingType.MINE, out)
+    out &= state.own
+    out &= can_pay
+
+
+def destroy_mask(state, out):
+    # destroying is paid like claiming, see DestroyAction
+    can_pay = state.can_pay("claim")
+    if not np.any(can_pay):
+        out.fill(False)
+        return
+    np.logical_and(state.has_building, state.visible, out=out)
+    out &= state.own | state.unclaimed
+    out &= can_pay
+
+
+def place_unit_mask(state, out):
+    can_pay = state.can_pay("place_unit")
+    if not np.any(can_pay):
+        out.fill(False)
+        return
+    np.logical_and(state.visible, state.land_allows("UNIT"), out=out)
+    out &= state.no_enemy_unit
+    # enemy tiles need enough own units around them, see check_if_claiming_enemy_tile
+    enemy_tile = ~(state.own | state.unclaimed)
+    out &= ~enemy_tile | (state.own_unit_neighbours() >= conquer_threshold)
+    out &= can_pay
+
+
+def withdraw_unit_mask(state, out):
+    can_pay = state.can_pay("withdraw_unit")
+    if not np.any(can_pay):
+        out.fill(False)
+        return
+    np.logical_and(state.visible, state.own_unit, out=out)
+    out &= can_pay
+
+
+def wait_mask(state, out):
+    out.fill(True)
@@ -0,0 +1,173 @@
+from functools import partial
+
+import numpy as np
+
+from strategyRLEnv.ActionExecution import (execute_build, execute_claim,
+                                           execute_each)
+from strategyRLEnv.ActionMasks import (TileBatchState, build_bridge_mask,
+                                       build_city_mask, build_farm_mask,
+                                       build_mine_mask, build_road_mask,
+                                       claim_mask, destroy_mask,
+                                       place_unit_mask, wait_mask,
+                                       withdraw_unit_mask)
+from strategyRLEnv.actions.BuildCityAction import BuildCityAction
+from strategyRLEnv.actions.BuildFarmAction import BuildFarmAction
+from strategyRLEnv.actions.BuildMineAction import BuildMineAction
+from strategyRLEnv.actions.BuildRoadAction import (BuildBridgeAction,
+                                                   BuildRoadAction)
+from strategyRLEnv.actions.ClaimAction import ClaimAction
+from strategyRLEnv.actions.DestroyAction import DestroyAction
+from strategyRLEnv.actions.PlaceUnitAction import PlaceUnitAction
+from strategyRLEnv.actions.WithdrawUnitAction import WithdrawUnitAction
+from strategyRLEnv.map.MapPosition import MapPosition
+
+
+class ActionHandler:
+    """
+    Validates and executes batches of actions of one type, index i of a batch is
+    the action of agent agent_ids[i] on tile tile_ids[i].
+
+    Without a mask function the actions are validated one by one with the validate
+    method of action_class, without an execute function they are executed one by one.
+    Action types defined outside of the package can use these fallbacks or override
+    validate_batch and execute_batch, see register_action.
+
+    Attributes:
+        action_class: Action subclass created from (agent, position).
+        mask_function: function filling the validity of the actions, see ActionMasks.
+        execute_function: function executing a batch of validated actions on distinct
+            tiles and returning their rewards, see ActionExecution.
+    """
+
+    def __init__(self, action_class, mask_function=None, execute_function=None):
+        self.action_class = action_class
+        self.mask_function = mask_function
+        self.execute_function = execute_function
+
+    def create(self, agent, position: MapPosition):
+        return self.action_class(agent, position)
+
+    def validate_batch(
+        self, env, agent_ids: np.ndarray, tile_ids: np.ndarray
+    ) -> np.ndarray:
+        """
+        Validity of the actions against the current state of the environment.
+        """
+        valid = np.empty(len(tile_ids), dtype=bool)
+        if self.mask_function is not None:
+            self.mask_function(TileBatchState(env, agent_ids, tile_ids), valid)
+            return valid
+
+        for i, (agent_id, tile_id) in enumerate(
+            zip(agent_ids.tolist(), tile_ids.tolist())
+        ):
+            action = self.create(env.agents[agent_id], env.map.tile_position(tile_id))
+            valid[i] = action.validate(env)
+        return valid
+
+    def execute_batch(
+        self, env, agent_ids: np.ndarray, tile_ids: np.ndarray
+    ) -> np.ndarray:
+        """
+        Execute validated actions on distinct tiles, returns their rewards.
+        """
+        if self.execute_function is not None:
+            return self.execute_function(env, agent_ids, tile_ids)
+        return execute_each(env, agent_ids, tile_ids, self.action_class)
+
+    def fill_mask(self, state, out):
+        """
+        Fill out with the validity of the action on every tile for the agent of the
+        MaskState.
+        """
+        if self.mask_function is not None:
+            self.mask_function(state, out)
+            return
+
+        env = state.env
+        tile_ids = np.arange(env.map.tiles)
+        agent_ids = np.full(env.map.tiles, state.agent_id)
+        out[...] = self.validate_batch(env, agent_ids, tile_ids).reshape(out.shape)
+
+
+class WaitHandler(ActionHandler):
+    """
+    Waiting is always valid and executes nothing, agents that only wait get the
+    invalid action penalty.
+    """
+
+    def __init__(self):
+        super().__init__(None, mask_function=wait_mask)
+
+    def create(self, agent, position: MapPosition):
+        return None
+
+    def validate_batch(
+        self, env, agent_ids: np.ndarray, tile_ids: np.ndarray
+    ) -> np.ndarray:
+        # nothing to execute
+        return np.zeros(len(tile_ids), dtype=bool)
+
+
+# action name -> handler of the action type, see register_action
+action_handlers = {}
+
+
+def register_action(name: str, handler: ActionHandler) -> None:
+    """
+    Register the handler of an action type, replacing a handler of the same name.
+
+    Environments resolve the handlers of their action mapping when they are created,
+    register action types before creating the environment. The action is enabled
+    like the built in ones, by an entry with a cost in the actions of the env_settings.
+    """
+    action_handlers[name] = handler
+
+
+register_action("wait", WaitHandler())
+register_action(
+    "claim", ActionHandler(ClaimAction, claim_mask, execute_function=execute_claim)
+)
+register_action(
+    "build_city",
+    ActionHandler(
+        BuildCityAction,
+        build_city_mask,
+        partial(execute_build, action_class=BuildCityAction),
+    ),
+)
+register_action(
+    "build_road",
+    ActionHandler(
+        BuildRoadAction,
+        build_road_mask,
+        partial(execute_build, action_class=BuildRoadAction, mountain_cost_factor=2),
+    ),
+)
+register_action(
+    "build_bridge",
+    ActionHandler(
+        BuildBridgeAction,
+        build_bridge_mask,
+        partial(execute_build, action_class=BuildBridgeAction),
+    ),
+)
+register_action(
+    "build_farm",
+    ActionHandler(
+        BuildFarmAction,
+        build_farm_mask,
+        partial(execute_build, action_class=BuildFarmAction),
+    ),
+)
+register_action(
+    "build_mine",
+    ActionHandler(
+        BuildMineAction,
+        build_mine_mask,
+        partial(execute_build, action_class=BuildMineAction),
+    ),
+)
+register_action("destroy", ActionHandler(DestroyAction, destroy_mask))
+register_action("place_unit", ActionHandler(PlaceUnitAction, place_unit_mask))
+register_action("withdraw_unit", ActionHandler(WithdrawUnitAction, withdraw_unit_mask))
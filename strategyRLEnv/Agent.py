@@ -41,6 +41,33 @@ def calculate_new_position(
     return MapPosition(x, y)
 
 
+def agent_money(agent) -> float:
+    return agent.money
+
+
+def agent_map_ownership(agent) -> float:
+    return round(
+        len(agent._claimed_tiles) / (agent.env.map.width * agent.env.map.height), 4
+    )
+
+
+def last_money_pl(agent) -> float:
+    return agent.last_money_pl
+
+
+def total_unit_strength(agent) -> float:
+    return sum([unit.strength for unit in agent.units])
+
+
+# agent feature name -> function returning the feature value of an agent
+agent_feature_extractors = {
+    "agent_money": agent_money,
+    "agent_map_ownership": agent_map_ownership,
+    "last_money_pl": last_money_pl,
+    "total_unit_strength": total_unit_strength,
+}
+
+
 class AgentState(Enum):
     ACTIVE = 0
     DONE = 1
@@ -91,7 +118,7 @@ class Agent:
         self.cities = []
 
         while True:
-            position = self.env.map.get_random_position_on_map()
+            position = self.env.map.get_random_position_on_map(self.env.np_random)
             tile = self.env.map.get_tile(position)
             if tile.building is None:
                 break
@@ -114,7 +141,7 @@ class Agent:
             self.money = initial_money
         elif distribution_mode == "gauss":
             # gauss distributed around initial
-            self.money = self.env.np_random.gauss(initial_money, 100)
+            self.money = self.env.np_random.normal(initial_money, 100)
         else:
             # randomly distributed money
             self.money = self.env.np_random.integers(0, 1000)
@@ -162,36 +189,44 @@ class Agent:
         if self.money < 0:
             self.kill()
 
-    def draw(self, square_size, zoom_level, pan_x, pan_y):
-        # draw the units
-        for unit in self.units:
-            unit.draw(self.env.screen, square_size, self.color)
-
-    def get_observation(self):
-        agent_observation = np.zeros((len(self.env.agent_features)), dtype=np.float32)
-
-        features = self.env.agent_features
-
-        i = 0
-        for feature in features:
-            name = feature["name"]
-
-            if name == "agent_money":
-                agent_observation[i] = self.money
-            elif name == "agent_map_ownership":
-                agent_observation[i] = round(
-                    len(self._claimed_tiles)
-                    / (self.env.map.width * self.env.map.height),
-                    4,
-                )
-            elif name == "last_money_pl":
-                agent_observation[i] = self.last_money_pl
-            elif name == "total_unit_strength":
-                agent_observation[i] = sum([unit.strength for unit in self.units])
-            i += 1
+    def get_observation(self, out=None):
+        """
+        Observation of the agent features, written into out if given.
+        """
+        if out is None:
+            agent_observation = np.zeros(
+                (len(self.env.agent_features)), dtype=np.float32
+            )
+        else:
+            agent_observation = out
+
+        extractors = self.env.compiled_settings.agent_feature_extractors
+        for i, extractor in enumerate(extractors):
+            agent_observation[i] = extractor(self)
 
         return agent_observation
 
+    def get_observation_center(self) -> Tuple[int, int]:
+        """
+        Center of the egocentric observation window, the capital if the agent has
+        a city, else the center of its claimed tiles.
+        """
+        if self.cities:
+            x, y = self.cities[0].position.x, self.cities[0].position.y
+        elif self._claimed_tiles:
+            x = round(
+                sum(pos.x for pos in self._claimed_tiles) / len(self._claimed_tiles)
+            )
+            y = round(
+                sum(pos.y for pos in self._claimed_tiles) / len(self._claimed_tiles)
+            )
+        else:
+            x, y = self.position.x, self.position.y
+
+        x = min(max(x, 0), self.env.map.width - 1)
+        y = min(max(y, 0), self.env.map.height - 1)
+        return x, y
+
     # visibility stuff #
     def update_local_visibility(self, position: MapPosition):
         """
@@ -200,16 +235,7 @@ class Agent:
         :param map:
         :param position: The position of the agent.
         """
-        x = position.x
-        y = position.y
-
-        tmp_pos = MapPosition(x, y)
-        for i in range(-self.visibility_range, self.visibility_range + 1):
-            for j in range(-self.visibility_range, self.visibility_range + 1):
-                tmp_pos.x = x + i
-                tmp_pos.y = y + j
-                if self.env.map.check_position_on_map(tmp_pos):
-                    self.env.map.set_visible(tmp_pos, self.id)
+        self.env.map.set_visible_area(position, self.visibility_range, self.id)
 
     def add_unit(self, unit):
         if unit.owner.id == self.id:
@@ -0,0 +1,117 @@
+from numbers import Real
+from typing import Dict
+
+import numpy as np
+
+from strategyRLEnv.ActionRegistry import action_handlers
+from strategyRLEnv.Agent import agent_feature_extractors
+
+
+def check_number(value, name: str):
+    if isinstance(value, bool) or not isinstance(value, Real):
+        raise ValueError(f"{name} should be a number, got {value!r}")
+    return value
+
+
+def read_only(values) -> np.ndarray:
+    array = np.array(values, dtype=np.float64)
+    array.flags.writeable = False
+    return array
+
+
+class CompiledSettings:
+    """
+    The env_settings the actions and agents read every step, checked and compiled
+    once when the environment is created.
+
+    Actions are numbered like env.action_mapping, the enabled actions (cost >= 0)
+    first in the order of the settings, followed by the disabled ones. The tables are
+    indexed by these action ids.
+
+    Attributes:
+        action_names: names of all actions, indexed by action id.
+        action_ids: action name -> action id.
+        num_enabled_actions: number of enabled actions, they have the ids below it.
+        cost: (actions,) cost of every action.
+        reward: (actions,) reward of every action, 0 if not set.
+        income: (actions,) money_gain_per_turn of the buildings built by every action.
+        maintenance: (actions,) maintenance_cost_per_turn of these buildings.
+        invalid_action_penalty: reward of agents without an executed action.
+        city_clearance_radius: radius around cities no other city can be built in.
+        agent_feature_extractors: functions of the selected agent features in
+            observation order, see Agent.get_observation.
+    """
+
+    def __init__(self, env_settings: Dict):
+        actions = env_settings.get("actions")
+        if not isinstance(actions, Dict):
+            raise ValueError("env_settings should define the actions as a dictionary")
+
+        if "invalid_action_penalty" not in actions:
+            raise ValueError("actions should define the invalid_action_penalty")
+        self.invalid_action_penalty = check_number(
+            actions["invalid_action_penalty"], "invalid_action_penalty"
+        )
+
+        enabled = []
+        disabled = []
+        for name, properties in actions.items():
+            if name == "invalid_action_penalty":
+                continue
+            if not isinstance(properties, Dict):
+                raise ValueError(f"action {name} should be a dictionary")
+            for key in ["cost", "reward"]:
+                if key in properties:
+                    check_number(properties[key], f"{key} of action {name}")
+            if properties.get("cost", -1) >= 0:
+                # enabled actions need a handler, see register_action
+                if name not in action_handlers:
+                    raise ValueError(f"Unknown action type {name} enabled in the actions")
+                enabled.append(name)
+            else:
+                disabled.append(name)
+
+        # capitals are built on reset and destroying is paid like claiming
+        if "build_city" not in actions:
+            raise ValueError("actions should define build_city, capitals are cities")
+        if "destroy" in enabled and "claim" not in actions:
+            raise ValueError("destroy is paid with the cost of claim, define claim")
+
+        self.action_names = enabled + disabled
+        self.action_ids = {name: i for i, name in enumerate(self.action_names)}
+        self.num_enabled_actions = len(enabled)
+
+        properties = [actions[name] for name in self.action_names]
+        self.cost = read_only([p.get("cost", -1) for p in properties])
+        self.reward = read_only([p.get("reward", 0) for p in properties])
+        self.income = read_only(
+            [
+                check_number(p.get("money_gain_per_turn", 0), "money_gain_per_turn")
+                for p in properties
+            ]
+        )
+        self.maintenance = read_only(
+            [
+                check_number(
+                    p.get("maintenance_cost_per_turn", 0), "maintenance_cost_per_turn"
+                )
+                for p in properties
+            ]
+        )
+
+        self.city_clearance_radius = env_settings.get("city_clearance_radius", 2)
+        if (
+            isinstance(self.city_clearance_radius, bool)
+            or not isinstance(self.city_clearance_radius, int)
+            or self.city_clearance_radius < 0
+        ):
+            raise ValueError("city_clearance_radius should be a non negative integer")
+
+        self.agent_feature_extractors = []
+        for feature in env_settings.get("agent_features", []):
+            if not feature.get("select", False):
+                continue
+            extractor = agent_feature_extractors.get(feature.get("name"))
+            if extractor is None:
+                raise ValueError(f"Unknown agent feature {feature.get('name')}")
+            self.agent_feature_extractors.append(extractor)
@@ -0,0 +1,331 @@
+from typing import Tuple
+
+import numpy as np
+import pygame
+
+from strategyRLEnv.map.map_settings import (COLOR_DEFAULT_BORDER, BuildingType,
+                                            ResourceType, bridge_color,
+                                            road_color)
+from strategyRLEnv.map.TileView import TileView
+
+
+class Renderer:
+    """
+    Draws the environment with pygame.
+
+    All pygame code lives in this module, the simulation itself never imports it.
+    The environment imports the renderer on the first call of render, or on
+    creation in 'human' mode.
+
+    Attributes:
+        render_mode (str): 'human' or 'rgb_array'.
+        screen: The pygame screen surface.
+    """
+
+    def __init__(self, screen_width: int, screen_height: int, render_mode: str):
+        self.render_mode = render_mode
+
+        pygame.init()
+        if render_mode != "human":
+            self.screen = pygame.display.set_mode(
+                (screen_width, screen_height), pygame.HIDDEN
+            )
+        else:
+            self.screen = pygame.display.set_mode((screen_width, screen_height))
+        pygame.display.set_caption("Agent-based Strategy RL")
+        self.screen.fill((0, 0, 0))  # Fill the screen with black color
+
+    def render(self, env):
+        """
+        Draw the current state of the environment.
+
+        Returns:
+            The RGB image of the frame in 'rgb_array' mode, else None.
+        """
+        draw_map(self.screen, env.map)
+        for agent in env.agents:
+            draw_agent(self.screen, agent, env.map.tile_size)
+
+        pygame.display.flip()
+        if self.render_mode == "rgb_array":
+            return capture_game_state_as_image()
+        return None
+
+    def close(self):
+        pygame.quit()
+
+
+def capture_game_state_as_image():
+    screen_capture = pygame.display.get_surface()
+    return np.transpose(pygame.surfarray.array3d(screen_capture), axes=[1, 0, 2])
+
+
+def draw_map(screen: pygame.Surface, game_map):
+    """
+    Draw the map on the screen
+    :param screen:
+    :param game_map:
+    :return:
+    """
+    for x in range(game_map.width):
+        for y in range(game_map.height):
+            draw_square(screen, TileView(game_map, x, y), game_map.tile_size)
+
+
+def draw_agent(screen: pygame.Surface, agent, square_size: int):
+    # draw the units
+    for unit in agent.units:
+        draw_unit(screen, unit, square_size, agent.color)
+
+
+def draw_square(screen: pygame.Surface, square, square_size: int):
+    """
+    Draw the square on the screen
+    :param screen:
+    :param square: Map_Square or TileView
+    :param square_size:
+    :return:
+    """
+    x = square.position.x
+    y = square.position.y
+
+    pygame.draw.rect(
+        screen,
+        square.land_type_color,
+        (x * square_size, y * square_size, square_size, square_size),
+    )
+    grain_color = (255, 255, 0)
+    metal_color = (192, 192, 192)
+    resource = square.resource
+    if resource != ResourceType.NONE:
+        if resource == ResourceType.GRAIN:
+            resource_color = grain_color
+
+        elif resource == ResourceType.METAL:
+            resource_color = metal_color
+
+        pygame.draw.line(
+            screen,
+            resource_color,
+            (x * square_size + square_size * 0.3, y * square_size + square_size),
+            (x * square_size + square_size * 0.3, y * square_size + square_size / 2),
+        )
+
+        pygame.draw.line(
+            screen,
+            resource_color,
+            (x * square_size + square_size * 0.6, y * square_size),
+            (x * square_size + square_size * 0.6, y * square_size + square_size / 2),
+        )
+
+    owner_color = square.owner_color
+    if owner_color != COLOR_DEFAULT_BORDER:
+        pygame.draw.rect(
+            screen,
+            owner_color,
+            (x * square_size, y * square_size, square_size, square_size),
+            1,
+        )
+
+    building = square.building
+    if building is not None:
+        draw_building(screen, building, square_size, owner_color)
+
+
+def draw_building(
+    screen: pygame.Surface,
+    building,
+    square_size: int,
+    owner_color: Tuple[int, int, int],
+):
+    """
+    Draw the building on the given screen, with the drawer of its building type.
+    """
+    building_drawers[building.building_type](screen, building, square_size, owner_color)
+
+
+def draw_city(screen: pygame.Surface, city, square_size: int, owner_color):
+    # Draw the city image centered on the tile
+    pygame.draw.rect(
+        screen,
+        owner_color,
+        (
+            city.position.x * square_size,
+            city.position.y * square_size,
+            square_size,
+            square_size,
+        ),
+    )
+
+
+def draw_farm(screen: pygame.Surface, farm, square_size: int, owner_color):
+    """
+    Draws diagonal lines filling the square from bottom left to top right.
+
+    :param screen: The Pygame surface to draw on.
+    :param square_size: The size of the square in pixels.
+    """
+    # Calculate the top-left corner of the square
+    top_left_x = farm.position.x * square_size
+    top_left_y = farm.position.y * square_size
+
+    # Define the color for the lines
+    line_color = (0, 0, 0)  # Default to black if not specified
+
+    num_lines = 2
+
+    # Calculate spacing between lines
+    spacing = square_size / (num_lines + 1)
+
+    for i in range(1, num_lines + 1):
+        # Calculate the offset for each line
+        offset = spacing * i
+
+        # Start position on the left edge of the tile
+        start_pos = (top_left_x, top_left_y + square_size - offset)
+
+        # End position on the top edge of the tile
+        end_pos = (top_left_x + square_size, top_left_y + square_size - offset)
+
+        # Draw the diagonal line
+        pygame.draw.line(
+            screen, line_color, start_pos, end_pos, 2
+        )  # Width=2 for better visibility
+
+
+def draw_mine(screen: pygame.Surface, mine, square_size: int, owner_color):
+    """
+    Draws triangle filling.
+
+    :param screen: The Pygame surface to draw on.
+    :param square_size: The size of the square in pixels.
+    """
+    # Calculate the top-left corner of the square
+    top_left_x = mine.position.x * square_size
+    top_left_y = mine.position.y * square_size
+
+    # Define the color for the triangle
+    triangle_color = (0, 0, 0)  # Default to black if not specified
+
+    # Scaling factor to make the triangle smaller
+    scaling_factor = 0.6
+    base_width = int(square_size * scaling_factor)
+    height = int(square_size * scaling_factor)
+
+    # Centering coordinates
+    base_x_start = top_left_x + (square_size - base_width) // 2
+    base_y = top_left_y + square_size - (square_size - height) // 2
+    apex_y = base_y - height
+
+    # Vertices of the pyramid triangle
+    vertex1 = (base_x_start, base_y)  # Base Left
+    vertex2 = (base_x_start + base_width, base_y)  # Base Right
+    vertex3 = (top_left_x + square_size // 2, apex_y)  # Apex
+
+    # List of vertices
+    vertices = [vertex1, vertex2, vertex3]
+
+    # Draw the filled pyramid triangle
+    pygame.draw.polygon(screen, triangle_color, vertices, 0)
+
+
+def draw_road(screen: pygame.Surface, road, square_size: int, owner_color):
+    draw_bridge_road(
+        screen, road.position.x, road.position.y, square_size, road.shape, road_color
+    )
+
+
+def draw_bridge(screen: pygame.Surface, bridge, square_size: int, owner_color):
+    draw_bridge_road(
+        screen,
+        bridge.position.x,
+        bridge.position.y,
+        square_size,
+        bridge.shape,
+        bridge_color,
+    )
+
+
+def draw_bridge_road(
+    screen: pygame.Surface,
+    x,
+    y,
+    square_size: int,
+    shape,
+    color: Tuple[int, int, int],
+):
+    """
+    Draw the road on the screen based on the RoadShape.
+
+    :param color:
+    :param y:
+    :param x:
+    :param screen: Pygame display surface
+    :param square_size: Size of the square tile
+    :param shape: RoadShape indicating connections
+    """
+    center_x = x * square_size + square_size // 2
+    center_y = y * square_size + square_size // 2
+    half_size = square_size // 2
+
+    road_width = max(2, square_size // 8)  # Adjust road thickness as needed
+
+    # Define end points for each direction
+    directions = {
+        "up": (center_x, center_y - half_size),
+        "down": (center_x, center_y + half_size),
+        "left": (center_x - half_size, center_y),
+        "right": (center_x + half_size, center_y),
+    }
+
+    # Draw roads based on active connections
+    if shape.up:
+        pygame.draw.line(
+            screen, color, (center_x, center_y), directions["up"], road_width
+        )
+    if shape.down:
+        pygame.draw.line(
+            screen, color, (center_x, center_y), directions["down"], road_width
+        )
+    if shape.left:
+        pygame.draw.line(
+            screen, color, (center_x, center_y), directions["left"], road_width
+        )
+    if shape.right:
+        pygame.draw.line(
+            screen, color, (center_x, center_y), directions["right"], road_width
+        )
+
+
+def draw_unit(
+    screen: pygame.Surface,
+    unit,
+    square_size: int,
+    owner_color: Tuple[int, int, int],
+):
+    # Calculate the size of the diamond
+    rectangle_size = square_size / 3
+    x_offset = square_size * unit.position.x
+    y_offset = square_size * unit.position.y
+
+    center_x = x_offset + (square_size / 2)
+    center_y = y_offset + (square_size / 2)
+
+    # Define the vertices of the diamond
+    top = (center_x, center_y - rectangle_size)
+    right = (center_x + rectangle_size, center_y)
+    bottom = (center_x, center_y + rectangle_size)
+    left = (center_x - rectangle_size, center_y)
+    vertices = [top, right, bottom, left]
+
+    pygame.draw.polygon(screen, owner_color, vertices)
+
+
+# building type -> function drawing it
+building_drawers = {
+    BuildingType.CITY: draw_city,
+    BuildingType.FARM: draw_farm,
+    BuildingType.MINE: draw_mine,
+    BuildingType.ROAD: draw_road,
+    BuildingType.BRIDGE: draw_bridge,
+}
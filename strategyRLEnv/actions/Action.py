@@ -43,8 +43,10 @@ class Action(ABC):
 
     def get_cost(self, env) -> float:
         """Return the cost of the action."""
-        return env.env_settings.get("actions")[self.action_type.value]["cost"]
+        settings = env.compiled_settings
+        return settings.cost[settings.action_ids[self.action_type.value]]
 
     def get_reward(self, env) -> float:
         """Return the reward for the action."""
-        return env.env_settings.get("actions")[self.action_type.value]["reward"]
+        settings = env.compiled_settings
+        return settings.reward[settings.action_ids[self.action_type.value]]
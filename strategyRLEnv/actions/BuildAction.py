@@ -49,18 +49,21 @@ class BuildAction(Action, ABC):
 
     def get_cost(self, env) -> float:
         """Return the cost of the action."""
-        return env.env_settings.get("actions")[self.building_type.value]["cost"]
+        settings = env.compiled_settings
+        return settings.cost[settings.action_ids[self.building_type.value]]
 
     def get_reward(self, env) -> float:
         """Return the reward for the action."""
-        return env.env_settings.get("actions")[self.building_type.value]["reward"]
+        settings = env.compiled_settings
+        return settings.reward[settings.action_ids[self.building_type.value]]
 
     def get_building_parameters(self, env) -> Dict:
         """Return the building type id."""
-        action = env.env_settings.get("actions")[self.building_type.value]
+        settings = env.compiled_settings
+        action_id = settings.action_ids[self.building_type.value]
         params = {
-            "money_gain_per_turn": action.get("money_gain_per_turn", 0),
-            "maintenance_cost_per_turn": action.get("maintenance_cost_per_turn", 0),
+            "money_gain_per_turn": settings.income[action_id],
+            "maintenance_cost_per_turn": settings.maintenance[action_id],
         }
         return params
 
@@ -12,12 +12,9 @@ class BuildCityAction(BuildAction):
         if not super().validate(env):
             return False
 
-        city_clearance_radius = env.env_settings.get("city_clearance_radius", 2)
+        city_clearance_radius = env.compiled_settings.city_clearance_radius
 
-        too_close_to_city, _ = env.map.tile_is_next_to_building_type(
-            self.position, BuildingType.CITY, radius=city_clearance_radius
-        )
-        if too_close_to_city:
+        if env.map.city_nearby(self.position, city_clearance_radius):
             return False
 
         tile = env.map.get_tile(self.position)
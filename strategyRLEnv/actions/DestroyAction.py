@@ -32,7 +32,9 @@ class DestroyAction(Action):
         env.map.get_tile(self.position).update(env)
         env.map.remove_building(self.position)  # remove no matter what
 
-        self.agent.money -= env.action_manager.actions_definition["claim"]["cost"]
-        recuperation_factor = env.action_manager.actions_definition["claim"]["reward"]
+        settings = env.compiled_settings
+        claim_id = settings.action_ids["claim"]
+        self.agent.money -= settings.cost[claim_id]
+        recuperation_factor = settings.reward[claim_id]
         money_return = income * recuperation_factor
         return money_return
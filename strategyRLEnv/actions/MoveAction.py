@@ -41,6 +41,8 @@ class MoveAction(Action):
 
     def execute(self, env) -> int:
         self.agent.position = self.position
-        self.agent.money -= env.action_manager.actions_definition["move"]["cost"]
-        reward = env.action_manager.actions_definition["move"]["reward"]
+        settings = env.compiled_settings
+        move_id = settings.action_ids["move"]
+        self.agent.money -= settings.cost[move_id]
+        reward = settings.reward[move_id]
         return reward
@@ -44,6 +44,7 @@ class PlaceUnitAction(Action):
         if tile.unit is not None and tile.unit.owner.id == self.agent.id:
             # add strength to unit
             tile.unit.strength += 50
+            env.map.set_unit_strength(self.position, tile.unit.strength)
         else:
             unit = Unit(self.agent, self.position)
             env.agents[self.agent.id].add_unit(unit)
@@ -55,16 +56,18 @@ class PlaceUnitAction(Action):
 
     def get_cost(self, env) -> float:
         """Return the cost of the action."""
-        return env.env_settings.get("actions")["place_unit"]["cost"]
+        settings = env.compiled_settings
+        return settings.cost[settings.action_ids["place_unit"]]
 
 
 def check_if_claiming_enemy_tile(env, position: MapPosition, agent_id: int) -> bool:
     tile = env.map.get_tile(position)
     if tile.owner_id != OWNER_DEFAULT_TILE and tile.owner_id != agent_id:
-        surrounding = env.map.get_surrounding_tiles(position, 1, diagonal=True)
+        surrounding_ids = env.map.get_surrounding_tile_ids(position, 1, diagonal=True)
         friendly_unit_count = 0
-        for tile in surrounding:
-            if tile.unit is not None and tile.unit.owner.id == agent_id:
+        for tile_id in surrounding_ids.tolist():
+            unit = env.map.unit_objects.get(tile_id)
+            if unit is not None and unit.owner.id == agent_id:
                 friendly_unit_count += 1
         if friendly_unit_count >= conquer_threshold:
             return True
@@ -38,4 +38,5 @@ class WithdrawUnitAction(Action):
 
     def get_cost(self, env) -> float:
         """Return the cost of the action."""
-        return env.env_settings.get("actions")["withdraw_unit"]["cost"]
+        settings = env.compiled_settings
+        return settings.cost[settings.action_ids["withdraw_unit"]]
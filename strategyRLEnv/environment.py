@@ -2,19 +2,39 @@ from typing import Any, Dict, List, Optional
 
 import gymnasium as gym
 import numpy as np
-import pygame
 from gymnasium import spaces
+from gymnasium.utils import seeding
 
 from strategyRLEnv.ActionManager import ActionManager
 from strategyRLEnv.Agent import Agent
-from strategyRLEnv.map.map_settings import killed_punish_value
+from strategyRLEnv.CompiledSettings import CompiledSettings
+from strategyRLEnv.map.BlockSummary import BlockSummary
+from strategyRLEnv.map.map_settings import (ALL_TILES_CHANGED, BUILDING_IDS,
+                                            MAP_PLANE_COMPACT_DTYPES,
+                                            MAP_PLANE_EMPTY_VALUES, LandType,
+                                            killed_punish_value)
 from strategyRLEnv.map.mapGenerator import generate_finished_map
+from strategyRLEnv.map.MapLibrary import MapLibrary
+from strategyRLEnv.map.MapPool import MapPool
 from strategyRLEnv.map.MapPosition import MapPosition
 
 
-def capture_game_state_as_image():
-    screen_capture = pygame.display.get_surface()
-    return np.transpose(pygame.surfarray.array3d(screen_capture), axes=[1, 0, 2])
+def allocate_observation_buffers(space):
+    """
+    Zeroed arrays for all boxes of the space and read only views of them,
+    both nested like the space.
+    """
+    if isinstance(space, spaces.Dict):
+        buffers = {}
+        views = {}
+        for key, sub_space in space.spaces.items():
+            buffers[key], views[key] = allocate_observation_buffers(sub_space)
+        return buffers, views
+
+    buffer = np.zeros(space.shape, dtype=space.dtype)
+    view = buffer.view()
+    view.flags.writeable = False
+    return buffer, view
 
 
 class MapEnvironment(gym.Env):
@@ -24,7 +44,8 @@ class MapEnvironment(gym.Env):
     Attributes:
         env_settings (Dict[str, Any]): A dictionary containing environment settings.
         num_agents (int): The number of agents in the environment.
-        render_mode (str): The mode to render with. Options are 'human' or 'rgb_array'.
+        render_mode (str): The mode to render with. Options are None, 'human' or 'rgb_array'.
+            Without 'human' no display is created before the first call of render.
         seed (Optional[int]): The seed for the environment's random number generator.
     """
 
@@ -34,7 +55,7 @@ class MapEnvironment(gym.Env):
         self,
         env_settings: Any,
         num_agents: int,
-        render_mode: str = "rgb_array",
+        render_mode: Optional[str] = "rgb_array",
         seed: Optional[int] = None,
     ):
         super(MapEnvironment, self).__init__()
@@ -43,22 +64,56 @@ class MapEnvironment(gym.Env):
             raise ValueError("env_settings should be a dictionary")
         if not isinstance(num_agents, int):
             raise ValueError("num_agents should be an integer")
-        if render_mode not in ["human", "rgb_array"]:
-            raise ValueError("render_mode should be either 'human' or 'rgb_array'")
+        if render_mode not in [None, "human", "rgb_array"]:
+            raise ValueError("render_mode should be None, 'human' or 'rgb_array'")
         if seed is not None:
             if not isinstance(seed, int):
                 raise ValueError("seed should be an integer")
 
         self.env_settings = env_settings
         self.num_agents = num_agents
+        # settings read every step, checked before anything else is set up
+        self.compiled_settings = CompiledSettings(env_settings)
+
+        # map generation and spawns draw from np_random, seed it before the first map
+        self.np_random, _ = seeding.np_random(seed)
 
         self.render_mode = render_mode
-        self.screen_width = 1000
-        self.screen_height = 1000
-        self.screen = self.setup_screen()
+        self.screen_width = self.env_settings.get("screen_width", 1000)
+        self.screen_height = self.env_settings.get("screen_height", 1000)
+        # the display is only opened up front for humans, otherwise on the first render
+        self.renderer = None
+        self.screen = None
+        if self.render_mode == "human":
+            self.screen = self.setup_screen()
+
+        # maps can be taken from a pre generated map library instead of generating them
+        self.map_library = None
+        if self.env_settings.get("map_library"):
+            self.map_library = MapLibrary(self.env_settings["map_library"])
+
+        # or from a pool of maps generated in the background
+        self.map_pool = None
+        pool_settings = self.env_settings.get("map_pool")
+        if pool_settings and self.map_library is None:
+            self.map_pool = MapPool(
+                self.env_settings,
+                size=pool_settings.get("size", 8),
+                max_uses=pool_settings.get("max_uses", 1),
+                seed=int(self.np_random.integers(2**63)),
+            )
 
         # Initialize the map
-        self.map = generate_finished_map(self, self.env_settings)
+        self.map = self._create_map()
+        # block summaries of the observation pyramid, built for every new map
+        self.pyramid: List[BlockSummary] = []
+        # map and set of its changed tiles the next map delta is built from
+        self._delta_map = None
+        self._delta_changes = None
+        self._steps_since_keyframe = 0
+        # map and set of its changed tiles the map buffers are refreshed from
+        self._observed_map = None
+        self._observed_changes = None
 
         # Initialize agents
         self.agents: List[Agent] = [Agent(i, self) for i in range(self.num_agents)]
@@ -72,12 +127,13 @@ class MapEnvironment(gym.Env):
         self.observation_space = self._define_observation_space()
         self.action_space = self._define_action_space()
 
-    def reset(self, seed=None, map_file=None):
+    def reset(self, seed=None, map_file=None, map_index=None):
         """
         Resets the environment to an initial state and returns an initial observation.
         Args:
             seed: The seed for the environment's random number generator.
             map_file: if defined, the map will be created from the topology defined in the file
+            map_index: index of the map in the map library, a random library map is used if not defined
         """
 
         if seed is not None:
@@ -85,11 +141,14 @@ class MapEnvironment(gym.Env):
                 raise ValueError("seed should be an integer")
 
         super().reset(seed=seed)
-        self.map = generate_finished_map(self, self.env_settings, map_file)
+        self.map = self._create_map(map_file, map_index)
         for agent in self.agents:
             agent.reset()
+        self.action_manager.reset()
         observations = self._get_observation()
         info = {"info": "no info here"}
+        if self.delta_observations:
+            info["map_delta"] = self._get_map_delta(keyframe=True)
         return observations, info
 
     def step(self, actions: List[List[List[int]]]):
@@ -101,11 +160,17 @@ class MapEnvironment(gym.Env):
             dimension 1 : list of agents,
             dimension 2 : list of agents per action,
             dimension 3 : ndarray of action parameters
+            or an int array of shape (agents, actions per agent, 3)
         """
         # input validation
-        if (not isinstance(actions, list)) or (not isinstance(actions[0], list)):
+        if isinstance(actions, np.ndarray):
+            if actions.ndim != 3 or actions.shape[2] != 3:
+                raise ValueError(
+                    "actions should be an int array of shape (agents, actions, 3)"
+                )
+        elif (not isinstance(actions, list)) or (not isinstance(actions[0], list)):
             raise ValueError("actions should be a 3D list of integers")
-        if not len(actions[0][0]) == 3:
+        elif not len(actions[0][0]) == 3:
             raise ValueError(
                 "each individual action is should be defined by 3 integers, [action_id, x, y]"
             )
@@ -118,6 +183,8 @@ class MapEnvironment(gym.Env):
         self._update_environment_state()
 
         observations = self._get_observation()
+        if self.delta_observations:
+            info["map_delta"] = self._get_map_delta()
 
         truncated = [False for _ in range(self.num_agents)]  # always False for now
         dones = [False for _ in range(self.num_agents)]
@@ -133,6 +200,15 @@ class MapEnvironment(gym.Env):
 
         return observations, rewards, dones, truncated, info
 
+    def action_masks(self, out=None):
+        """
+        Validity of every action on every tile for every agent, see ActionManager.action_masks.
+
+        Returns:
+            bool array (agents, action types, width, height), True where the action is valid.
+        """
+        return self.action_manager.action_masks(out)
+
     def render(self):
         """
         Renders the environment.
@@ -143,39 +219,123 @@ class MapEnvironment(gym.Env):
         Returns:
             Optional[np.ndarray]: The rendered image array if mode is 'rgb_array', else None.
         """
-        self.map.draw(self.screen, 1, 0, 0)
-        for agent in self.agents:
-            agent.draw(self.map.tile_size, 0, 0, 0)
+        if self.render_mode is None:
+            gym.logger.warn("render called without a render_mode, nothing is rendered")
+            return None
 
-        if self.render_mode == "human":
-            # Update the display
-            pygame.display.flip()
+        if self.screen is None:
+            self.screen = self.setup_screen()
 
+        frame = self.renderer.render(self)
+
+        if self.render_mode == "human":
             print(
                 f"Player: Money: {self.agents[0].money}, Last Money PL: {self.agents[0].last_money_pl}"
             )
             print("")
 
-        elif self.render_mode == "rgb_array":
-            # Return an RGB array of the current frame
-            pygame.display.flip()
-            screen_capture = capture_game_state_as_image()
-            return screen_capture
-        else:
-            raise NotImplementedError("Unknown render mode !!")
+        return frame
 
     def close(self):
         """
         Closes the environment.
         """
-        pygame.quit()
+        if self.map_pool is not None:
+            self.map_pool.close()
+        for summary in self.pyramid:
+            summary.close()
+        self.pyramid = []
+        if self._delta_map is not None:
+            self._delta_map.untrack_changes(self._delta_changes)
+            self._delta_map = None
+        if self._observed_map is not None:
+            self._observed_map.untrack_changes(self._observed_changes)
+            self._observed_map = None
+        if self.renderer is not None:
+            self.renderer.close()
+            self.renderer = None
+            self.screen = None
+
+    def _create_map(self, map_file=None, map_index=None):
+        """
+        Create the map from the map file, the map library, the map pool or the map settings, in this order.
+        """
+        if map_file:
+            return generate_finished_map(self, self.env_settings, map_file)
+
+        if self.map_library is not None:
+            if map_index is None:
+                map_index = int(self.np_random.integers(len(self.map_library)))
+            return generate_finished_map(
+                self, topology_array=self.map_library[map_index]
+            )
+
+        if map_index is not None:
+            raise ValueError("map_index requires a map_library in the env_settings")
+
+        if self.map_pool is not None:
+            return generate_finished_map(self, topology_array=self.map_pool.get())
+
+        return generate_finished_map(self, self.env_settings)
 
     def _define_observation_space(self):
+        encoding = self.env_settings.get("observation_encoding", "float32")
+        if encoding not in ["float32", "compact"]:
+            raise ValueError(
+                "observation_encoding should be either 'float32' or 'compact'"
+            )
+        self.compact_observations = encoding == "compact"
+        observability = self.env_settings.get("observability", "full")
+        if observability not in ["full", "partial"]:
+            raise ValueError("observability should be either 'full' or 'partial'")
+        self.partial_observations = observability == "partial"
+        self.observation_window = self.env_settings.get("observation_window")
+        if self.observation_window is not None:
+            if (
+                not isinstance(self.observation_window, int)
+                or self.observation_window < 1
+            ):
+                raise ValueError("observation_window should be a positive integer")
+        self.pyramid_block_sizes = self.env_settings.get("observation_pyramid", [])
+        for block_size in self.pyramid_block_sizes:
+            if not isinstance(block_size, int) or block_size < 1:
+                raise ValueError(
+                    "observation_pyramid should be a list of positive integers"
+                )
+        delta_settings = self.env_settings.get("observation_delta")
+        self.delta_observations = bool(delta_settings)
+        if self.delta_observations:
+            self.keyframe_interval = delta_settings.get("keyframe_interval", 100)
+            if (
+                not isinstance(self.keyframe_interval, int)
+                or self.keyframe_interval < 1
+            ):
+                raise ValueError("keyframe_interval should be a positive integer")
+            if self.partial_observations or self.observation_window is not None:
+                raise ValueError(
+                    "observation_delta requires full observability without a window"
+                )
+        self.observed_map_shape = (self.map.width, self.map.height)
+        # with partial observability or windows every agent gets its own map planes
+        map_plane_shape = self.observed_map_shape
+        if self.observation_window is not None:
+            map_plane_shape = (
+                self.num_agents,
+                self.observation_window,
+                self.observation_window,
+            )
+        elif self.partial_observations:
+            map_plane_shape = (self.num_agents,) + map_plane_shape
+
         data = self.env_settings["map_features"]
         selected_features = [
             feature for feature in data if feature.get("select", False)
         ]
         self.features_per_tile = selected_features
+        self.map_feature_names = [feature["name"] for feature in selected_features]
+        for name in self.map_feature_names:
+            if name not in self.map.planes:
+                raise ValueError(f"Unknown map feature {name}")
 
         data = self.env_settings["agent_features"]
         selected_features = [
@@ -189,25 +349,32 @@ class MapEnvironment(gym.Env):
 
         i = 0
         for feature in self.features_per_tile:
-            map_feature_mins[i] = float(feature["values"]["min"])
+            map_feature_mins[i] = min(
+                float(feature["values"]["min"]),
+                MAP_PLANE_EMPTY_VALUES.get(feature["name"], 0),
+            )
             map_feature_maxs[i] = float(feature["values"]["max"])
             i += 1
 
         map_low = (
             np.zeros(
-                (self.map.width, self.map.height, len(self.features_per_tile)),
+                map_plane_shape + (len(self.features_per_tile),),
                 dtype=np.float32,
             )
             + map_feature_mins
         )
         map_high = (
             np.zeros(
-                (self.map.width, self.map.height, len(self.features_per_tile)),
+                map_plane_shape + (len(self.features_per_tile),),
                 dtype=np.float32,
             )
             + map_feature_maxs
         )
         map_observation_space = spaces.Box(low=map_low, high=map_high, dtype=np.float32)
+        if self.compact_observations:
+            map_observation_space = self._define_compact_map_space(
+                map_feature_mins, map_feature_maxs, map_plane_shape
+            )
 
         # agent observation space
         agent_feature_mins = np.zeros(len(self.agent_features), dtype=np.float32)
@@ -254,26 +421,118 @@ class MapEnvironment(gym.Env):
             shape=(self.map.width, self.map.height),
             dtype=np.int64,
         )
+        if self.compact_observations:
+            # one bit packed plane per agent, see Map.get_packed_visibility
+            visibility_map_observation_space = spaces.Box(
+                low=0,
+                high=255,
+                shape=(self.num_agents, self.map.width, (self.map.height + 7) // 8),
+                dtype=np.uint8,
+            )
+        if self.observation_window is not None:
+            # visibility of every agent in its window, 1 if visible
+            visibility_map_observation_space = spaces.Box(
+                low=0, high=1, shape=map_plane_shape, dtype=np.uint8
+            )
 
-        return spaces.Dict(
+        observation_space = spaces.Dict(
             {
                 "map": map_observation_space,
                 "visibility_map": visibility_map_observation_space,
                 "agents": agents_observation_space,
             }
         )
+        if self.pyramid_block_sizes:
+            observation_space["pyramid"] = self._define_pyramid_space()
+        if self.delta_observations:
+            # the map is handed out as map delta in the info
+            del observation_space.spaces["map"]
+        self._allocate_observation_buffers(observation_space)
+        return observation_space
+
+    def _define_pyramid_space(self):
+        """
+        One summary of the map per block size, see BlockSummary.
+        """
+        num_land_types = len(LandType)
+        num_building_types = len(BUILDING_IDS)
+        levels = {}
+        for block_size in self.pyramid_block_sizes:
+            shape = (
+                -(-self.map.width // block_size),
+                -(-self.map.height // block_size),
+            )
+            tiles = block_size * block_size
+            levels[f"blocks_{block_size}"] = spaces.Dict(
+                {
+                    "ownership_share": spaces.Box(
+                        low=0,
+                        high=1,
+                        shape=(self.num_agents,) + shape,
+                        dtype=np.float32,
+                    ),
+                    "land_type_counts": spaces.Box(
+                        low=0,
+                        high=tiles,
+                        shape=shape + (num_land_types,),
+                        dtype=np.int32,
+                    ),
+                    "building_counts": spaces.Box(
+                        low=0,
+                        high=tiles,
+                        shape=shape + (num_building_types,),
+                        dtype=np.int32,
+                    ),
+                    "unit_strength": spaces.Box(
+                        low=0,
+                        high=np.iinfo(np.int64).max,
+                        shape=shape,
+                        dtype=np.int64,
+                    ),
+                }
+            )
+        return spaces.Dict(levels)
 
-    def _define_action_space(self):
-        actions = self.env_settings["actions"]
+    def _define_compact_map_space(self, feature_mins, feature_maxs, plane_shape):
+        """
+        One plane per map feature in its compact dtype, bounds clipped to the dtype.
+        """
+        planes = {}
+        for name, low, high in zip(self.map_feature_names, feature_mins, feature_maxs):
+            dtype = np.dtype(MAP_PLANE_COMPACT_DTYPES[name])
+            if np.issubdtype(dtype, np.integer):
+                info = np.iinfo(dtype)
+                low = max(int(low), info.min)
+                high = min(int(high), info.max)
+            planes[name] = spaces.Box(
+                low=low,
+                high=high,
+                shape=plane_shape,
+                dtype=dtype,
+            )
+        return spaces.Dict(planes)
 
-        enabled_actions = []
+    def _allocate_observation_buffers(self, observation_space):
+        """
+        Allocate the observation arrays once, every step fills them in place.
+        Observations hand out read only views of these buffers.
+        """
+        self._observation_buffers, self._observation = allocate_observation_buffers(
+            observation_space
+        )
+        # new buffers are filled with the whole map on the next observation
+        self._refill_map_buffers = True
+        self._visible = None
+        self._window_centers = np.zeros((self.num_agents, 2), dtype=np.int64)
+        if self.partial_observations and self.observation_window is None:
+            self._visible = np.empty(
+                (self.num_agents, self.map.width, self.map.height), dtype=bool
+            )
 
-        for action_name, action_properties in actions.items():
-            if action_name == "invalid_action_penalty":
-                continue
-            # Check if the action is enabled (cost is not -1)
-            if action_properties.get("cost", -1) >= 0:
-                enabled_actions.append(action_name)
+    def _define_action_space(self):
+        # the enabled actions (cost is not -1) come first in the compiled settings
+        settings = self.compiled_settings
+        enabled_actions = settings.action_names[: settings.num_enabled_actions]
 
         num_action_types = len(enabled_actions)
         grid_width = self.map.width
@@ -300,33 +559,183 @@ class MapEnvironment(gym.Env):
         """
         Constructs the observation dictionary.
 
+        The arrays are read only views of buffers that are refreshed every step,
+        copy them to keep an observation.
+
         Returns:
             observation (Dict[str, Any]): The current observation.
         """
+        buffers = self._observation_buffers
+        if self.observed_map_shape != (self.map.width, self.map.height):
+            # a map of another size was loaded
+            self.observation_space = self._define_observation_space()
+            self.action_space = self._define_action_space()
+            buffers = self._observation_buffers
+
+        if self.observation_window is not None:
+            self._get_window_observation(buffers)
+        else:
+            self._get_map_observation(buffers)
+        for i, agent in enumerate(self.agents):
+            agent.get_observation(out=buffers["agents"][i])
+        if self.pyramid_block_sizes:
+            self._get_pyramid_observation(buffers["pyramid"])
 
-        map_observation, visibility_map = self.map.get_observation()
-        agent_observations = np.zeros(
-            (self.num_agents, len(self.agent_features)), dtype=np.float32
-        )
+        return self._observation
+
+    def _get_map_observation(self, buffers):
+        """
+        Refresh the map and visibility buffers at the tiles changed since the last
+        observation, the buffers keep their values across steps. They are filled with
+        the whole map for a new map, new buffers or a map reset.
+        """
+        tile_ids = self._changed_map_tiles()
+        if self.partial_observations:
+            self.map.get_visibility_planes(
+                self.num_agents, out=self._visible, tile_ids=tile_ids
+            )
+            self.map.get_partial_observation(
+                self.map_feature_names,
+                self._visible,
+                out=buffers["map"],
+                compact=self.compact_observations,
+                tile_ids=tile_ids,
+            )
+        elif not self.delta_observations:
+            self.map.get_observation(
+                self.map_feature_names,
+                out=buffers["map"],
+                compact=self.compact_observations,
+                tile_ids=tile_ids,
+            )
+
+        if self.compact_observations:
+            self.map.get_packed_visibility(
+                self.num_agents, out=buffers["visibility_map"], tile_ids=tile_ids
+            )
+        elif tile_ids is None:
+            np.copyto(buffers["visibility_map"], self.map.visibility_map)
+        else:
+            xs, ys = np.divmod(tile_ids, self.map.height)
+            buffers["visibility_map"][xs, ys] = self.map.visibility_map[xs, ys]
+
+    def _changed_map_tiles(self):
+        """
+        Tile ids changed since the map buffers were last filled, see Map.track_changes.
 
+        Returns:
+            sorted int64 array of tile ids, None if the whole map has to be refilled.
+        """
+        refill = self._refill_map_buffers
+        self._refill_map_buffers = False
+        if self._observed_map is not self.map:
+            if self._observed_map is not None:
+                self._observed_map.untrack_changes(self._observed_changes)
+            self._observed_map = self.map
+            self._observed_changes = self.map.track_changes()
+            refill = True
+
+        changes = self._observed_changes
+        if refill or ALL_TILES_CHANGED in changes:
+            changes.clear()
+            return None
+
+        tile_ids = np.fromiter(changes, dtype=np.int64, count=len(changes))
+        tile_ids.sort()
+        changes.clear()
+        return tile_ids
+
+    def _get_window_observation(self, buffers):
+        """
+        Fill the map and visibility buffers with the window around every agents center.
+        """
         for i, agent in enumerate(self.agents):
-            agent_observations[i] = agent.get_observation()
+            self._window_centers[i] = agent.get_observation_center()
+
+        self.map.get_window_observation(
+            self.map_feature_names,
+            self._window_centers,
+            self.observation_window,
+            out=buffers["map"],
+            compact=self.compact_observations,
+            masked=self.partial_observations,
+        )
+        np.copyto(
+            buffers["visibility_map"],
+            self.map.get_visibility_windows(
+                self._window_centers, self.observation_window
+            ),
+        )
 
-        return {
-            "map": map_observation,
-            "visibility_map": visibility_map,
-            "agents": agent_observations,
-        }
+    def _get_map_delta(self, keyframe=False):
+        """
+        Map tiles changed since the last step, or every tile on keyframes.
 
-    def setup_screen(self):
-        pygame.init()
+        A keyframe is sent on reset, for a new map and every keyframe_interval steps.
+        The indices are tile ids, x * height + y, so a cache of the map observation is
+        updated with cache.reshape(width * height, -1)[indices] = values, or per plane
+        in the compact encoding.
 
-        if self.render_mode != "human":
-            screen = pygame.display.set_mode(
-                (self.screen_width, self.screen_height), pygame.HIDDEN
+        Returns:
+            dict with "keyframe" (bool), "indices" (int64 array) and "values",
+            (tiles, features) float32 or a dict name -> (tiles,) array in the compact encoding.
+        """
+        if self._delta_map is not self.map:
+            if self._delta_map is not None:
+                self._delta_map.untrack_changes(self._delta_changes)
+            self._delta_map = self.map
+            self._delta_changes = self.map.track_changes()
+            keyframe = True
+
+        self._steps_since_keyframe += 1
+        if (
+            keyframe
+            or self._steps_since_keyframe >= self.keyframe_interval
+            or ALL_TILES_CHANGED in self._delta_changes
+        ):
+            keyframe = True
+            self._steps_since_keyframe = 0
+            indices = np.arange(self.map.tiles, dtype=np.int64)
+            values = self.map.get_tile_values(
+                self.map_feature_names, compact=self.compact_observations
             )
         else:
-            screen = pygame.display.set_mode((self.screen_width, self.screen_height))
-        pygame.display.set_caption("Agent-based Strategy RL")
-        screen.fill((0, 0, 0))  # Fill the screen with black color
-        return screen
+            indices = np.fromiter(
+                self._delta_changes, dtype=np.int64, count=len(self._delta_changes)
+            )
+            indices.sort()
+            values = self.map.get_tile_values(
+                self.map_feature_names, indices, compact=self.compact_observations
+            )
+        self._delta_changes.clear()
+
+        return {"keyframe": keyframe, "indices": indices, "values": values}
+
+    def _get_pyramid_observation(self, buffers):
+        """
+        Fill the pyramid buffers, the summaries only reduce the blocks changed since the last step.
+        """
+        if not self.pyramid or self.pyramid[0].map is not self.map:
+            for summary in self.pyramid:
+                summary.close()
+            self.pyramid = [
+                BlockSummary(self.map, block_size, self.num_agents)
+                for block_size in self.pyramid_block_sizes
+            ]
+
+        for summary in self.pyramid:
+            summary.update()
+            level = buffers[f"blocks_{summary.block_size}"]
+            summary.ownership_share(out=level["ownership_share"])
+            np.copyto(level["land_type_counts"], summary.land_type_counts)
+            np.copyto(level["building_counts"], summary.building_counts)
+            np.copyto(level["unit_strength"], summary.unit_strength)
+
+    def setup_screen(self):
+        # pygame is only imported together with the renderer
+        from strategyRLEnv.Renderer import Renderer
+
+        self.renderer = Renderer(
+            self.screen_width, self.screen_height, self.render_mode
+        )
+        return self.renderer.screen
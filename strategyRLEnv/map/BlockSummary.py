@@ -0,0 +1,159 @@
+import numpy as np
+
+from strategyRLEnv.map.map_settings import (ALL_TILES_CHANGED, BUILDING_IDS,
+                                            LandType)
+
+# map planes the summary is reduced from, with the value of padding tiles
+SUMMARY_PLANES = {
+    "tile_ownership": -1,
+    "land_type": -1,
+    "buildings": -1,
+    "unit_strength": 0,
+}
+
+
+class BlockSummary:
+    """
+    Coarse summary of the map over block_size x block_size blocks.
+
+    Every block holds the share of its tiles owned by each agent, the number of
+    tiles of every land type and building type and the summed unit strength.
+    Blocks at the right and bottom border are cut by the map and only count the
+    tiles on it.
+
+    refresh reduces the whole map by reshaping the planes into blocks. update only
+    reduces the blocks of tiles changed since the last update, see Map.track_changes.
+
+    Attributes:
+        block_size: width and height of a block in tiles.
+        shape: number of blocks along x and y.
+        tiles_per_block: (blocks x, blocks y) number of map tiles in every block.
+        owned_tiles: (blocks x, blocks y, agents) tiles owned by every agent.
+        land_type_counts: (blocks x, blocks y, land types) tiles of every land type.
+        building_counts: (blocks x, blocks y, building types) buildings of every type.
+        unit_strength: (blocks x, blocks y) summed unit strength.
+    """
+
+    def __init__(self, game_map, block_size: int, num_agents: int):
+        if block_size < 1:
+            raise ValueError("block size should be at least 1")
+
+        self.map = game_map
+        self.block_size = block_size
+        self.num_agents = num_agents
+        self.shape = (
+            -(-game_map.width // block_size),
+            -(-game_map.height // block_size),
+        )
+        width, height = self.shape
+        padded_shape = (width * block_size, height * block_size)
+
+        self.land_types = [land_type.value for land_type in LandType]
+        self.building_types = sorted(BUILDING_IDS.values())
+
+        # planes padded to whole blocks and (blocks x, blocks y, k, k) views on them
+        self._padded = {}
+        self._blocks = {}
+        for name, padding in SUMMARY_PLANES.items():
+            padded = np.full(padded_shape, padding, dtype=game_map.planes[name].dtype)
+            self._padded[name] = padded
+            self._blocks[name] = padded.reshape(
+                width, block_size, height, block_size
+            ).swapaxes(1, 2)
+
+        on_map = np.zeros(padded_shape, dtype=bool)
+        on_map[: game_map.width, : game_map.height] = True
+        self.tiles_per_block = (
+            on_map.reshape(width, block_size, height, block_size)
+            .sum(axis=(1, 3))
+            .astype(np.int32)
+        )
+
+        self.owned_tiles = np.zeros((width, height, num_agents), dtype=np.int32)
+        self.land_type_counts = np.zeros(
+            (width, height, len(self.land_types)), dtype=np.int32
+        )
+        self.building_counts = np.zeros(
+            (width, height, len(self.building_types)), dtype=np.int32
+        )
+        self.unit_strength = np.zeros((width, height), dtype=np.int64)
+
+        self._changed = game_map.track_changes()
+        self.refresh()
+
+    def refresh(self):
+        """
+        Reduce all blocks from the whole map.
+        """
+        self._changed.clear()
+        for name, padded in self._padded.items():
+            plane = self.map.planes[name].reshape(self.map.width, self.map.height)
+            padded[: self.map.width, : self.map.height] = plane
+        self._reduce(Ellipsis)
+
+    def update(self):
+        """
+        Reduce the blocks of the tiles changed on the map since the last update.
+        """
+        if not self._changed:
+            return
+        if ALL_TILES_CHANGED in self._changed:
+            self.refresh()
+            return
+
+        tile_ids = np.fromiter(self._changed, dtype=np.int64, count=len(self._changed))
+        self._changed.clear()
+        xs, ys = np.divmod(tile_ids, self.map.height)
+        for name, padded in self._padded.items():
+            plane = self.map.planes[name]
+            padded[xs, ys] = plane[tile_ids]
+
+        block_ids = np.unique(
+            (xs // self.block_size) * self.shape[1] + ys // self.block_size
+        )
+        self._reduce(np.divmod(block_ids, self.shape[1]))
+
+    def _reduce(self, index):
+        """
+        Reduce the blocks selected by index, Ellipsis for all blocks.
+        """
+        owners = self._blocks["tile_ownership"][index]
+        self.owned_tiles[index] = count_values(owners, range(self.num_agents))
+
+        land_types = self._blocks["land_type"][index]
+        self.land_type_counts[index] = count_values(land_types, self.land_types)
+
+        buildings = self._blocks["buildings"][index]
+        self.building_counts[index] = count_values(buildings, self.building_types)
+
+        self.unit_strength[index] = self._blocks["unit_strength"][index].sum(
+            axis=(-2, -1)
+        )
+
+    def ownership_share(self, out=None):
+        """
+        (agents, blocks x, blocks y) share of the tiles of every block owned by each agent.
+        """
+        share = np.moveaxis(self.owned_tiles, -1, 0) / self.tiles_per_block
+        if out is None:
+            return share.astype(np.float32)
+        np.copyto(out, share, casting="unsafe")
+        return out
+
+    def close(self):
+        """
+        Stop recording the changes of the map.
+        """
+        self.map.untrack_changes(self._changed)
+
+
+def count_values(blocks, values):
+    """
+    Count the tiles of every value in blocks of shape (..., k, k).
+
+    :return: int32 array (..., len(values))
+    """
+    counts = np.empty(blocks.shape[:-2] + (len(values),), dtype=np.int32)
+    for i, value in enumerate(values):
+        counts[..., i] = np.count_nonzero(blocks == value, axis=(-2, -1))
+    return counts
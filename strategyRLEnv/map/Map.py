@@ -1,106 +1,595 @@
 import uuid
+from functools import lru_cache
 
 import numpy as np
 
 from strategyRLEnv.Agent import Agent
-from strategyRLEnv.map.map_settings import (OWNER_DEFAULT_TILE, BuildingType,
-                                            max_agent_id)
+from strategyRLEnv.map.map_settings import (ALL_TILES_CHANGED, BUILDING_IDS,
+                                            MAP_PLANE_COMPACT_DTYPES,
+                                            MAP_PLANE_EMPTY_VALUES,
+                                            NO_BUILDING, OWNER_DEFAULT_TILE,
+                                            BuildingType, LandType,
+                                            ResourceType, max_agent_id)
 from strategyRLEnv.map.MapPosition import MapPosition
-from strategyRLEnv.map.MapSquare import Map_Square
+from strategyRLEnv.map.TileView import TileView
 
 
 def check_valid_agent_id(agent_id: int) -> bool:
     return 0 <= agent_id < max_agent_id
 
 
+def check_topology_values(land_types: np.ndarray, resources: np.ndarray):
+    """
+    Check in bulk that the topology only contains known land types and resources.
+    """
+    land_values = [land_type.value for land_type in LandType]
+    if not np.isin(land_types, land_values).all():
+        raise ValueError("topology array contains unknown land types")
+
+    resource_values = [resource.value for resource in ResourceType]
+    if not np.isin(resources, resource_values).all():
+        raise ValueError("topology array contains unknown resources")
+
+
+@lru_cache(maxsize=None)
+def neighbour_offsets(radius: int, diagonal: bool):
+    """
+    (dx, dy) offsets of the tiles around a tile, in the order get_surrounding_tiles
+    returns them. With diagonal the full square, else the horizontal and vertical lines.
+    """
+    steps = [i for i in range(-radius, radius + 1) if i != 0]
+    if diagonal:
+        offsets = [
+            (i, j)
+            for i in range(-radius, radius + 1)
+            for j in range(-radius, radius + 1)
+            if i != 0 or j != 0
+        ]
+    else:
+        offsets = [(i, 0) for i in steps] + [(0, j) for j in steps]
+    offsets = np.array(offsets, dtype=np.int64).reshape(-1, 2)
+    offsets.flags.writeable = False
+    return offsets[:, 0], offsets[:, 1]
+
+
 class Map:
     """
     Represents the map of the environment.
-    x values in width horizontal, y v
-    alues in height vertical
+    x values in width horizontal, y values in height vertical
     Position(x,y) with (0,0) in the top left corner
+
+    The map state is stored as a struct of arrays. Every per-tile property lives
+    in a numpy array of shape (width, height), indexed [x, y]. The arrays are
+    C-contiguous, so the linear tile id of a position is x * height + y and the
+    flat views in Map.planes can be indexed with tile ids directly.
+    Buildings and units are kept as objects in dictionaries keyed by tile id.
+    get_tile hands out TileView objects on demand for code working on single tiles.
+
     Attributes:
         env: The environment object.
         tiles: The total number of tiles on the map.
         tile_size: The size of each tile in pixels.
         width: The width of the map.
         height: The height of the map.
-        squares: A 2D list of Map_Square objects representing the map.
         continuous_map: Whether the map is continuous or not.
-        visibility_map: A 2D numpy array to store the visibility of each tile.
+        landtype_map: LandType value per tile.
+        resources_map: ResourceType value per tile.
+        ownership_map: owning agent id per tile, OWNER_DEFAULT_TILE if unclaimed.
+        building_map: BUILDING_IDS value per tile, NO_BUILDING if empty.
+        unit_strength_map: strength of the unit on each tile, 0 if empty.
+        unit_owner_map: owning agent id of the unit on each tile, OWNER_DEFAULT_TILE if empty.
+        health_map: health of the destroyable building on each tile, 0 if none.
+        land_money_value_map: base income of each tile.
+        tile_income_map: current income of each tile, land value plus building income.
+        visibility_map: bitmask per tile, bit i is set if agent i can see the tile.
+        building_objects: tile id -> Building
+        unit_objects: tile id -> Unit
     """
 
     def __init__(self, topology_array):
         self.id = uuid.uuid4()
         self.env = None
 
-        self.tiles = None
-        self.tile_size = None
-        self.width = None
-        self.height = None
+        # topology arrays are indexed [y][x][feature]
+        topology_array = np.asarray(topology_array)
+        if topology_array.ndim != 3 or topology_array.shape[2] < 2:
+            raise ValueError(
+                "topology array should have the shape (height, width, 2), got {}".format(
+                    topology_array.shape
+                )
+            )
+        check_topology_values(topology_array[..., 0], topology_array[..., 1])
+        self.height, self.width = topology_array.shape[:2]
+        self.tiles = self.width * self.height
+        self.tile_size = 1
 
-        self.squares = []
         self.continuous_map = None
 
-        # 2D numpy array to store the visibility of each tile
-        self.visibility_map = None
-        self.tile_size = 1
+        # agent id -> color, used for drawing owned tiles
+        self.owner_colors = {}
+
+        self.building_objects = {}
+        self.unit_objects = {}
+
+        # (plane name, window size) -> padded copy of the plane, see get_window_observation
+        self._padded_planes = {}
+        # sets of changed tile ids, see track_changes
+        self._change_trackers = []
+        # tile id -> interned MapPosition, see position
+        self._positions = {}
+        # radius -> flat tile ids padded by radius with -1, see get_surrounding_tile_ids
+        self._padded_tile_ids = {}
+        # (radius, diagonal) -> neighbour offsets into the flat padded tile ids
+        self._neighbour_stencils = {}
+        # (radius, diagonal) -> (building types, tiles) number of buildings of every
+        # type around each tile, see adjacency_counts
+        self._adjacency_counts = {}
+        # radius -> (width, height) number of cities within the Chebyshev radius, see city_counts
+        self._city_counts = {}
 
-        # ownership map
         # reorder dimensions of numpy array to [feature, x, y]
-        topology_array = np.moveaxis(topology_array, 2, 0)
-        self.landtype_map = topology_array[0]
-        self.resources_map = topology_array[1]
-        self.ownership_map = None
-        self.building_map = None
-        self.unit_strength_map = None
+        topology_array = np.transpose(topology_array, (2, 1, 0))
+        # always copied, topologies may be read only or shared with other maps
+        self.landtype_map = np.array(topology_array[0], dtype=np.int8, order="C")
+        self.resources_map = np.array(topology_array[1], dtype=np.int8, order="C")
+
+        shape = (self.width, self.height)
+        self.ownership_map = np.empty(shape, dtype=np.int16)
+        self.building_map = np.empty(shape, dtype=np.int8)
+        self.unit_strength_map = np.empty(shape, dtype=np.int32)
+        self.unit_owner_map = np.empty(shape, dtype=np.int16)
+        self.health_map = np.empty(shape, dtype=np.int32)
+        self.land_money_value_map = np.empty(shape, dtype=np.int32)
+        self.tile_income_map = np.empty(shape, dtype=np.float64)
+        # 2D numpy array to store the visibility of each tile
+        self.visibility_map = np.empty(shape, dtype=np.int64)
+
+        # flat views, indexed by tile id
+        self.planes = {
+            "land_type": self.landtype_map.reshape(-1),
+            "resources": self.resources_map.reshape(-1),
+            "tile_ownership": self.ownership_map.reshape(-1),
+            "buildings": self.building_map.reshape(-1),
+            "unit_strength": self.unit_strength_map.reshape(-1),
+            "building_health": self.health_map.reshape(-1),
+            "land_money_value": self.land_money_value_map.reshape(-1),
+            "tile_income": self.tile_income_map.reshape(-1),
+            "visibility": self.visibility_map.reshape(-1),
+        }
+
+        # value every episode dependent plane is filled with on reset
+        self._reset_values = [
+            (self.visibility_map, 0),
+            (self.ownership_map, OWNER_DEFAULT_TILE),
+            (self.building_map, NO_BUILDING),
+            (self.unit_strength_map, 0),
+            (self.unit_owner_map, OWNER_DEFAULT_TILE),
+            (self.health_map, 0),
+            (self.land_money_value_map, 1),
+            (self.tile_income_map, 0),
+        ]
+        self.reset()
+        # most queries look at the direct neighbours
+        self._neighbour_stencil(1, True)
+        self._neighbour_stencil(1, False)
 
     def reset(self):
         """
         Reset the map to its initial state. Keeps topology, but resets ownership, buildings, visibility.
+        The arrays are filled in place, no per tile work is done and no memory is allocated.
+        """
+        self.owner_colors.clear()
+        self.building_objects.clear()
+        self.unit_objects.clear()
+
+        for plane, value in self._reset_values:
+            plane.fill(value)
+        for counts in self._adjacency_counts.values():
+            counts.fill(0)
+        for counts in self._city_counts.values():
+            counts.fill(0)
+        for changed in self._change_trackers:
+            changed.add(ALL_TILES_CHANGED)
+
+    @property
+    def squares(self):
         """
-        for row in self.squares:
-            for square in row:
-                square.reset()
+        Column major grid of tile views, squares[x][y].
+        Only kept for compatibility, prefer get_tile or the arrays directly.
+        """
+        return [
+            [TileView(self, x, y) for y in range(self.height)]
+            for x in range(self.width)
+        ]
 
-        self.visibility_map = np.zeros((self.width, self.height), dtype=np.int64)
-        self.ownership_map = np.full(
-            (self.width, self.height), OWNER_DEFAULT_TILE, dtype=np.int64
-        )
-        self.building_map = np.zeros((self.width, self.height), dtype=np.int64)
-        self.unit_strength_map = np.zeros((self.width, self.height), dtype=np.int64)
+    def track_changes(self) -> set:
+        """
+        Start recording the tiles whose ownership, buildings, units, visibility or
+        tile values change.
+
+        :return: set the ids of changed tiles are added to, ALL_TILES_CHANGED stands for
+            every tile. The caller consumes and clears it.
+        """
+        changed = set()
+        self._change_trackers.append(changed)
+        return changed
+
+    def untrack_changes(self, changed: set) -> None:
+        """
+        Stop recording into a set returned by track_changes.
+        """
+        self._change_trackers = [c for c in self._change_trackers if c is not changed]
+
+    def tile_changed(self, tile_id: int) -> None:
+        for changed in self._change_trackers:
+            changed.add(tile_id)
+
+    def tile_index(self, position: MapPosition) -> int:
+        return position.x * self.height + position.y
+
+    def tile_position(self, tile_id: int) -> MapPosition:
+        return self.position(tile_id // self.height, tile_id % self.height)
+
+    def position(self, x: int, y: int) -> MapPosition:
+        """
+        Interned position of the tile x, y, every call for a tile returns the same
+        instance. Positions off the map are created but not kept.
+        """
+        x = int(x)
+        y = int(y)
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return MapPosition(x, y)
+
+        tile_id = x * self.height + y
+        position = self._positions.get(tile_id)
+        if position is None:
+            position = MapPosition(x, y)
+            self._positions[tile_id] = position
+        return position
+
+    def set_building_object(self, tile_id: int, building) -> None:
+        """
+        Store the building object of a tile and keep the building arrays in sync.
+        """
+        x, y = divmod(tile_id, self.height)
+        self.tile_changed(tile_id)
+        old_type_id = int(self.building_map[x, y])
+        if building is None:
+            self.building_objects.pop(tile_id, None)
+            self.building_map[x, y] = NO_BUILDING
+            self.health_map[x, y] = 0
+        else:
+            self.building_objects[tile_id] = building
+            self.building_map[x, y] = building.get_building_type_id()
+            self.health_map[x, y] = getattr(building, "health", 0)
+
+        new_type_id = int(self.building_map[x, y])
+        if old_type_id != new_type_id:
+            self._update_adjacency_counts(x, y, old_type_id, new_type_id)
+            city_id = BUILDING_IDS[BuildingType.CITY]
+            if old_type_id == city_id:
+                self._update_city_counts(x, y, -1)
+            if new_type_id == city_id:
+                self._update_city_counts(x, y, 1)
+
+    def set_unit_object(self, tile_id: int, unit) -> None:
+        """
+        Store the unit object of a tile and keep the unit strength array in sync.
+        """
+        x, y = divmod(tile_id, self.height)
+        self.tile_changed(tile_id)
+        if unit is None:
+            self.unit_objects.pop(tile_id, None)
+            self.unit_strength_map[x, y] = 0
+            self.unit_owner_map[x, y] = OWNER_DEFAULT_TILE
+        else:
+            self.unit_objects[tile_id] = unit
+            self.unit_strength_map[x, y] = unit.strength
+            self.unit_owner_map[x, y] = unit.owner.id
 
     def trigger_surrounding_tile_update(self, position, radius=1):
         surrounding_tiles = self.get_surrounding_tiles(position, radius)
         for tile in surrounding_tiles:
             tile.update(self.env)
 
-    def get_random_position_on_map(self):
-        x = np.random.randint(0, self.width)
-        y = np.random.randint(0, self.height)
-        return MapPosition(x, y)
+    def get_random_position_on_map(self, rng: np.random.Generator = None):
+        rng = np.random.default_rng(rng)
+        x = int(rng.integers(0, self.width))
+        y = int(rng.integers(0, self.height))
+        return self.position(x, y)
 
-    def get_observation(self):
+    def get_observation(self, feature_names, out=None, compact=False, tile_ids=None):
         """
         define here what info is visible to all agents
         Assuming full observability of map for now
+
+        Every feature is copied straight from its plane into the observation,
+        nothing is allocated if an out buffer is given. With tile_ids only these tiles
+        of out are refreshed, the rest keeps the values of earlier calls.
+
+        :param feature_names: names of the observed map planes, keys of Map.planes
+        :param out: optional array of shape (width, height, len(feature_names)) to fill,
+            for compact observations a dict name -> (width, height) array
+        :param compact: return a dict with one plane per feature in the dtype of
+            MAP_PLANE_COMPACT_DTYPES instead of one float32 array
+        :param tile_ids: int array of the tile ids to refresh in out, None for all tiles
+        :return: the observation, out if given
+        """
+        if tile_ids is not None:
+            xs, ys = np.divmod(tile_ids, self.height)
+            for i, name in enumerate(feature_names):
+                if compact:
+                    out[name][xs, ys] = self.planes[name][tile_ids]
+                else:
+                    out[xs, ys, i] = self.planes[name][tile_ids]
+            return out
+
+        if compact:
+            if out is None:
+                out = {
+                    name: np.empty(
+                        (self.width, self.height), dtype=MAP_PLANE_COMPACT_DTYPES[name]
+                    )
+                    for name in feature_names
+                }
+            for name in feature_names:
+                np.copyto(
+                    out[name],
+                    self.planes[name].reshape(self.width, self.height),
+                    casting="unsafe",
+                )
+            return out
+
+        if out is None:
+            out = np.empty(
+                (self.width, self.height, len(feature_names)), dtype=np.float32
+            )
+
+        for i, name in enumerate(feature_names):
+            np.copyto(
+                out[:, :, i],
+                self.planes[name].reshape(self.width, self.height),
+                casting="unsafe",
+            )
+
+        return out
+
+    def get_tile_values(self, feature_names, tile_ids=None, compact=False):
+        """
+        Values of the map planes at the given tiles, used for delta observations.
+
+        :param feature_names: names of the observed map planes, keys of Map.planes
+        :param tile_ids: int array of tile ids, x * height + y, None for all tiles
+        :param compact: return a dict name -> (tiles,) array in the dtype of
+            MAP_PLANE_COMPACT_DTYPES instead of one float32 array
+        :return: float32 array (tiles, len(feature_names)) or the compact dict
         """
-        map_info = np.zeros(
-            (self.width, self.height, len(self.env.features_per_tile)), dtype=np.float32
+        if tile_ids is None:
+            tile_ids = slice(None)
+            num_tiles = self.tiles
+        else:
+            num_tiles = len(tile_ids)
+
+        if compact:
+            return {
+                name: self.planes[name][tile_ids].astype(MAP_PLANE_COMPACT_DTYPES[name])
+                for name in feature_names
+            }
+
+        values = np.empty((num_tiles, len(feature_names)), dtype=np.float32)
+        for i, name in enumerate(feature_names):
+            np.copyto(values[:, i], self.planes[name][tile_ids], casting="unsafe")
+        return values
+
+    def get_visibility_planes(self, num_agents, out=None, tile_ids=None):
+        """
+        Visibility of every agent as boolean plane, out[agent_id, x, y] is True if the agent sees tile (x, y).
+        All agents are unpacked at once from the bytes of the bitmasks.
+
+        :param num_agents: number of agents to unpack the visibility bitmasks for
+        :param out: optional bool array of shape (num_agents, width, height) to fill
+        :param tile_ids: int array of the tile ids to refresh in out, None for all tiles
+        :return: the visibility planes, out if given
+        """
+        if tile_ids is not None:
+            xs, ys = np.divmod(tile_ids, self.height)
+            agent_ids = np.arange(num_agents)[:, None]
+            out[:, xs, ys] = (self.visibility_map[xs, ys] >> agent_ids) & 1 == 1
+            return out
+
+        if out is None:
+            out = np.empty((num_agents, self.width, self.height), dtype=bool)
+
+        # byte i of a little endian bitmask holds the bits of agents 8 * i to 8 * i + 7,
+        # unpacking the (bytes, width, height) array along axis 0 orders the bits by agent id
+        mask_bytes = (
+            self.visibility_map.astype("<i8", copy=False)
+            .view(np.uint8)
+            .reshape(self.width, self.height, 8)[:, :, : (num_agents + 7) // 8]
         )
+        mask_bytes = np.ascontiguousarray(mask_bytes.transpose(2, 0, 1))
+        bits = np.unpackbits(mask_bytes, axis=0, count=num_agents, bitorder="little")
+        np.copyto(out, bits.view(bool))
+        return out
 
-        features = self.env.features_per_tile
-        map_features = np.zeros(
-            (len(features), self.width, self.height), dtype=np.float32
+    def get_partial_observation(
+        self, feature_names, visible, out=None, compact=False, tile_ids=None
+    ):
+        """
+        Map planes as every agent sees them, tiles an agent can not see hold the
+        empty value of the plane, see MAP_PLANE_EMPTY_VALUES, or 0.
+
+        :param feature_names: names of the observed map planes, keys of Map.planes
+        :param visible: visibility planes of the agents, see get_visibility_planes
+        :param out: optional array of shape (agents, width, height, len(feature_names)) to fill,
+            for compact observations a dict name -> (agents, width, height) array
+        :param compact: return a dict with one plane per feature in the dtype of
+            MAP_PLANE_COMPACT_DTYPES instead of one float32 array
+        :param tile_ids: int array of the tile ids to refresh in out, None for all tiles
+        :return: the observation, out if given
+        """
+        if tile_ids is not None:
+            xs, ys = np.divmod(tile_ids, self.height)
+            tile_visible = visible[:, xs, ys]
+            for i, name in enumerate(feature_names):
+                agent_planes = out[name] if compact else out[..., i]
+                empty_value = MAP_PLANE_EMPTY_VALUES.get(name, 0)
+                agent_planes[:, xs, ys] = np.where(
+                    tile_visible, self.planes[name][tile_ids], empty_value
+                )
+            return out
+
+        num_agents = visible.shape[0]
+        if out is None:
+            if compact:
+                out = {
+                    name: np.empty(visible.shape, dtype=MAP_PLANE_COMPACT_DTYPES[name])
+                    for name in feature_names
+                }
+            else:
+                out = np.empty(
+                    (num_agents, self.width, self.height, len(feature_names)),
+                    dtype=np.float32,
+                )
+
+        for i, name in enumerate(feature_names):
+            agent_planes = out[name] if compact else out[..., i]
+            plane = self.planes[name].reshape(self.width, self.height)
+            # (plane - empty) * visible + empty, much faster than a masked copy
+            empty_value = MAP_PLANE_EMPTY_VALUES.get(name, 0)
+            if empty_value:
+                plane = plane - empty_value
+            np.multiply(plane, visible, out=agent_planes, casting="unsafe")
+            if empty_value:
+                np.add(agent_planes, empty_value, out=agent_planes, casting="unsafe")
+        return out
+
+    def get_window_observation(
+        self, feature_names, centers, window_size, out=None, compact=False, masked=False
+    ):
+        """
+        Square window of the map planes around every center, parts outside the map
+        hold the empty value of the plane, see MAP_PLANE_EMPTY_VALUES, or 0.
+
+        The planes are copied into padded buffers once, the windows of all centers are
+        then gathered with one index into a strided window view of each buffer.
+
+        :param feature_names: names of the observed map planes, keys of Map.planes
+        :param centers: int array (agents, 2) with the x, y center of every window
+        :param window_size: width and height of the windows
+        :param out: optional array of shape (agents, window_size, window_size, len(feature_names)) to fill,
+            for compact observations a dict name -> (agents, window_size, window_size) array
+        :param compact: return a dict with one plane per feature in the dtype of
+            MAP_PLANE_COMPACT_DTYPES instead of one float32 array
+        :param masked: fill tiles the agent of a window can not see like tiles outside the map,
+            windows are in agent id order then
+        :return: the observation, out if given
+        """
+        num_agents = len(centers)
+        window_shape = (num_agents, window_size, window_size)
+        if out is None:
+            if compact:
+                out = {
+                    name: np.empty(window_shape, dtype=MAP_PLANE_COMPACT_DTYPES[name])
+                    for name in feature_names
+                }
+            else:
+                out = np.empty(window_shape + (len(feature_names),), dtype=np.float32)
+
+        # window of center c starts at c in the padded buffers
+        xs = centers[:, 0]
+        ys = centers[:, 1]
+        if masked:
+            visible_windows = self.get_visibility_windows(centers, window_size)
+
+        for i, name in enumerate(feature_names):
+            agent_windows = out[name] if compact else out[..., i]
+            empty_value = MAP_PLANE_EMPTY_VALUES.get(name, 0)
+            padded = self._padded_plane(name, window_size, empty_value)
+            windows = np.lib.stride_tricks.sliding_window_view(
+                padded, (window_size, window_size)
+            )
+            np.copyto(agent_windows, windows[xs, ys], casting="unsafe")
+            if masked:
+                agent_windows[~visible_windows] = empty_value
+        return out
+
+    def get_visibility_windows(self, centers, window_size):
+        """
+        Window of every agents visibility around its center, False outside the map.
+        Only the bits of the windows are extracted, the whole map is never unpacked.
+
+        :param centers: int array (agents, 2) with the x, y center of every window, in agent id order
+        :param window_size: width and height of the windows
+        :return: bool array (agents, window_size, window_size)
+        """
+        padded = self._padded_plane("visibility", window_size, 0)
+        windows = np.lib.stride_tricks.sliding_window_view(
+            padded, (window_size, window_size)
+        )[centers[:, 0], centers[:, 1]]
+        agent_ids = np.arange(len(centers))[:, None, None]
+        return (windows >> agent_ids) & 1 == 1
+
+    def _padded_plane(self, name, window_size, empty_value):
+        """
+        Plane copied into a buffer padded with window_size // 2 empty tiles before and
+        window_size - 1 - window_size // 2 after it on both axes.
+        The buffer is kept, only the inner part is overwritten on later calls.
+        """
+        before = window_size // 2
+        key = (name, window_size)
+        padded = self._padded_planes.get(key)
+        if padded is None:
+            plane = self.planes[name]
+            padded = np.full(
+                (self.width + window_size - 1, self.height + window_size - 1),
+                empty_value,
+                dtype=plane.dtype,
+            )
+            self._padded_planes[key] = padded
+
+        np.copyto(
+            padded[before : before + self.width, before : before + self.height],
+            self.planes[name].reshape(self.width, self.height),
         )
+        return padded
 
-        map_features[0] = self.landtype_map
-        map_features[1] = self.resources_map
-        map_features[2] = self.ownership_map
-        map_features[3] = self.building_map
-        map_features[4] = self.unit_strength_map
+    def get_packed_visibility(self, num_agents, out=None, tile_ids=None):
+        """
+        Visibility of every agent as bit packed plane, see np.packbits.
+        Bit y % 8 (most significant first) of out[agent_id, x, y // 8] is set if the agent sees tile (x, y).
 
-        return map_info, self.visibility_map
+        :param num_agents: number of agents to unpack the visibility bitmasks for
+        :param out: optional uint8 array of shape (num_agents, width, ceil(height / 8)) to fill
+        :param tile_ids: int array of the tile ids to refresh in out, None for all tiles
+        :return: the packed visibility, out if given
+        """
+        if tile_ids is not None:
+            # repack the bytes holding the changed tiles, each byte covers 8 tiles of a column
+            xs, ys = np.divmod(tile_ids, self.height)
+            byte_ids = np.unique(xs * out.shape[-1] + ys // 8)
+            xs, bytes_y = np.divmod(byte_ids, out.shape[-1])
+            ys = bytes_y[:, None] * 8 + np.arange(8)
+            on_map = ys < self.height
+            masks = np.where(
+                on_map,
+                self.visibility_map[xs[:, None], np.minimum(ys, self.height - 1)],
+                0,
+            )
+            agent_ids = np.arange(num_agents)[:, None, None]
+            bits = ((masks >> agent_ids) & 1).astype(np.uint8)
+            out[:, xs, bytes_y] = np.packbits(bits, axis=-1)[..., 0]
+            return out
+
+        if out is None:
+            out = np.empty(
+                (num_agents, self.width, (self.height + 7) // 8), dtype=np.uint8
+            )
+
+        # unpack all agents at once, then pack the planes of all agents in one call
+        visible = self.get_visibility_planes(num_agents)
+        np.copyto(out, np.packbits(visible, axis=-1))
+        return out
 
     def claim_tile(self, agent: Agent, position: MapPosition) -> None:
         """
@@ -109,8 +598,22 @@ class Map:
         :param agent:
         :return:
         """
-        self.squares[position.x][position.y].set_owner(agent)
-        self.ownership_map[(position.x, position.y)] = agent.id
+        self.ownership_map[position.x, position.y] = agent.id
+        self.owner_colors[agent.id] = agent.color
+        self.tile_changed(self.tile_index(position))
+
+    def claim_tiles(self, agents, tile_ids: np.ndarray) -> None:
+        """
+        Claim every tile in tile_ids for the agent at the same index in agents.
+        """
+        agent_ids = np.fromiter(
+            (agent.id for agent in agents), dtype=np.int64, count=len(agents)
+        )
+        self.planes["tile_ownership"][tile_ids] = agent_ids
+        for agent in dict.fromkeys(agents):
+            self.owner_colors[agent.id] = agent.color
+        for changed in self._change_trackers:
+            changed.update(np.asarray(tile_ids).tolist())
 
     def unclaim_tile(self, position: MapPosition) -> None:
         """
@@ -118,23 +621,25 @@ class Map:
         :param position:
         :return:
         """
-        self.squares[position.x][position.y].set_owner(None, default=True)
-        self.ownership_map[(position.x, position.y)] = OWNER_DEFAULT_TILE
+        self.ownership_map[position.x, position.y] = OWNER_DEFAULT_TILE
+        self.tile_changed(self.tile_index(position))
 
     def add_building(self, building_object, position: MapPosition) -> None:
-        self.get_tile(position).add_building(building_object)
-        self.building_map[position.x][
-            position.y
-        ] = building_object.get_building_type_id()
+        self.set_building_object(self.tile_index(position), building_object)
 
     def add_unit(self, unit, position: MapPosition) -> None:
-        self.get_tile(position).unit = unit
-        self.unit_strength_map[position.x][position.y] = unit.strength
+        self.set_unit_object(self.tile_index(position), unit)
 
     def remove_unit(self, position: MapPosition) -> None:
-        tile = self.get_tile(position)
-        tile.unit = None
-        self.unit_strength_map[position.x][position.y] = 0
+        self.set_unit_object(self.tile_index(position), None)
+
+    def set_unit_strength(self, position: MapPosition, strength: int) -> None:
+        self.unit_strength_map[position.x, position.y] = max(0, strength)
+        self.tile_changed(self.tile_index(position))
+
+    def set_building_health(self, position: MapPosition, health: int) -> None:
+        self.health_map[position.x, position.y] = max(0, health)
+        self.tile_changed(self.tile_index(position))
 
     def remove_building(
         self,
@@ -145,32 +650,15 @@ class Map:
         tile.remove_building(building_type)
         tile.update(self.env)
         self.trigger_surrounding_tile_update(position, 1)
-        self.building_map[position.x][position.y] = 0
-
-    def draw(self, screen, zoom_level, pan_x, pan_y):
-        """
-        Draw the map on the screen
-        :param screen:
-        :param zoom_level:
-        :param pan_x:
-        :param pan_y:
-        :return:
-        """
-        for row in self.squares:
-            for square in row:
-                new_x = (square.position.x * zoom_level) + pan_x
-                new_y = (square.position.x * zoom_level) + pan_y
-                new_size = self.tile_size * zoom_level
-                square.draw(screen, self.tile_size, new_x, new_y, new_size)
 
-    def get_tile(self, position: MapPosition) -> Map_Square | None:
+    def get_tile(self, position: MapPosition) -> TileView | None:
         """
         Get the tile at position x, y
         :param position:
-        :return: Map_Square object or None if position is not on the map
+        :return: TileView on the tile or None if position is not on the map
         """
         if self.check_position_on_map(position):
-            return self.squares[position.x][position.y]
+            return TileView(self, position.x, position.y)
         return None
 
     def tile_is_next_to_own_tile(
@@ -180,11 +668,10 @@ class Map:
         radius: int = 1,
         diagonal: bool = True,
     ):
-        surrounding_tiles = self.get_surrounding_tiles(position, radius, diagonal)
-        for tile in surrounding_tiles:
-            if tile.get_owner() == agent_id:
-                return True, tile
-        return False, None
+        tile_ids = self.get_surrounding_tile_ids(position, radius, diagonal)
+        return self._first_tile(
+            tile_ids[self.planes["tile_ownership"][tile_ids] == agent_id]
+        )
 
     def tile_is_next_to_building_type(
         self,
@@ -194,22 +681,158 @@ class Map:
         diagonal: bool = True,
     ):
         # check if any of the neighbouring tiles in radius have a building of the given type
-        surroundings = self.get_surrounding_tiles(position, radius, diagonal)
+        building_id = BUILDING_IDS[building_type]
+        if self.check_position_on_map(position):
+            counts = self.adjacency_counts(radius, diagonal)
+            if counts[building_id, self.tile_index(position)] == 0:
+                return False, None
 
-        for tile in surroundings:
-            if tile.has_building(building_type):
-                return True, tile
-        return False, None
+        tile_ids = self.get_surrounding_tile_ids(position, radius, diagonal)
+        return self._first_tile(
+            tile_ids[self.planes["buildings"][tile_ids] == building_id]
+        )
 
     def tile_is_next_to_any_building(
         self, position: MapPosition, radius: int = 1, diagonal: bool = True
     ):
-        # check if any of the neighbouring tiles in radius have a building of the given type
-        surroundings = self.get_surrounding_tiles(position, radius, diagonal)
-        for tile in surroundings:
-            if tile.has_any_building():
-                return True, tile
-        return False, None
+        # check if any of the neighbouring tiles in radius have a building
+        if self.check_position_on_map(position):
+            counts = self.adjacency_counts(radius, diagonal)
+            if not counts[:, self.tile_index(position)].any():
+                return False, None
+
+        tile_ids = self.get_surrounding_tile_ids(position, radius, diagonal)
+        return self._first_tile(
+            tile_ids[self.planes["buildings"][tile_ids] != NO_BUILDING]
+        )
+
+    def count_buildings_nearby(
+        self,
+        position: MapPosition,
+        building_type,
+        radius: int = 1,
+        diagonal: bool = True,
+    ) -> int:
+        """
+        Number of buildings of the type within radius of position, position excluded.
+        """
+        if not self.check_position_on_map(position):
+            tile_ids = self.get_surrounding_tile_ids(position, radius, diagonal)
+            building_id = BUILDING_IDS[building_type]
+            return int(
+                np.count_nonzero(self.planes["buildings"][tile_ids] == building_id)
+            )
+
+        counts = self.adjacency_counts(radius, diagonal)
+        return int(counts[BUILDING_IDS[building_type], self.tile_index(position)])
+
+    def building_nearby_mask(
+        self, building_type, radius: int = 1, diagonal: bool = True
+    ) -> np.ndarray:
+        """
+        (width, height) bool mask of the tiles with a building of the type within radius.
+        """
+        counts = self.adjacency_counts(radius, diagonal)
+        building_id = BUILDING_IDS[building_type]
+        return (counts[building_id] > 0).reshape(self.width, self.height)
+
+    def adjacency_counts(self, radius: int, diagonal: bool = True) -> np.ndarray:
+        """
+        (building types, tiles) number of buildings of every type, by building id, within
+        radius of every tile, the tile itself excluded.
+
+        The counts are built from the building plane on the first call for a radius
+        and neighbourhood, afterwards every added or removed building updates the
+        counts of its own neighbourhood.
+        """
+        counts = self._adjacency_counts.get((radius, diagonal))
+        if counts is not None:
+            return counts
+
+        counts = np.zeros((len(BUILDING_IDS), self.tiles), dtype=np.int32)
+        building_tiles = np.flatnonzero(self.planes["buildings"] != NO_BUILDING)
+        if radius >= 1 and len(building_tiles):
+            neighbour_ids = self.neighbour_tile_ids(building_tiles, radius, diagonal)
+            type_ids = np.broadcast_to(
+                self.planes["buildings"][building_tiles][:, None], neighbour_ids.shape
+            )
+            on_map = neighbour_ids >= 0
+            np.add.at(counts, (type_ids[on_map], neighbour_ids[on_map]), 1)
+
+        self._adjacency_counts[(radius, diagonal)] = counts
+        return counts
+
+    def city_counts(self, radius: int) -> np.ndarray:
+        """
+        (width, height) number of cities within the Chebyshev radius of every tile,
+        a city on the tile itself included.
+
+        Built with a summed area table of the cities on the first call for a radius,
+        afterwards every added or removed city adds to the square around it.
+        """
+        counts = self._city_counts.get(radius)
+        if counts is not None:
+            return counts
+
+        cities = self.building_map == BUILDING_IDS[BuildingType.CITY]
+        table = np.zeros((self.width + 1, self.height + 1), dtype=np.int32)
+        np.cumsum(np.cumsum(cities, axis=0), axis=1, out=table[1:, 1:])
+        x0 = np.clip(np.arange(self.width) - radius, 0, self.width)
+        x1 = np.clip(np.arange(self.width) + radius + 1, 0, self.width)
+        y0 = np.clip(np.arange(self.height) - radius, 0, self.height)
+        y1 = np.clip(np.arange(self.height) + radius + 1, 0, self.height)
+        counts = (
+            table[x1][:, y1] - table[x0][:, y1] - table[x1][:, y0] + table[x0][:, y0]
+        )
+
+        self._city_counts[radius] = counts
+        return counts
+
+    def city_nearby(self, position: MapPosition, radius: int) -> bool:
+        """
+        True if another city is within the Chebyshev radius of position.
+        """
+        if not self.check_position_on_map(position):
+            return self.tile_is_next_to_building_type(
+                position, BuildingType.CITY, radius=radius
+            )[0]
+        cities = self.city_counts(radius)[position.x, position.y]
+        if self.building_map[position.x, position.y] == BUILDING_IDS[BuildingType.CITY]:
+            cities -= 1
+        return bool(cities > 0)
+
+    def city_site_mask(self, radius: int) -> np.ndarray:
+        """
+        (width, height) bool mask of the tiles without a city within the Chebyshev radius.
+        """
+        return self.city_counts(radius) == 0
+
+    def _update_city_counts(self, x, y, change):
+        for radius, counts in self._city_counts.items():
+            counts[
+                max(x - radius, 0) : x + radius + 1, max(y - radius, 0) : y + radius + 1
+            ] += change
+
+    def _update_adjacency_counts(self, x, y, old_type_id, new_type_id):
+        """
+        Move the building on tile x, y from old to new type in all adjacency counts.
+        """
+        position = MapPosition(x, y)
+        for (radius, diagonal), counts in self._adjacency_counts.items():
+            tile_ids = self.get_surrounding_tile_ids(position, radius, diagonal)
+            if old_type_id != NO_BUILDING:
+                counts[old_type_id, tile_ids] -= 1
+            if new_type_id != NO_BUILDING:
+                counts[new_type_id, tile_ids] += 1
+
+    def _first_tile(self, tile_ids):
+        """
+        (True, view on the first tile) if tile_ids is not empty, else (False, None).
+        """
+        if len(tile_ids) == 0:
+            return False, None
+        x, y = divmod(int(tile_ids[0]), self.height)
+        return True, TileView(self, x, y)
 
     def check_position_on_map(self, position: MapPosition) -> bool:
         """
@@ -226,45 +849,120 @@ class Map:
     def get_surrounding_tiles(
         self, position: MapPosition, radius: int, diagonal: bool = True
     ):
+        """
+        Tile views of the tiles around position, see get_surrounding_tile_ids.
+        """
+        return [
+            TileView(self, tile_id // self.height, tile_id % self.height)
+            for tile_id in self.get_surrounding_tile_ids(
+                position, radius, diagonal
+            ).tolist()
+        ]
+
+    def get_surrounding_tile_ids(
+        self, position: MapPosition, radius: int, diagonal: bool = True
+    ) -> np.ndarray:
+        """
+        Ids of the tiles within radius of position that are on the map.
+
+        For positions on the map the ids are gathered with one index from the tile ids
+        padded by radius, padding tiles hold -1 and are dropped.
+
+        :param radius: Chebyshev radius of the neighbourhood, the center is excluded
+        :param diagonal: the full square around position, else only the tiles in the
+            same row and column
+        :return: int array of tile ids, x * height + y
+        """
         if radius < 1:
-            return []
+            return np.empty(0, dtype=np.int64)
 
         x = position.x
         y = position.y
-        surrounding_tiles = []
-
-        if not diagonal:
-            for i in range(-radius, radius + 1):
-                if i != 0:
-                    tmp_pos = MapPosition(x + i, y)
-                    if self.check_position_on_map(tmp_pos):
-                        surrounding_tiles.append(self.get_tile(tmp_pos))
-
-            for j in range(-radius, radius + 1):
-                if j != 0:
-                    tmp_pos = MapPosition(x, y + j)
-                    if self.check_position_on_map(tmp_pos):
-                        surrounding_tiles.append(self.get_tile(tmp_pos))
-        else:
-            for i in range(-radius, radius + 1):
-                for j in range(-radius, radius + 1):
-                    # Skip the center tile
-                    if i == 0 and j == 0:
-                        continue
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            dx, dy = neighbour_offsets(radius, diagonal)
+            xs = x + dx
+            ys = y + dy
+            on_map = (0 <= xs) & (xs < self.width) & (0 <= ys) & (ys < self.height)
+            return xs[on_map] * self.height + ys[on_map]
+
+        padded_ids, stencil = self._neighbour_stencil(radius, diagonal)
+        center = (x + radius) * (self.height + 2 * radius) + y + radius
+        tile_ids = padded_ids[center + stencil]
+        return tile_ids[tile_ids >= 0]
+
+    def neighbour_tile_ids(
+        self, tile_ids: np.ndarray, radius: int, diagonal: bool = True
+    ) -> np.ndarray:
+        """
+        (tiles, neighbours) ids of the tiles around every tile in tile_ids, in the order
+        of get_surrounding_tile_ids. Neighbours off the map hold -1.
 
-                    tmp_pos = MapPosition(x + i, y + j)
-                    if self.check_position_on_map(tmp_pos):
-                        surrounding_tiles.append(self.get_tile(tmp_pos))
-        return surrounding_tiles
+        :param tile_ids: int array of the ids of tiles on the map
+        """
+        padded_ids, stencil = self._neighbour_stencil(radius, diagonal)
+        xs, ys = np.divmod(np.asarray(tile_ids, dtype=np.int64), self.height)
+        centers = (xs + radius) * (self.height + 2 * radius) + ys + radius
+        return padded_ids[centers[:, None] + stencil]
+
+    def _neighbour_stencil(self, radius: int, diagonal: bool):
+        """
+        Flat tile ids padded by radius and the offsets of the neighbourhood into them.
+        """
+        stencil = self._neighbour_stencils.get((radius, diagonal))
+        if stencil is None:
+            padded_ids = self._padded_tile_ids.get(radius)
+            if padded_ids is None:
+                padded_ids = np.full(
+                    (self.width + 2 * radius, self.height + 2 * radius),
+                    -1,
+                    dtype=np.int64,
+                )
+                padded_ids[radius:-radius, radius:-radius] = np.arange(
+                    self.tiles
+                ).reshape(self.width, self.height)
+                padded_ids = padded_ids.reshape(-1)
+                self._padded_tile_ids[radius] = padded_ids
+
+            dx, dy = neighbour_offsets(radius, diagonal)
+            stencil = (padded_ids, dx * (self.height + 2 * radius) + dy)
+            self._neighbour_stencils[(radius, diagonal)] = stencil
+        return stencil
 
     # visibility stuff #
     def set_visible(self, position: MapPosition, agent_id: int):
         if check_valid_agent_id(agent_id):
-            self.visibility_map[(position.x, position.y)] |= 1 << agent_id
+            bit = 1 << agent_id
+            if not self.visibility_map[(position.x, position.y)] & bit:
+                self.visibility_map[(position.x, position.y)] |= bit
+                self.tile_changed(self.tile_index(position))
+
+    def set_visible_area(self, position: MapPosition, radius: int, agent_id: int):
+        """
+        Make every tile within radius of position, the square around it, visible to the agent.
+        """
+        if not check_valid_agent_id(agent_id):
+            return
+        x0 = max(position.x - radius, 0)
+        x1 = min(position.x + radius + 1, self.width)
+        y0 = max(position.y - radius, 0)
+        y1 = min(position.y + radius + 1, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        area = self.visibility_map[x0:x1, y0:y1]
+        bit = np.int64(1) << agent_id
+        if self._change_trackers:
+            xs, ys = np.nonzero((area & bit) == 0)
+            for tile_id in ((xs + x0) * self.height + ys + y0).tolist():
+                self.tile_changed(tile_id)
+        area |= bit
 
     def clear_visible(self, position: MapPosition, agent_id: int):
         if check_valid_agent_id(agent_id):
-            self.visibility_map[(position.x, position.y)] &= ~(1 << agent_id)
+            bit = 1 << agent_id
+            if self.visibility_map[(position.x, position.y)] & bit:
+                self.visibility_map[(position.x, position.y)] &= ~bit
+                self.tile_changed(self.tile_index(position))
 
     def is_visible(self, position: MapPosition, agent_id: int) -> bool:
         """
@@ -0,0 +1,113 @@
+import json
+import os
+
+import numpy as np
+
+# file names inside a map library directory
+LIBRARY_DATA_FILE = "maps.npy"
+LIBRARY_INDEX_FILE = "index.json"
+LIBRARY_FORMAT_VERSION = 1
+
+# land types and resources both fit into int8
+LIBRARY_DTYPE = np.int8
+
+
+def create_map_library(path, map_settings_list, height, width):
+    """
+    Create an empty map library on disk.
+
+    Writes the index file and allocates the data file, the maps themselves are
+    filled in afterwards through open_map_library_for_writing.
+
+    Args:
+        path: directory of the library
+        map_settings_list: list with the generation settings of every map
+        height: height of every map
+        width: width of every map
+    """
+    os.makedirs(path, exist_ok=True)
+    num_maps = len(map_settings_list)
+
+    index = {
+        "format_version": LIBRARY_FORMAT_VERSION,
+        "num_maps": num_maps,
+        "height": height,
+        "width": width,
+        "dtype": np.dtype(LIBRARY_DTYPE).name,
+        "maps": map_settings_list,
+    }
+    with open(os.path.join(path, LIBRARY_INDEX_FILE), "w") as file:
+        json.dump(index, file, indent=2)
+
+    data = np.lib.format.open_memmap(
+        os.path.join(path, LIBRARY_DATA_FILE),
+        mode="w+",
+        dtype=LIBRARY_DTYPE,
+        shape=(num_maps, height, width, 2),
+    )
+    data.flush()
+    del data
+
+
+def open_map_library_for_writing(path):
+    """
+    Memory map the data file of an existing library for writing.
+    Every process can write its own slice of maps without touching the others.
+    """
+    return np.load(
+        os.path.join(path, LIBRARY_DATA_FILE), mmap_mode="r+", allow_pickle=False
+    )
+
+
+class MapLibrary:
+    """
+    Read only collection of map topologies stored in one memory mapped file.
+
+    The data file holds all topologies as one (n_maps, height, width, 2) array,
+    index.json next to it holds the shape and the generation settings per map.
+    Maps are read from the page cache on access, so many environments can share
+    one library without loading it into memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(os.path.join(path, LIBRARY_INDEX_FILE), "r") as file:
+            index = json.load(file)
+        if index.get("format_version") != LIBRARY_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported map library format {index.get('format_version')} in {path}"
+            )
+
+        self.maps = np.load(
+            os.path.join(path, LIBRARY_DATA_FILE), mmap_mode="r", allow_pickle=False
+        )
+        expected_shape = (index["num_maps"], index["height"], index["width"], 2)
+        if self.maps.shape != expected_shape:
+            raise ValueError(
+                f"Map library data has shape {self.maps.shape}, index expects {expected_shape}"
+            )
+        if self.maps.dtype != np.dtype(index["dtype"]):
+            raise ValueError(
+                f"Map library data has dtype {self.maps.dtype}, index expects {index['dtype']}"
+            )
+
+        self.height = index["height"]
+        self.width = index["width"]
+        self.map_settings = index["maps"]
+
+    def __len__(self):
+        return self.maps.shape[0]
+
+    def __getitem__(self, map_index):
+        """
+        Topology array (height, width, 2) of one map, a view into the memory map.
+        """
+        if not 0 <= map_index < len(self):
+            raise IndexError(
+                f"Map index {map_index} out of range for library with {len(self)} maps"
+            )
+        return self.maps[map_index]
+
+    def get_settings(self, map_index):
+        return self.map_settings[map_index]
@@ -0,0 +1,106 @@
+import queue
+import threading
+from collections import deque
+
+import numpy as np
+
+from strategyRLEnv.map.mapGenerator import (create_topologies,
+                                            generation_batch_size,
+                                            get_generation_parameters)
+
+
+class MapPool:
+    """
+    Bounded pool of pre generated map topologies, refilled by a background thread.
+
+    get hands out a topology without generating it on the spot. Fresh topologies
+    are preferred, with max_uses > 1 every topology is recycled until it was
+    handed out max_uses times. If neither a fresh nor a recycled topology is
+    available, get waits for the refill thread and counts a miss.
+
+    Attributes:
+        size: maximal number of fresh topologies kept in the pool.
+        max_uses: how often one topology is handed out, 1 hands out fresh topologies only.
+        hits: topologies taken fresh from the pool.
+        recycled: topologies handed out again.
+        misses: calls of get that had to wait for the refill thread.
+        generated: topologies generated by the refill thread.
+    """
+
+    def __init__(self, map_settings, size=8, max_uses=1, seed=None):
+        if size < 1:
+            raise ValueError("map pool size should be at least 1")
+        if max_uses < 1:
+            raise ValueError("map pool max_uses should be at least 1")
+
+        self.size = size
+        self.max_uses = max_uses
+        self.parameters = get_generation_parameters(map_settings)
+        self.batch_size = min(
+            size,
+            generation_batch_size(self.parameters["width"], self.parameters["height"]),
+        )
+
+        self.hits = 0
+        self.recycled = 0
+        self.misses = 0
+        self.generated = 0
+
+        self._fresh = queue.Queue(maxsize=size)
+        # (topology, times handed out), oldest first
+        self._recycle = deque(maxlen=size)
+        self._rng = np.random.default_rng(seed)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._refill, daemon=True)
+        self._thread.start()
+
+    def _refill(self):
+        while not self._stop.is_set():
+            topologies = create_topologies(
+                self.batch_size, **self.parameters, rng=self._rng
+            )
+            for topology in topologies:
+                while not self._stop.is_set():
+                    try:
+                        self._fresh.put(topology, timeout=0.1)
+                        self.generated += 1
+                        break
+                    except queue.Full:
+                        continue
+
+    def get(self):
+        """
+        Topology array (height, width, 2) for the next map.
+        """
+        try:
+            topology = self._fresh.get_nowait()
+            uses = 0
+            self.hits += 1
+        except queue.Empty:
+            if self._recycle:
+                topology, uses = self._recycle.popleft()
+                self.recycled += 1
+            else:
+                self.misses += 1
+                topology = self._wait_for_topology()
+                uses = 0
+
+        uses += 1
+        if uses < self.max_uses:
+            self._recycle.append((topology, uses))
+        return topology
+
+    def _wait_for_topology(self):
+        while True:
+            try:
+                return self._fresh.get(timeout=0.1)
+            except queue.Empty:
+                if not self._thread.is_alive():
+                    raise RuntimeError("map pool refill thread is not running")
+
+    def close(self):
+        """
+        Stop the refill thread.
+        """
+        self._stop.set()
+        self._thread.join()
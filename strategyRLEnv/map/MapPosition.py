@@ -1,4 +1,13 @@
-class MapPosition:
-    def __init__(self, x: int, y: int):
-        self.x = x
-        self.y = y
+from typing import NamedTuple
+
+
+class MapPosition(NamedTuple):
+    """
+    Immutable position of a tile, positions with the same coordinates are equal
+    and hash equal, so they can be used in sets and as dict keys.
+
+    Maps hand out interned instances, see Map.position.
+    """
+
+    x: int
+    y: int
@@ -1,7 +1,5 @@
 from typing import Tuple
 
-import pygame
-
 from strategyRLEnv.map.map_settings import (COLOR_DEFAULT_BORDER,
                                             OWNER_DEFAULT_TILE, BuildingType,
                                             LandType, ResourceType,
@@ -147,81 +145,6 @@ class Map_Square:
             return True
         return False
 
-    # drawing stuff #
-    def draw(
-        self, screen, square_size: int, new_x: int, new_y: int, new_square_size: int
-    ):
-        """
-        Draw the square on the screen
-        :param screen:
-        :param square_size:
-        :param new_x:
-        :param new_y:
-        :param new_square_size:
-        :return:
-        """
-
-        pygame.draw.rect(
-            screen,
-            self.land_type_color,
-            (
-                self.position.x * square_size,
-                self.position.y * square_size,
-                square_size,
-                square_size,
-            ),
-        )
-        grain_color = (255, 255, 0)
-        metal_color = (192, 192, 192)
-        if self.resource != ResourceType.NONE:
-            if self.resource == ResourceType.GRAIN:
-                resource_color = grain_color
-
-            elif self.resource == ResourceType.METAL:
-                resource_color = metal_color
-
-            pygame.draw.line(
-                screen,
-                resource_color,
-                (
-                    self.position.x * square_size + square_size * 0.3,
-                    self.position.y * square_size + square_size,
-                ),
-                (
-                    self.position.x * square_size + square_size * 0.3,
-                    self.position.y * square_size + square_size / 2,
-                ),
-            )
-
-            pygame.draw.line(
-                screen,
-                resource_color,
-                (
-                    self.position.x * square_size + square_size * 0.6,
-                    self.position.y * square_size,
-                ),
-                (
-                    self.position.x * square_size + square_size * 0.6,
-                    self.position.y * square_size + square_size / 2,
-                ),
-            )
-
-        if self.owner_color != COLOR_DEFAULT_BORDER:
-            pygame.draw.rect(
-                screen,
-                self.owner_color,
-                (
-                    self.position.x * square_size,
-                    self.position.y * square_size,
-                    square_size,
-                    square_size,
-                ),
-                1,
-            )
-
-        if self.building is not None:
-            self.building.draw(screen, square_size, self.owner_color)
-
     # observation stuff #
     def get_full_info(self):
         # these are the features the agent can observe
@@ -0,0 +1,142 @@
+from strategyRLEnv.map.map_settings import (COLOR_DEFAULT_BORDER,
+                                            OWNER_DEFAULT_TILE, LandType,
+                                            ResourceType, land_type_color)
+from strategyRLEnv.map.MapPosition import MapPosition
+from strategyRLEnv.map.MapSquare import Map_Square
+
+
+class TileView(Map_Square):
+    """
+    Lightweight view on a single tile of an array backed Map.
+
+    The view owns no state, every attribute reads from and writes to the
+    per-tile arrays of the map, so views can be created on demand and thrown
+    away again. It exposes the same interface as Map_Square, which lets
+    actions and objects keep working on single tiles.
+    """
+
+    default_border_color = COLOR_DEFAULT_BORDER
+    default_color = land_type_color(LandType.LAND)
+
+    def __init__(self, map_object, x: int, y: int):
+        # deliberately no super().__init__, all state lives in the map arrays
+        self._map = map_object
+        self._x = x
+        self._y = y
+        self._idx = x * map_object.height + y
+
+    # coordinates and ids
+    @property
+    def tile_id(self) -> int:
+        return self._idx
+
+    @property
+    def position(self) -> MapPosition:
+        return self._map.position(self._x, self._y)
+
+    # land properties
+    @property
+    def land_type(self) -> LandType:
+        return LandType(int(self._map.landtype_map[self._x, self._y]))
+
+    @land_type.setter
+    def land_type(self, land_value: LandType):
+        self._map.landtype_map[self._x, self._y] = land_value.value
+        self._map.tile_changed(self._idx)
+
+    @property
+    def land_type_color(self):
+        return land_type_color(self.land_type)
+
+    def set_land_type(self, land_value: LandType):
+        self.land_type = land_value
+
+    @property
+    def resource(self) -> ResourceType:
+        return ResourceType(int(self._map.resources_map[self._x, self._y]))
+
+    @resource.setter
+    def resource(self, resource_type: ResourceType):
+        self._map.resources_map[self._x, self._y] = resource_type.value
+        self._map.tile_changed(self._idx)
+
+    @property
+    def resources(self):
+        resource = self.resource
+        if resource == ResourceType.NONE:
+            return []
+        return [resource]
+
+    # owner specific
+    @property
+    def owner_id(self) -> int:
+        return int(self._map.ownership_map[self._x, self._y])
+
+    @owner_id.setter
+    def owner_id(self, owner_id: int):
+        self._map.ownership_map[self._x, self._y] = owner_id
+        self._map.tile_changed(self._idx)
+
+    @property
+    def owner_color(self):
+        return self._map.owner_colors.get(self.owner_id, COLOR_DEFAULT_BORDER)
+
+    def set_owner(self, agent, default=False):
+        if default:
+            self.owner_id = OWNER_DEFAULT_TILE
+        else:
+            self.owner_id = agent.id
+            self._map.owner_colors[agent.id] = agent.color
+
+    @property
+    def visibility_bitmask(self) -> int:
+        return int(self._map.visibility_map[self._x, self._y])
+
+    @visibility_bitmask.setter
+    def visibility_bitmask(self, bitmask: int):
+        self._map.visibility_map[self._x, self._y] = bitmask
+        self._map.tile_changed(self._idx)
+
+    # income
+    @property
+    def _land_money_value(self):
+        return self._map.land_money_value_map[self._x, self._y].item()
+
+    @_land_money_value.setter
+    def _land_money_value(self, value):
+        self._map.land_money_value_map[self._x, self._y] = value
+        self._map.tile_changed(self._idx)
+
+    @property
+    def tile_income(self):
+        return self._map.tile_income_map[self._x, self._y].item()
+
+    @tile_income.setter
+    def tile_income(self, value):
+        self._map.tile_income_map[self._x, self._y] = value
+        self._map.tile_changed(self._idx)
+
+    # objects on the tile
+    @property
+    def building(self):
+        return self._map.building_objects.get(self._idx)
+
+    @building.setter
+    def building(self, building):
+        self._map.set_building_object(self._idx, building)
+
+    @property
+    def unit(self):
+        return self._map.unit_objects.get(self._idx)
+
+    @unit.setter
+    def unit(self, unit):
+        self._map.set_unit_object(self._idx, unit)
+
+    def __eq__(self, other):
+        if isinstance(other, TileView):
+            return self._map is other._map and self._idx == other._idx
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self._map), self._idx))
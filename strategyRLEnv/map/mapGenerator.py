@@ -1,181 +1,307 @@
-import math
-import os
 import pickle
-import random
-import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import numpy as np
 
 from strategyRLEnv.map.Map import Map
 from strategyRLEnv.map.map_settings import LandType, ResourceType
-from strategyRLEnv.map.MapAgent import Map_Agent
-from strategyRLEnv.map.MapPosition import MapPosition
-from strategyRLEnv.map.MapSquare import Map_Square
+from strategyRLEnv.map.MapLibrary import (create_map_library,
+                                          open_map_library_for_writing)
 
 
 def topology_to_map(topology_array):
-    # Convert the topology array to a map
+    # Convert the topology array to a map, the Map takes over the whole arrays
+    return Map(topology_array)
 
-    created_map = Map(topology_array)
-    created_map.width = len(topology_array[0])
-    created_map.height = len(topology_array)
-    created_map.tiles = created_map.height * created_map.width
 
-    squares = [
-        [None for _ in range(created_map.height)] for _ in range(created_map.width)
-    ]
-
-    # Create map squares
-    for x_index in range(created_map.width):
-        for y_index in range(created_map.height):
-            square = Map_Square(
-                y_index * created_map.width + x_index, MapPosition(x_index, y_index)
-            )
-            square.set_land_type(LandType(topology_array[y_index][x_index][0]))
-            square.add_resource(ResourceType(topology_array[y_index][x_index][1]))
-            squares[x_index][y_index] = square
-
-    created_map.squares = squares
-    created_map.reset()
-
-    return created_map
-
-
-def generate_finished_map(connected_env, map_settings=None, path_to_map_file=None):
-    if path_to_map_file:
+def generate_finished_map(
+    connected_env, map_settings=None, path_to_map_file=None, topology_array=None
+):
+    if topology_array is not None:
+        # e.g. a map of a MapLibrary, the Map copies the tiles it needs
+        finished_map = topology_to_map(topology_array)
+        height = finished_map.height
+        width = finished_map.width
+    elif path_to_map_file:
         with open(path_to_map_file, "rb") as file:
             map_array = pickle.load(file)
-        height = len(map_array)
-        width = len(map_array[0])
         finished_map = topology_to_map(map_array)
+        height = finished_map.height
+        width = finished_map.width
     else:
         if not map_settings:
             raise ValueError("No map settings or path to map file provided")
-        width = map_settings.get("map_width", 100)
-        height = map_settings.get("map_height", 100)
-
-        water_percentage = map_settings.get("water_budget_per_agent", 0.3)
-        mountain_percentage = map_settings.get("mountain_budget_per_agent", 0.1)
-        dessert_percentage = map_settings.get("dessert_budget_per_agent", 0.1)
-        resource_density = map_settings.get("resource_density", 0.05)
-
-        topology_array = create_topologies(
-            1,
-            width,
-            height,
-            water_percentage,
-            mountain_percentage,
-            dessert_percentage,
-            resource_density,
-        )
+        parameters = get_generation_parameters(map_settings)
+        width = parameters["width"]
+        height = parameters["height"]
+
+        topology_array = create_topologies(1, **parameters, rng=connected_env.np_random)
         finished_map = topology_to_map(topology_array[0])
 
     finished_map.env = connected_env
 
+    # from the configured screen size, the screen itself may not exist yet
     if height > width:
-        finished_map.tile_size = int(connected_env.screen.get_height() / height)
+        finished_map.tile_size = int(connected_env.screen_height / height)
     else:
-        finished_map.tile_size = int(connected_env.screen.get_width() / width)
+        finished_map.tile_size = int(connected_env.screen_width / width)
     finished_map.tile_size = max(1, finished_map.tile_size)
 
     return finished_map
 
 
-def generate_map_topologies(numb, map_settings, seed=None, path=None):
+def get_generation_parameters(map_settings):
+    """
+    Read the map generation parameters from the settings, keyed like the create_topologies arguments.
     """
-    Generate map topologies and save them to files.
+    return {
+        "width": map_settings.get("map_width", 100),
+        "height": map_settings.get("map_height", 100),
+        "water_percentage": map_settings.get("water_budget_per_agent", 0.3),
+        "mountain_percentage": map_settings.get("mountain_budget_per_agent", 0.1),
+        "dessert_percentage": map_settings.get("dessert_budget_per_agent", 0.1),
+        "resource_density": map_settings.get("resource_density", 0.05),
+    }
+
+
+def generation_batch_size(width, height):
+    """
+    Number of maps generated together, about tiles_per_generation_batch tiles per batch.
+    """
+    return max(1, tiles_per_generation_batch // (width * height))
+
+
+def generation_batches(numb, seed=None, batch_size=1):
+    """
+    Split the generation of numb maps into fixed size batches with independent seeds.
+
+    Every batch gets its own child of one SeedSequence, so batches can be generated
+    in any order or in different processes and the maps only depend on the seed.
+
     Args:
         numb: number of maps to generate
-        map_settings: dictionary with settings for the map generation
-        seed: seed for random number generation
-        path: path to save the maps to
+        seed: int, SeedSequence or None for fresh entropy
+        batch_size: maps per batch
 
     Returns:
+        list of (first map index, number of maps, SeedSequence)
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+
+    starts = list(range(0, numb, batch_size))
+    children = seed.spawn(len(starts))
+    return [
+        (start, min(batch_size, numb - start), child)
+        for start, child in zip(starts, children)
+    ]
 
+
+def generate_map_topologies(numb, map_settings, seed=None, path=None, workers=None):
     """
+    Generate map topologies and save them as a map library, see MapLibrary.
+    Args:
+        numb: number of maps to generate
+        map_settings: dictionary with settings for the map generation
+        seed: seed for random number generation, int or np.random.SeedSequence
+        path: directory of the map library
+        workers: number of worker processes, None or 1 generates in this process.
+            Every worker writes its maps into the library itself, only counts are sent back.
+
+    Returns:
 
-    if seed:
-        raise NotImplementedError("Seed is not implemented yet")
+    """
 
-    # Ensure output directory exists
-    os.makedirs(path, exist_ok=True)
     print("Generating {} maps. Output directory: {}".format(numb, path))
 
-    width = map_settings.get("map_width", 100)
-    height = map_settings.get("map_height", 100)
+    parameters = get_generation_parameters(map_settings)
+    create_map_library(
+        path,
+        [parameters] * numb,
+        parameters["height"],
+        parameters["width"],
+    )
+
+    batch_size = generation_batch_size(parameters["width"], parameters["height"])
+    batches = generation_batches(numb, seed, batch_size)
+    done = 0
 
-    water_percentage = map_settings.get("water_budget_per_agent", 0.3)
-    mountain_percentage = map_settings.get("mountain_budget_per_agent", 0.1)
-    dessert_percentage = map_settings.get("dessert_budget_per_agent", 0.1)
-    resource_density = map_settings.get("resource_density", 0.05)
+    if workers is None or workers <= 1:
+        for start, count, seed_sequence in batches:
+            done += generate_topology_batch(
+                start, count, seed_sequence, map_settings, path
+            )
+            print(f"Generated {done}/{numb} maps")
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    generate_topology_batch,
+                    start,
+                    count,
+                    seed_sequence,
+                    map_settings,
+                    path,
+                )
+                for start, count, seed_sequence in batches
+            ]
+            for future in as_completed(futures):
+                done += future.result()
+                print(f"Generated {done}/{numb} maps")
 
-    # Generate maps using settings and save to file
+    print(f"{numb} maps generated and saved to {path}")
+
+
+def generate_topology_batch(start, count, seed_sequence, map_settings, path):
+    """
+    Generate one batch of maps and write it into its slice of the map library.
+    Runs in worker processes, so only the number of written maps is returned.
+
+    Args:
+        start: index of the first map of the batch
+        count: number of maps in the batch
+        seed_sequence: np.random.SeedSequence of the batch
+        map_settings: dictionary with settings for the map generation
+        path: directory of the map library
+
+    Returns:
+        number of maps written
+    """
+    parameters = get_generation_parameters(map_settings)
     map_arrays = create_topologies(
-        numb,
-        width,
-        height,
-        water_percentage,
-        mountain_percentage,
-        dessert_percentage,
-        resource_density,
+        count, **parameters, rng=np.random.default_rng(seed_sequence)
     )
 
-    for i in range(numb):
-        map_array = map_arrays[i]
-        map_name = generate_map_name(
-            width, height, water_percentage, mountain_percentage, dessert_percentage, i
-        )
-        map_file_path = os.path.join(path, f"{map_name}.pickle")
-        try:
-            with open(map_file_path, "wb") as file:
-                pickle.dump(map_array, file)
-        except IOError as e:
-            print(f"Failed to save map to {map_file_path}: {e}")
-    print(f"{numb} maps generated and saved to {path}")
+    library_maps = open_map_library_for_writing(path)
+    library_maps[start : start + count] = map_arrays
+    library_maps.flush()
+    del library_maps
+    return count
+
+
+# walker step directions (dx, dy), 8-connected
+WALK_STEPS = np.array(
+    [(1, -1), (1, 0), (1, 1), (0, -1), (0, 1), (-1, -1), (-1, 0), (-1, 1)],
+    dtype=np.int64,
+)
+
+# upper bound for the number of walk positions generated per chunk
+max_walk_chunk_elements = 2**20
+
+# tiles generated together with one random generator, see generation_batch_size
+tiles_per_generation_batch = 2**18
+
+
+def fold_into_bounds(positions, size):
+    """
+    Fold unbounded walk coordinates back into [0, size - 1].
+
+    Mirroring the free walk at the borders gives exactly the walk of a walker
+    that is reflected at the map edges, so whole walks can be computed with a
+    cumulative sum instead of clamping step by step.
+    """
+    if size == 1:
+        return np.zeros_like(positions)
+    period = 2 * (size - 1)
+    positions = np.mod(positions, period)
+    return np.where(positions < size, positions, period - positions)
 
 
 def let_map_agent_run(
-    map_arrays, land_type_percentage, tiles, LAND_TYPE_VALUE, position
+    terrain, land_type_percentage, land_type, start_x, start_y, rng=None
 ):
-    if land_type_percentage < 0:
-        return
+    """
+    Let random walkers convert tiles of all maps in the batch to the given land type.
 
-    map_copy = [m.copy() for m in map_arrays]
+    Every map gets the same number of walkers, all starting at the maps start
+    position. A walker converts each tile it visits that is not of the land type
+    yet, until its tile budget is spent. Walks are generated in chunks for all
+    walkers of all maps at once, the first visit of a tile in a chunk decides
+    which walker converts it.
+
+    Args:
+        terrain: int array (num_maps, height, width) with land type values, modified in place
+        land_type_percentage: share of the map tiles to convert
+        land_type: LandType to create
+        start_x: int array (num_maps,) with the walker start x per map
+        start_y: int array (num_maps,) with the walker start y per map
+        rng: np.random.Generator used for the walks
+
+    Returns:
+        the terrain array
+    """
+    rng = np.random.default_rng(rng)
+    num_maps, height, width = terrain.shape
+    tiles = width * height
+    if land_type_percentage <= 0:
+        return terrain
 
     total_tile_budget = tiles * land_type_percentage
     numb_agents_per_map = int(min(10, (tiles * 0.01) + 1))
     tile_budget_per_agent = int((total_tile_budget / numb_agents_per_map))
-    map_count = len(map_arrays)
 
     if (numb_agents_per_map * tile_budget_per_agent) <= 0:
-        return map_copy
-
-    for m in range(map_count):
-        agents = []
-        for i in range(numb_agents_per_map):
-            agents.append(
-                Map_Agent(
-                    position.x,
-                    position.y,
-                    m,
-                    tile_budget_per_agent,
-                )
+        return terrain
+
+    walkers = num_maps * numb_agents_per_map
+    flat_terrain = terrain.reshape(-1)
+    value = land_type.value
+
+    # state per walker, walker w belongs to map w // numb_agents_per_map
+    map_offset = np.repeat(
+        np.arange(num_maps, dtype=np.int64) * tiles, numb_agents_per_map
+    )
+    walk_x = np.repeat(np.asarray(start_x, dtype=np.int64), numb_agents_per_map)
+    walk_y = np.repeat(np.asarray(start_y, dtype=np.int64), numb_agents_per_map)
+    budget = np.full(walkers, tile_budget_per_agent, dtype=np.int64)
+
+    # a walker can never convert more tiles than exist on its map
+    convertible = tiles - np.count_nonzero(terrain == value, axis=(1, 2))
+    spendable = np.minimum(budget.reshape(num_maps, -1).sum(axis=1), convertible)
+
+    while spendable.any():
+        active = np.flatnonzero(budget > 0)
+        chunk = int(
+            np.clip(
+                4 * budget.max(), 64, max(64, max_walk_chunk_elements // active.size)
             )
+        )
+
+        steps = WALK_STEPS[rng.integers(0, len(WALK_STEPS), size=(chunk, active.size))]
+        free_x = walk_x[active] + np.cumsum(steps[..., 0], axis=0)
+        free_y = walk_y[active] + np.cumsum(steps[..., 1], axis=0)
+        walk_x[active] = free_x[-1]
+        walk_y[active] = free_y[-1]
+
+        # global tile ids in visiting order, step by step and walker by walker
+        visits = (
+            map_offset[active]
+            + fold_into_bounds(free_y, height) * width
+            + fold_into_bounds(free_x, width)
+        ).reshape(-1)
+        owners = np.broadcast_to(active, (chunk, active.size)).reshape(-1)
 
-        while agents:
-            left_agents = len(agents)
-            # Generate random walks on GPU
-            walks = np.random.randint(0, 8, size=left_agents)
+        _, first_visit = np.unique(visits, return_index=True)
+        first_visit = first_visit[flat_terrain[visits[first_visit]] != value]
+        first_visit.sort()
 
-            # We iterate over a snapshot copy of agents
-            # so we can safely remove them from the original list
-            for i, agent in enumerate(list(agents)):
-                walk = walks[i].item()  # single integer
-                agent.step(map_copy, tiles, walk, LAND_TYPE_VALUE)
-                if agent.tile_budget <= 0:
-                    agents.remove(agent)
+        # rank of every conversion within its walker, drop the ones over budget
+        order = np.argsort(owners[first_visit], kind="stable")
+        converting = first_visit[order]
+        converting_owner = owners[converting]
+        group_start = np.searchsorted(converting_owner, converting_owner, side="left")
+        rank = np.arange(converting.size) - group_start
+        converting = converting[rank < budget[converting_owner]]
 
-    return map_copy
+        flat_terrain[visits[converting]] = value
+        converted = np.bincount(owners[converting], minlength=walkers)
+        budget -= converted
+        spendable -= converted.reshape(num_maps, -1).sum(axis=1)
+
+        # walkers of maps without convertible tiles left can stop
+        budget[np.repeat(spendable <= 0, numb_agents_per_map)] = 0
+
+    return terrain
 
 
 def create_topologies(
@@ -186,108 +312,84 @@ def create_topologies(
     mountain_percentage,
     dessert_percentage,
     resource_density=0.05,
+    rng=None,
 ):
-    # Initialize the 2D list with the appropriate dimensions
-
-    topology_arrays = [np.zeros((width, height, 1), dtype=np.int64) for _ in range(num)]
-    resource_arr = [np.zeros((width, height, 1), dtype=np.int64) for _ in range(num)]
-    total_tiles = width * height
-
-    # use numpy to generate 6 random ints between 0 and 100
-    random_values = np.random.randint(0, width, 6)
-
-    # mountain agents
-    topology_arrays = let_map_agent_run(
-        topology_arrays,
-        mountain_percentage,
-        total_tiles,
-        LandType.MOUNTAIN,
-        MapPosition(random_values[0], random_values[1]),
-    )
+    """
+    Create a batch of map topologies.
 
-    # dessert agents
-    topology_arrays = let_map_agent_run(
-        topology_arrays,
-        dessert_percentage,
-        total_tiles,
-        LandType.DESERT,
-        MapPosition(random_values[2], random_values[3]),
-    )
+    All randomness is drawn from rng, an np.random.Generator. Anything accepted by
+    np.random.default_rng can be passed, None uses fresh entropy.
+
+    Returns:
+        int array (num, height, width, 2) with the land type and resource of every tile
+    """
+    rng = np.random.default_rng(rng)
+    terrain = np.zeros((num, height, width), dtype=np.int64)
+    resources = np.zeros((num, height, width), dtype=np.int64)
+
+    # mountain, dessert and water walkers each start at their own position per map
+    start_x = rng.integers(0, width, size=(3, num))
+    start_y = rng.integers(0, height, size=(3, num))
 
-    # water agents
-    topology_arrays = let_map_agent_run(
-        topology_arrays,
-        water_percentage,
-        total_tiles,
-        LandType.OCEAN,
-        MapPosition(random_values[4], random_values[5]),
+    let_map_agent_run(
+        terrain, mountain_percentage, LandType.MOUNTAIN, start_x[0], start_y[0], rng
+    )
+    let_map_agent_run(
+        terrain, dessert_percentage, LandType.DESERT, start_x[1], start_y[1], rng
+    )
+    let_map_agent_run(
+        terrain, water_percentage, LandType.OCEAN, start_x[2], start_y[2], rng
     )
 
-    # expand topology arrays unsqueeze
-    map_arrays = np.concatenate((topology_arrays, resource_arr), axis=3)
+    # post processing is done together for all maps
+    scatter_resources(terrain, resources, resource_density, rng)
+    terrain[adjacent_to_ocean_mask(terrain)] = LandType.MARSH.value
 
-    # post processing is done together
-    for m in range(num):
-        for row in range(height):
-            for col in range(width):
-                map_arr = map_arrays[m]
-                tile = map_arr[row][col]
-                land = tile[0]
-                # check if water around
-                if land != LandType.OCEAN.value:
-                    if is_adjacent_to_ocean(row, col, width, height, map_arr):
-                        map_arr[row][col][0] = LandType.MARSH.value
+    return np.stack((terrain, resources), axis=3)
 
-                if land == LandType.LAND.value:
-                    if random.random() < resource_density:
-                        map_arr[row][col][1] = ResourceType.GRAIN.value
 
-                if land == LandType.MOUNTAIN.value:
-                    if random.random() < resource_density:
-                        map_arr[row][col][1] = ResourceType.METAL.value
+def adjacent_to_ocean_mask(terrain):
+    """
+    Mask of all non ocean tiles that have an ocean tile as 4-neighbour.
+    Binary dilation of the ocean mask, done with shifted slices for all maps at once.
 
-    return map_arrays
+    Args:
+        terrain: int array (num_maps, height, width) with land type values
+    """
+    ocean = terrain == LandType.OCEAN.value
+    near_ocean = np.zeros_like(ocean)
+    near_ocean[:, 1:, :] |= ocean[:, :-1, :]
+    near_ocean[:, :-1, :] |= ocean[:, 1:, :]
+    near_ocean[:, :, 1:] |= ocean[:, :, :-1]
+    near_ocean[:, :, :-1] |= ocean[:, :, 1:]
+    return near_ocean & ~ocean
 
 
-def is_adjacent_to_ocean(x, y, width, height, array):
+def scatter_resources(terrain, resources, resource_density, rng=None):
     """
-    Helper function to check if a square at position (x, y) is adjacent to an ocean.
+    Place GRAIN on LAND and METAL on MOUNTAIN tiles, each with probability resource_density.
+
+    Args:
+        terrain: int array (num_maps, height, width) with land type values
+        resources: int array of the same shape, modified in place
+        resource_density: probability of a suitable tile to get a resource
+        rng: np.random.Generator used for the draws
     """
-    # Check left neighbor
-    if x > 0 and array[x - 1][y][0] == LandType.OCEAN.value:
-        return True
-    # Check right neighbor
-    if x < width - 1 and array[x + 1][y][0] == LandType.OCEAN.value:
-        return True
-    # Check top neighbor
-    if y > 0 and array[x][y - 1][0] == LandType.OCEAN.value:
-        return True
-    # Check bottom neighbor
-    if y < height - 1 and array[x][y + 1][0] == LandType.OCEAN.value:
-        return True
-    return False
-
-
-def generate_map_name(
-    width,
-    height,
-    water_percentage,
-    mountain_percentage,
-    dessert_percentage,
-    resource_density,
-):
-    settings_values = f"{width}_{height}_{water_percentage}_{mountain_percentage}_{dessert_percentage}_{resource_density}"
-    unique_id = uuid.uuid4()
-    map_name = f"map_{settings_values}_{unique_id}"
-    return map_name
+    hits = np.random.default_rng(rng).random(terrain.shape) < resource_density
+    resources[hits & (terrain == LandType.LAND.value)] = ResourceType.GRAIN.value
+    resources[hits & (terrain == LandType.MOUNTAIN.value)] = ResourceType.METAL.value
 
 
-def generate_maps(num_maps: int, map_settings=None, seed=None, out_dir=None):
+def generate_maps(
+    num_maps: int, map_settings=None, seed=None, out_dir=None, workers=None
+):
     """
-    Generates a set of maps for the environment to use.
+    Generates a map library for the environment to use.
     Args:
         num_maps (int): The number of maps to generate.
+        out_dir (str): directory of the map library.
+        workers (int): number of worker processes used for the generation.
     """
-    maps = generate_map_topologies(num_maps, map_settings, seed, out_dir)
+    maps = generate_map_topologies(num_maps, map_settings, seed, out_dir, workers)
 
     return maps
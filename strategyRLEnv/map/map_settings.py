@@ -1,5 +1,7 @@
 from enum import Enum
 
+import numpy as np
+
 COLOR_DEFAULT_LAND = (34, 139, 34)
 COLOR_DEFAULT_RIVER = (0, 255, 255)
 COLOR_DEFAULT_OCEAN = (76, 49, 252)
@@ -29,6 +31,28 @@ road_color = (128, 128, 128)
 bridge_color = (139, 69, 19)
 
 OWNER_DEFAULT_TILE = -1
+NO_BUILDING = -1
+# recorded by Map.track_changes when every tile changed, e.g. on reset
+ALL_TILES_CHANGED = -1
+
+# values map planes hold for empty tiles, below the feature minimum of the settings
+MAP_PLANE_EMPTY_VALUES = {
+    "tile_ownership": OWNER_DEFAULT_TILE,
+    "buildings": NO_BUILDING,
+}
+
+# dtype of every map plane in compact observations
+MAP_PLANE_COMPACT_DTYPES = {
+    "land_type": np.uint8,
+    "resources": np.uint8,
+    "tile_ownership": np.int8,
+    "buildings": np.int8,
+    "unit_strength": np.uint16,
+    "building_health": np.uint16,
+    "land_money_value": np.int32,
+    "tile_income": np.float32,
+    "visibility": np.uint64,
+}
 
 
 class LandType(Enum):
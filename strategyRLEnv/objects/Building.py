@@ -1,9 +1,7 @@
-from abc import ABC, abstractmethod
-from typing import Dict, Tuple
+from abc import ABC
+from typing import Dict
 from uuid import uuid1
 
-import pygame
-
 from strategyRLEnv.map import MapPosition
 from strategyRLEnv.map.map_settings import (ADJACENCY_MULTIPLIERS,
                                             BUILDING_IDS, BuildingType)
@@ -40,18 +38,6 @@ class Building(ABC):
             self.base_money_income * multiplier
         ) - self.maintenance_cost_per_turn
 
-    @abstractmethod
-    def draw(
-        self,
-        screen: pygame.Surface,
-        square_size: int,
-        owner_color: Tuple[int, int, int],
-    ):
-        """
-        Draw the building on the given screen.
-        """
-        pass
-
     def get_building_type(self) -> BuildingType:
         """
         Return the type of the building (e.g., 'City', 'Road', 'Farm').
@@ -78,9 +64,9 @@ class Building(ABC):
             radius = rule["radius"]
             multiplier = rule["multiplier"]
 
-            applies, tile = env.map.tile_is_next_to_building_type(
+            nearby = env.map.count_buildings_nearby(
                 self.position, adjacent_building_type, diagonal=False, radius=radius
             )
-            if applies:
+            if nearby:
                 total_multiplier += multiplier
         return total_multiplier
@@ -13,13 +13,15 @@ class Destroyable:
 
     def reduce_health(self, env, damage):
         self.health -= damage
+        env.map.set_building_health(self.position, self.health)
         print(f"Building {self.building_type} reduced health to {self.health}")
         if self.health <= 0:
             self.destroy(env)
 
-    def heal(self):
+    def heal(self, env):
         health = self.health + healing_base
         self.health = min(health, self.max_health)
+        env.map.set_building_health(self.position, self.health)
 
     def destroy(self, env):
         env.map.remove_building(self.position)
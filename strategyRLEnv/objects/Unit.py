@@ -1,7 +1,4 @@
 import random
-from typing import Tuple
-
-import pygame
 
 from strategyRLEnv.map import MapPosition
 from strategyRLEnv.map.map_settings import max_unit_strength
@@ -20,19 +17,20 @@ class Unit(Ownable):
         # check for other units around and adapt placement
 
         self.opponent_targets = []
-        surounding_tiles = env.map.get_surrounding_tiles(
+        surrounding_ids = env.map.get_surrounding_tile_ids(
             self.position, 1, diagonal=True
         )
 
-        for tile in surounding_tiles:
-            if tile.unit is not None:
-                unit = tile.unit
+        for tile_id in surrounding_ids.tolist():
+            unit = env.map.unit_objects.get(tile_id)
+            building = env.map.building_objects.get(tile_id)
+            if unit is not None:
                 if unit.owner.id != self.owner.id:
                     self.opponent_targets.append(unit)
-            elif tile.building is not None:
-                if isinstance(tile.building, Ownable):
-                    if tile.building.owner.id != self.owner.id:
-                        self.opponent_targets.append(tile.building)
+            elif building is not None:
+                if isinstance(building, Ownable):
+                    if building.owner.id != self.owner.id:
+                        self.opponent_targets.append(building)
 
     def step(self, env):
         self.update(env)
@@ -67,10 +65,13 @@ class Unit(Ownable):
         self.strength -= damage
         if self.strength <= 0:
             self.kill(env)
+        else:
+            env.map.set_unit_strength(self.position, self.strength)
 
-    def increase_strength(self, amount):
+    def increase_strength(self, env, amount):
         new_strength = self.strength + amount
         self.strength = min(max_unit_strength, new_strength)
+        env.map.set_unit_strength(self.position, self.strength)
 
     def kill(self, env):
         tile = env.map.get_tile(self.position)
@@ -79,26 +80,3 @@ class Unit(Ownable):
         self.owner.remove_unit(self)
         tile.update(env)
         env.map.trigger_surrounding_tile_update(self.position)
-
-    def draw(
-        self,
-        screen: pygame.Surface,
-        square_size: int,
-        owner_color: Tuple[int, int, int],
-    ):
-        # Calculate the size of the diamond
-        rectangle_size = square_size / 3
-        x_offset = square_size * self.position.x
-        y_offset = square_size * self.position.y
-
-        center_x = x_offset + (square_size / 2)
-        center_y = y_offset + (square_size / 2)
-
-        # Define the vertices of the diamond
-        top = (center_x, center_y - rectangle_size)
-        right = (center_x + rectangle_size, center_y)
-        bottom = (center_x, center_y + rectangle_size)
-        left = (center_x - rectangle_size, center_y)
-        vertices = [top, right, bottom, left]
-
-        pygame.draw.polygon(screen, owner_color, vertices)
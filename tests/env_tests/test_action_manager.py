@@ -4,12 +4,16 @@ import numpy as np
 import pytest
 
 from strategyRLEnv.ActionManager import create_action
+from strategyRLEnv.ActionRegistry import (ActionHandler, action_handlers,
+                                          register_action)
+from strategyRLEnv.actions.Action import Action, ActionType
 from strategyRLEnv.actions.BuildCityAction import BuildCityAction
 from strategyRLEnv.actions.BuildFarmAction import BuildFarmAction
 from strategyRLEnv.actions.BuildRoadAction import (BuildBridgeAction,
                                                    BuildRoadAction)
 from strategyRLEnv.actions.ClaimAction import ClaimAction
 from strategyRLEnv.environment import MapEnvironment
+from strategyRLEnv.map.MapPosition import MapPosition
 
 
 class MockAgent:
@@ -130,36 +134,172 @@ def test_apply_actions_with_conflict(env):
 
 
 def test_resolve_conflict(env):
-    agent_1 = MockAgent(id=1)
-    agent_2 = MockAgent(id=2)
-
-    build_city_1 = BuildCityAction(agent_1, (1, 1))
-    build_city1_2 = BuildCityAction(agent_1, (1, 1))
-    build_city_2 = BuildCityAction(agent_2, (2, 2))
-    build_city_2_1 = BuildCityAction(agent_2, (1, 1))
-
-    no_conflicts_map = {}
-    no_conflicts_map.setdefault((1, 1), []).append(build_city_1)
-    no_conflicts_map.setdefault((2, 2), []).append(build_city_2)
-
-    conflict_map_1 = {}
-    conflict_map_1.setdefault((1, 1), []).append(build_city_1)
-    conflict_map_1.setdefault((1, 1), []).append(build_city1_2)
-
-    conflict_map_2 = {}
-    conflict_map_2.setdefault((1, 1), []).append(build_city_1)
-    conflict_map_2.setdefault((1, 1), []).append(build_city_2_1)
-
-    env.action_manager.conflict_map = no_conflicts_map
-    out_proposed_actions = env.action_manager.resolve_conflict()
-    assert len(out_proposed_actions) == 2
-
-    env.action_manager.conflict_map = conflict_map_1
-    out_proposed_actions = env.action_manager.resolve_conflict()
-    assert len(out_proposed_actions) == 1
-    # assert that conflicts resolved
-
-    env.action_manager.conflict_map = conflict_map_2
-    env.action_manager.resolve_conflict()
-    assert len(out_proposed_actions) == 1
-    # assert that conflicts resolved
+    no_conflicts = np.array([11, 22])
+    winners = env.action_manager.resolve_conflicts(no_conflicts, np.array([0, 1]))
+    assert list(winners) == [0, 1]
+
+    # one winner per tile, the indices in submission order
+    conflicts = np.array([11, 22, 11, 11, 33, 22])
+    agent_ids = np.array([0, 0, 1, 1, 1, 1])
+    winners = env.action_manager.resolve_conflicts(conflicts, agent_ids)
+    assert len(winners) == 3
+    assert sorted(conflicts[winners]) == [11, 22, 33]
+    assert list(winners) == sorted(winners)
+
+    empty = np.empty(0, dtype=int)
+    assert len(env.action_manager.resolve_conflicts(empty, empty)) == 0
+
+
+def test_conflicts_are_reproducible():
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+
+    tile_ids = np.repeat(np.arange(50), 4)
+    agent_ids = np.tile(np.arange(4), 50)
+    winners = []
+    for _ in range(2):
+        env = MapEnvironment(env_settings, 4, None)
+        env.reset(seed=7)
+        winners.append(env.action_manager.resolve_conflicts(tile_ids, agent_ids))
+        env.close()
+    assert np.array_equal(winners[0], winners[1])
+    # the random policy lets every agent win some tiles
+    assert set(agent_ids[winners[0]]) == {0, 1, 2, 3}
+
+
+@pytest.mark.parametrize(
+    "policy", ["random", "lowest_money_first", "round_robin", "unknown"]
+)
+def test_conflict_policies(policy):
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    env_settings["conflict_resolution"] = policy
+    if policy == "unknown":
+        with pytest.raises(ValueError):
+            MapEnvironment(env_settings, 3, None)
+        return
+
+    env = MapEnvironment(env_settings, 3, None, seed=2)
+    env.reset(seed=2)
+    for agent, money in zip(env.agents, [300, 100, 200]):
+        agent.money = money
+
+    manager = env.action_manager
+    tile_ids = np.zeros(3, dtype=np.int64)
+    agent_ids = np.arange(3)
+    turn_winners = []
+    for turn in range(3):
+        manager.turn = turn
+        winners = manager.resolve_conflicts(tile_ids, agent_ids)
+        assert len(winners) == 1
+        turn_winners.append(int(agent_ids[winners[0]]))
+
+    if policy == "lowest_money_first":
+        assert turn_winners == [1, 1, 1]
+    elif policy == "round_robin":
+        assert turn_winners == [0, 1, 2]
+    env.close()
+
+
+def test_conflicts_on_equal_positions(env):
+    for agent in env.agents:
+        agent.money = 1000
+    position = env.map.get_surrounding_tiles(env.agents[0].position, 1)[0].position
+    claim_id = [k for k, v in env.action_mapping.items() if v == "claim"][0]
+    env.map.set_visible(position, 1)
+    env.map.unclaim_tile(position)
+
+    # only one of the claims on the tile is executed
+    claim = [claim_id, position.x, position.y]
+    env.action_manager.apply_actions([[claim, claim], [claim]])
+    assert env.map.get_tile(position).get_owner() in (0, 1)
+    spent = sum(1000 - agent.money for agent in env.agents)
+    assert spent == env.env_settings["actions"]["claim"]["cost"]
+
+
+def test_validate_batch(env):
+    rng = np.random.default_rng(0)
+    for agent in env.agents:
+        agent.money = 200
+    for action_type in env.action_mapping.values():
+        if action_type == "wait":
+            continue
+        agent_ids = rng.integers(0, len(env.agents), 200)
+        tile_ids = rng.integers(0, env.map.tiles, 200)
+        handler = action_handlers[action_type]
+        valid = handler.validate_batch(env, agent_ids, tile_ids)
+        for agent_id, tile_id, is_valid in zip(agent_ids, tile_ids, valid):
+            action = create_action(
+                env.agents[agent_id], action_type, env.map.tile_position(tile_id)
+            )
+            assert action.validate(env) == is_valid
+
+
+def test_apply_action_array(env):
+    actions = np.zeros((2, 4, 3), dtype=np.int64)
+    actions[:, :, 0] = env.action_space.sample()[0]
+    actions[:, :, 1:] = np.random.default_rng(1).integers(0, 10, (2, 4, 2))
+    rewards, dones = env.action_manager.apply_actions(actions)
+    assert rewards.shape == (2,)
+    assert dones.shape == (2,)
+
+    with pytest.raises(ValueError):
+        env.action_manager.apply_actions(np.zeros((2, 4, 2), dtype=np.int64))
+
+
+class TaxAction(Action):
+    """
+    Out of tree action, takes the land money value of an own tile.
+    """
+
+    def __init__(self, agent, position: MapPosition):
+        super().__init__(agent, position, ActionType.WAIT)
+
+    def validate(self, env) -> bool:
+        if not super().validate(env):
+            return False
+        return env.map.get_tile(self.position).get_owner() == self.agent.id
+
+    def execute(self, env) -> float:
+        self.agent.money += 1
+        return 1
+
+    def get_cost(self, env) -> float:
+        return 0
+
+
+@pytest.fixture
+def tax_action():
+    register_action("tax", ActionHandler(TaxAction))
+    yield
+    action_handlers.pop("tax")
+
+
+def test_registered_action(tax_action):
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    env_settings["actions"]["tax"] = {"cost": 0, "reward": 1}
+    env_settings["map_width"] = 10
+    env_settings["map_height"] = 10
+
+    env = MapEnvironment(env_settings, 2, None, seed=4)
+    env.reset(seed=4)
+    tax_id = [k for k, v in env.action_mapping.items() if v == "tax"][0]
+    assert isinstance(create_action(env.agents[0], "tax", MapPosition(0, 0)), TaxAction)
+
+    # the masks of the fallback agree with validate
+    masks = env.action_masks()
+    for agent in env.agents:
+        assert masks[agent.id, tax_id].sum() == len(agent.get_claimed_tiles())
+        for position in agent.get_claimed_tiles():
+            assert masks[agent.id, tax_id, position.x, position.y]
+
+    agent = env.agents[0]
+    money = agent.money
+    position = agent.position
+    rewards, _ = env.action_manager.apply_actions(
+        [[[tax_id, position.x, position.y]], []]
+    )
+    assert rewards[0] == 1
+    assert agent.money == money + 1
+    env.close()
@@ -1,10 +1,17 @@
 import json
+import os
+import subprocess
+import sys
 
 import gymnasium as gym
 import numpy as np
+import pygame
 import pytest
 
+import strategyRLEnv
+from strategyRLEnv.ActionManager import create_action
 from strategyRLEnv.environment import MapEnvironment
+from strategyRLEnv.map.mapGenerator import generate_map_topologies
 from strategyRLEnv.map.MapPosition import MapPosition
 from strategyRLEnv.objects.Unit import Unit
 from tests.env_tests.test_action_manager import MockAgent
@@ -136,6 +143,295 @@ def test_observation_space(env):
     ), "Observation should be valid in the observation space"
 
 
+def test_observation_buffers(env):
+    observation, _ = env.reset()
+    map_observation = observation["map"]
+    assert not map_observation.flags.writeable
+    assert not observation["visibility_map"].flags.writeable
+
+    # features in the order of the selected map_features
+    land_type = env.map_feature_names.index("land_type")
+    assert np.array_equal(map_observation[:, :, land_type], env.map.landtype_map)
+
+    # the same buffers are refreshed every step
+    env.map.set_unit_strength(MapPosition(0, 0), 123)
+    observation, _, _, _, _ = env.step([[[0, 0, 0]]])
+    assert observation["map"] is map_observation
+    unit_strength = env.map_feature_names.index("unit_strength")
+    assert map_observation[0, 0, unit_strength] == 123
+
+
+@pytest.mark.parametrize("encoding", ["float32", "compact"])
+@pytest.mark.parametrize("observability", ["full", "partial"])
+def test_map_buffers_refresh_changed_tiles(encoding, observability):
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    env_settings["observation_encoding"] = encoding
+    env_settings["observability"] = observability
+    compact = encoding == "compact"
+
+    env = MapEnvironment(env_settings, 2, None, seed=5)
+    env.reset()
+    buffers = env._observation_buffers
+
+    def snapshot():
+        if compact:
+            return {
+                name: plane.copy() for name, plane in buffers["map"].items()
+            }, buffers["visibility_map"].copy()
+        return buffers["map"].copy(), buffers["visibility_map"].copy()
+
+    # the buffers refreshed over several steps match a refill from the whole map
+    for _ in range(5):
+        env.step([[env.action_space.sample()] for _ in range(2)])
+    refreshed = snapshot()
+    env._refill_map_buffers = True
+    env._get_observation()
+    refilled = snapshot()
+    if compact:
+        for name in env.map_feature_names:
+            assert np.array_equal(refreshed[0][name], refilled[0][name])
+    else:
+        assert np.array_equal(refreshed[0], refilled[0])
+    assert np.array_equal(refreshed[1], refilled[1])
+
+    # a step with one changed tile only writes that tile
+    position = env.agents[0].position
+    other = MapPosition((position.x + 1) % env.map.width, position.y)
+    if compact:
+        for plane in buffers["map"].values():
+            plane[..., other.x, other.y] = 7
+    else:
+        buffers["map"][..., other.x, other.y, :] = 7
+    env.map.set_unit_strength(position, 9)
+    env._get_observation()
+
+    unit_strength = env.map_feature_names.index("unit_strength")
+    if compact:
+        for plane in buffers["map"].values():
+            assert np.all(plane[..., other.x, other.y] == 7)
+        strength = buffers["map"]["unit_strength"][..., position.x, position.y]
+    else:
+        assert np.all(buffers["map"][..., other.x, other.y, :] == 7)
+        strength = buffers["map"][..., position.x, position.y, unit_strength]
+    # agent 0 sees its own position in partial observations
+    assert strength.reshape(-1)[0] == 9
+    env.close()
+
+
+def test_compact_observations():
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    env_settings["observation_encoding"] = "compact"
+
+    env = MapEnvironment(env_settings, 2, None, seed=5)
+    observation, _ = env.reset()
+    assert env.observation_space.contains(observation)
+
+    map_observation = observation["map"]
+    assert map_observation["land_type"].dtype == np.uint8
+    assert map_observation["tile_ownership"].dtype == np.int8
+    assert map_observation["unit_strength"].dtype == np.uint16
+    assert np.array_equal(map_observation["land_type"], env.map.landtype_map)
+
+    visibility = observation["visibility_map"]
+    assert visibility.dtype == np.uint8
+    assert visibility.shape == (2, env.map.width, (env.map.height + 7) // 8)
+    visible = np.unpackbits(visibility, axis=-1, count=env.map.height)
+    assert np.array_equal(visible[1], (env.map.visibility_map >> 1) & 1)
+    env.close()
+
+    env_settings["observation_encoding"] = "invalid"
+    with pytest.raises(ValueError):
+        MapEnvironment(env_settings, 2, None)
+
+
+@pytest.mark.parametrize("encoding", ["float32", "compact"])
+def test_partial_observations(encoding):
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    env_settings["observability"] = "partial"
+    env_settings["observation_encoding"] = encoding
+
+    env = MapEnvironment(env_settings, 2, None, seed=5)
+    observation, _ = env.reset()
+    assert env.observation_space.contains(observation)
+
+    land_type = env.map.landtype_map
+    for agent_id in range(2):
+        visible = (env.map.visibility_map >> agent_id) & 1 == 1
+        if encoding == "compact":
+            agent_land_type = observation["map"]["land_type"][agent_id]
+        else:
+            feature = env.map_feature_names.index("land_type")
+            agent_land_type = observation["map"][agent_id, :, :, feature]
+        assert visible.any()
+        assert np.array_equal(agent_land_type[visible], land_type[visible])
+        assert (agent_land_type[~visible] == 0).all()
+    env.close()
+
+
+@pytest.mark.parametrize("encoding", ["float32", "compact"])
+def test_window_observations(encoding):
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    env_settings["observation_window"] = 5
+    env_settings["observation_encoding"] = encoding
+
+    env = MapEnvironment(env_settings, 2, None, seed=5)
+    observation, _ = env.reset()
+    assert env.observation_space.contains(observation)
+    assert observation["visibility_map"].shape == (2, 5, 5)
+
+    land_type = env.map.landtype_map
+    for agent_id, agent in enumerate(env.agents):
+        x, y = agent.get_observation_center()
+        assert (x, y) == (agent.cities[0].position.x, agent.cities[0].position.y)
+        if encoding == "compact":
+            agent_land_type = observation["map"]["land_type"][agent_id]
+        else:
+            feature = env.map_feature_names.index("land_type")
+            agent_land_type = observation["map"][agent_id, :, :, feature]
+        # the agents capital is in the center of its window
+        assert agent_land_type[2, 2] == land_type[x, y]
+        assert observation["visibility_map"][agent_id, 2, 2] == 1
+    env.close()
+
+    env_settings["observation_window"] = 0
+    with pytest.raises(ValueError):
+        MapEnvironment(env_settings, 2, None)
+
+
+def test_pyramid_observations():
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    env_settings["observation_pyramid"] = [2, 5]
+
+    env = MapEnvironment(env_settings, 2, None, seed=5)
+    observation, _ = env.reset()
+    assert env.observation_space.contains(observation)
+
+    level = observation["pyramid"]["blocks_5"]
+    width, height = -(-env.map.width // 5), -(-env.map.height // 5)
+    assert level["ownership_share"].shape == (2, width, height)
+    assert level["land_type_counts"].sum() == env.map.width * env.map.height
+    for agent in env.agents:
+        x, y = agent.position.x, agent.position.y
+        assert level["ownership_share"][agent.id, x // 5, y // 5] > 0
+
+    # a unit placed in a step shows up in the summary of its block
+    agent = env.agents[0]
+    position = agent.position
+    env.map.set_unit_strength(position, 11)
+    observation = env._get_observation()
+    level = observation["pyramid"]["blocks_2"]
+    assert level["unit_strength"][position.x // 2, position.y // 2] == 11
+    env.close()
+
+    env_settings["observation_pyramid"] = [0]
+    with pytest.raises(ValueError):
+        MapEnvironment(env_settings, 2, None)
+
+
+@pytest.mark.parametrize("encoding", ["float32", "compact"])
+def test_delta_observations(encoding):
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    env_settings["observation_delta"] = {"keyframe_interval": 4}
+    env_settings["observation_encoding"] = encoding
+
+    env = MapEnvironment(env_settings, 2, None, seed=5)
+    observation, info = env.reset()
+    assert "map" not in observation
+    assert env.observation_space.contains(observation)
+
+    delta = info["map_delta"]
+    assert delta["keyframe"]
+    assert len(delta["indices"]) == env.map.width * env.map.height
+    if encoding == "compact":
+        cache = {name: values.copy() for name, values in delta["values"].items()}
+    else:
+        cache = delta["values"].copy()
+
+    keyframes = []
+    position = env.agents[0].position
+    for step in range(6):
+        env.map.set_unit_strength(position, step + 1)
+        actions = [[env.action_space.sample()] for _ in range(2)]
+        observation, _, _, _, info = env.step(actions)
+        delta = info["map_delta"]
+        keyframes.append(delta["keyframe"])
+        if not delta["keyframe"]:
+            assert env.map.tile_index(position) in delta["indices"]
+        if encoding == "compact":
+            for name, values in delta["values"].items():
+                cache[name][delta["indices"]] = values
+        else:
+            cache[delta["indices"]] = delta["values"]
+
+        # the cache updated with the deltas holds the full map observation
+        full = env.map.get_observation(
+            env.map_feature_names, compact=encoding == "compact"
+        )
+        if encoding == "compact":
+            for name in env.map_feature_names:
+                assert np.array_equal(cache[name], full[name].reshape(-1))
+        else:
+            assert np.array_equal(cache, full.reshape(-1, len(env.map_feature_names)))
+    assert keyframes == [False, False, False, True, False, False]
+    env.close()
+
+    env_settings["observability"] = "partial"
+    with pytest.raises(ValueError):
+        MapEnvironment(env_settings, 2, None)
+
+
+def test_action_masks():
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    env_settings["map_width"] = 10
+    env_settings["map_height"] = 8
+
+    env = MapEnvironment(env_settings, 2, None, seed=3)
+    env.reset(seed=3)
+    rng = np.random.default_rng(3)
+    for _ in range(5):
+        masks = env.action_masks()
+        assert masks.shape == (
+            2,
+            len(env.action_mapping),
+            env.map.width,
+            env.map.height,
+        )
+        assert masks.dtype == bool
+
+        # the masks agree with validate on every tile
+        for agent in env.agents:
+            for action_id, action_type in env.action_mapping.items():
+                for x in range(env.map.width):
+                    for y in range(env.map.height):
+                        action = create_action(
+                            agent, action_type, env.map.position(x, y)
+                        )
+                        valid = action_type == "wait" or (
+                            action is not None and action.validate(env)
+                        )
+                        assert masks[agent.id, action_id, x, y] == valid
+
+        actions = []
+        for agent in env.agents:
+            valid_actions = np.argwhere(masks[agent.id])
+            chosen = rng.permutation(len(valid_actions))[:3]
+            actions.append([valid_actions[i] for i in chosen])
+            agent.money += 200
+        env.step(actions)
+
+    out = np.empty_like(masks)
+    assert env.action_masks(out) is out
+    assert np.array_equal(out, env.action_masks())
+    env.close()
+
+
 def test_render(env):
     # Test render function in different modes
     with open("test_env_settings.json", "r") as f:
@@ -170,6 +466,83 @@ def test_render(env):
     env.close()
 
 
+def test_headless():
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    pygame.quit()
+
+    env = MapEnvironment(env_settings, 2, None, seed=1)
+    env.reset()
+    env.step([[[0, 1, 1]]])
+    assert env.screen is None
+    assert not pygame.display.get_init()
+    assert env.map.tile_size == env.screen_width // env.map.width
+    assert env.render() is None
+    env.close()
+
+    # rgb_array opens the display on the first render only
+    env = MapEnvironment(env_settings, 2, "rgb_array", seed=1)
+    assert env.screen is None
+    assert env.render().shape == (env.screen_height, env.screen_width, 3)
+    assert env.screen is not None
+    env.close()
+
+    with pytest.raises(ValueError):
+        MapEnvironment(env_settings, 2, "invalid")
+
+
+def test_import_without_pygame():
+    # the simulation core must not import pygame, only the renderer does
+    code = "import sys, strategyRLEnv.environment; assert 'pygame' not in sys.modules"
+    package_root = os.path.dirname(os.path.dirname(strategyRLEnv.__file__))
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=package_root)
+
+
+def test_compiled_settings(env):
+    settings = env.compiled_settings
+    actions = env.env_settings["actions"]
+    # the enabled actions have the ids of the action mapping
+    for action_id, action_type in env.action_mapping.items():
+        assert settings.action_ids[action_type] == action_id
+        assert settings.cost[action_id] == actions[action_type]["cost"]
+        assert settings.reward[action_id] == actions[action_type].get("reward", 0)
+    city_id = settings.action_ids["build_city"]
+    assert settings.income[city_id] == actions["build_city"]["money_gain_per_turn"]
+    assert (
+        settings.maintenance[city_id]
+        == actions["build_city"]["maintenance_cost_per_turn"]
+    )
+    assert settings.cost[settings.action_ids["build_road"]] < 0
+    assert len(settings.agent_feature_extractors) == len(env.agent_features)
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda settings: settings["actions"].pop("invalid_action_penalty"),
+        lambda settings: settings["actions"]["claim"].update(cost="100"),
+        lambda settings: settings["actions"]["build_farm"].update(
+            money_gain_per_turn=None
+        ),
+        lambda settings: settings["actions"].pop("build_city"),
+        lambda settings: settings["actions"].update(
+            buidl_farm={"cost": 8, "reward": 5}
+        ),
+        lambda settings: settings["actions"].update(move={"cost": 1}),
+        lambda settings: settings.update(city_clearance_radius=-1),
+        lambda settings: settings["agent_features"].append(
+            {"name": "unknown", "select": True}
+        ),
+    ],
+)
+def test_bad_settings_are_rejected(change):
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    change(env_settings)
+    with pytest.raises(ValueError):
+        MapEnvironment(env_settings, 2, None)
+
+
 def test_close(env):
     env.close()
     assert True, "Environment should close without errors"
@@ -181,6 +554,51 @@ def test_seed(env):
     assert True, "Seeding should not raise any errors"
 
 
+def test_seeded_reset_is_reproducible(env):
+    env.reset(seed=42)
+    land_types = env.map.landtype_map.copy()
+    spawns = [(agent.position.x, agent.position.y) for agent in env.agents]
+
+    env.reset(seed=42)
+    assert np.array_equal(env.map.landtype_map, land_types)
+    assert [(agent.position.x, agent.position.y) for agent in env.agents] == spawns
+
+
+def test_reset_from_map_library(tmp_path):
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    env_settings["map_width"] = 20
+    env_settings["map_height"] = 10
+    generate_map_topologies(3, env_settings, seed=1, path=str(tmp_path))
+    env_settings["map_library"] = str(tmp_path)
+
+    env = MapEnvironment(env_settings, 2, "rgb_array", seed=3)
+    library = env.map_library
+    assert len(library) == 3
+
+    env.reset(map_index=2)
+    assert env.map.width == 20 and env.map.height == 10
+    assert np.array_equal(env.map.landtype_map, library[2][:, :, 0].T)
+    assert np.array_equal(env.map.resources_map, library[2][:, :, 1].T)
+    env.close()
+
+
+def test_reset_from_map_pool():
+    with open("test_env_settings.json", "r") as f:
+        env_settings = json.load(f)
+    env_settings["map_width"] = 20
+    env_settings["map_height"] = 10
+    env_settings["map_pool"] = {"size": 2, "max_uses": 1}
+
+    env = MapEnvironment(env_settings, 2, "rgb_array", seed=3)
+    for _ in range(3):
+        env.reset()
+        assert env.map.width == 20 and env.map.height == 10
+    pool = env.map_pool
+    assert pool.hits + pool.misses == 4
+    env.close()
+
+
 def test_killed_agent(env):
     # Test killed agent
     env.reset()
@@ -200,3 +618,23 @@ def test_killed_agent(env):
 
     observation, reward, terminated, truncated, info = env.step([[wait_action]])
     assert reward[0] < -10000, "killed agent should receive large negative reward"
+
+
+def test_strength_and_health_planes(env):
+    env.reset()
+    agent = env.agents[0]
+    city = agent.cities[0]
+    position = city.position
+    unit = Unit(agent, position)
+    env.map.add_unit(unit, position)
+    changed = env.map.track_changes()
+
+    unit.increase_strength(env, 20)
+    assert env.map.unit_strength_map[position.x, position.y] == unit.strength == 70
+    assert changed == {env.map.tile_index(position)}
+
+    city.reduce_health(env, 30)
+    city.heal(env)
+    assert env.map.health_map[position.x, position.y] == city.health
+    assert city.health == city.max_health - 20
+    env.map.untrack_changes(changed)
@@ -1,14 +1,26 @@
 import json
+import time
 import uuid
 
+import numpy as np
 import pytest
 
 from strategyRLEnv.Agent import Agent
 from strategyRLEnv.environment import MapEnvironment
+from strategyRLEnv.map.BlockSummary import BlockSummary
 from strategyRLEnv.map.Map import check_valid_agent_id
-from strategyRLEnv.map.map_settings import (OWNER_DEFAULT_TILE, BuildingType,
-                                            LandType, max_agent_id)
-from strategyRLEnv.map.mapGenerator import generate_finished_map
+from strategyRLEnv.map.map_settings import (ALL_TILES_CHANGED, BUILDING_IDS,
+                                            NO_BUILDING, OWNER_DEFAULT_TILE,
+                                            BuildingType, LandType,
+                                            ResourceType, max_agent_id)
+from strategyRLEnv.map.mapGenerator import (adjacent_to_ocean_mask,
+                                            create_topologies,
+                                            generate_finished_map,
+                                            generate_map_topologies,
+                                            generation_batches,
+                                            let_map_agent_run, topology_to_map)
+from strategyRLEnv.map.MapLibrary import MapLibrary
+from strategyRLEnv.map.MapPool import MapPool
 from strategyRLEnv.map.MapPosition import MapPosition
 from strategyRLEnv.map.MapSquare import Map_Square
 from strategyRLEnv.objects.City import City
@@ -103,6 +115,355 @@ def test_reset(map_instance):
             ]
 
 
+def test_tile_view_writes_through_to_arrays(map_instance):
+    map_instance, mock_city_params = map_instance
+    position = MapPosition(3, 7)
+    tile = map_instance.get_tile(position)
+
+    tile_id = map_instance.tile_index(position)
+    assert tile.tile_id == tile_id
+    assert map_instance.tile_position(tile_id).x == 3
+    assert map_instance.tile_position(tile_id).y == 7
+
+    tile.set_land_type(LandType.MOUNTAIN)
+    assert map_instance.landtype_map[3, 7] == LandType.MOUNTAIN.value
+    assert map_instance.planes["land_type"][tile_id] == LandType.MOUNTAIN.value
+
+    tile.owner_id = 4
+    assert map_instance.ownership_map[3, 7] == 4
+    map_instance.ownership_map[3, 7] = 5
+    assert map_instance.get_tile(position).get_owner() == 5
+
+    city = City(1, position, mock_city_params)
+    map_instance.add_building(city, position)
+    assert map_instance.get_tile(position).building is city
+    assert map_instance.building_map[3, 7] == city.get_building_type_id()
+    assert map_instance.health_map[3, 7] == city.health
+
+    map_instance.remove_building(position)
+    assert tile.building is None
+    assert map_instance.building_map[3, 7] == NO_BUILDING
+    assert map_instance.health_map[3, 7] == 0
+
+
+def test_reset_clears_tile_state(map_instance):
+    map_instance, mock_city_params = map_instance
+    position = MapPosition(1, 2)
+    land_type = map_instance.get_tile(position).land_type
+
+    map_instance.claim_tile(Agent(1, map_instance.env), position)
+    map_instance.add_building(City(1, position, mock_city_params), position)
+    map_instance.set_visible(position, 1)
+
+    map_instance.reset()
+
+    tile = map_instance.get_tile(position)
+    assert tile.get_owner() == OWNER_DEFAULT_TILE
+    assert tile.building is None
+    assert map_instance.is_visible(position, 1) is False
+    assert not map_instance.building_objects
+    assert (map_instance.building_map == NO_BUILDING).all()
+    # topology is kept
+    assert tile.land_type == land_type
+
+
+def test_topology_to_map_non_square():
+    topology = np.zeros((3, 5, 2), dtype=np.int64)  # height 3, width 5
+    topology[1, 4, 0] = LandType.MOUNTAIN.value
+    topology[2, 0, 1] = ResourceType.GRAIN.value
+
+    created_map = topology_to_map(topology)
+    assert created_map.width == 5
+    assert created_map.height == 3
+    assert created_map.landtype_map.shape == (5, 3)
+    assert created_map.get_tile(MapPosition(4, 1)).land_type == LandType.MOUNTAIN
+    assert created_map.get_tile(MapPosition(0, 2)).resource == ResourceType.GRAIN
+    assert (created_map.ownership_map == OWNER_DEFAULT_TILE).all()
+
+    with pytest.raises(ValueError):
+        topology_to_map(np.zeros((3, 5), dtype=np.int64))
+
+    topology[0, 0, 0] = 42  # unknown land type
+    with pytest.raises(ValueError):
+        topology_to_map(topology)
+
+
+def test_random_walk_budget_non_square():
+    terrain = np.zeros((3, 7, 13), dtype=np.int64)  # 3 maps, height 7, width 13
+    let_map_agent_run(
+        terrain, 0.3, LandType.OCEAN, np.array([0, 12, 6]), np.array([0, 6, 3])
+    )
+
+    tiles = 7 * 13
+    agents = int(min(10, tiles * 0.01 + 1))
+    expected = agents * int(tiles * 0.3 / agents)
+    assert ((terrain == LandType.OCEAN.value).sum(axis=(1, 2)) == expected).all()
+
+    # budget larger than the map, every tile gets converted and the walk ends
+    terrain = np.zeros((1, 4, 9), dtype=np.int64)
+    let_map_agent_run(terrain, 2.0, LandType.MOUNTAIN, np.array([8]), np.array([3]))
+    assert (terrain == LandType.MOUNTAIN.value).all()
+
+
+def test_adjacent_to_ocean_mask():
+    ocean = LandType.OCEAN.value
+    terrain = np.full((2, 4, 5), LandType.LAND.value, dtype=np.int64)
+    terrain[0, 0, 0] = ocean
+    terrain[1, 2, 2] = ocean
+
+    mask = adjacent_to_ocean_mask(terrain)
+    assert set(zip(*np.nonzero(mask[0]))) == {(0, 1), (1, 0)}
+    assert set(zip(*np.nonzero(mask[1]))) == {(1, 2), (3, 2), (2, 1), (2, 3)}
+
+
+def test_create_topologies():
+    topologies = create_topologies(2, 12, 5, 0.2, 0.1, 0.1, resource_density=0.5)
+    assert topologies.shape == (2, 5, 12, 2)
+
+    land_types = topologies[..., 0]
+    resources = topologies[..., 1]
+    # every tile next to the ocean has been turned into marsh
+    near_ocean = adjacent_to_ocean_mask(land_types)
+    assert (land_types[near_ocean] == LandType.MARSH.value).all()
+    # resources only on the land types they belong to
+    assert (
+        land_types[resources == ResourceType.GRAIN.value] != LandType.OCEAN.value
+    ).all()
+    assert (
+        land_types[resources == ResourceType.METAL.value] != LandType.OCEAN.value
+    ).all()
+
+    created_map = topology_to_map(topologies[0])
+    assert created_map.width == 12
+    assert created_map.height == 5
+
+
+def test_create_topologies_seeded():
+    first = create_topologies(3, 20, 10, 0.2, 0.1, 0.1, rng=np.random.default_rng(7))
+    second = create_topologies(3, 20, 10, 0.2, 0.1, 0.1, rng=np.random.default_rng(7))
+    other = create_topologies(3, 20, 10, 0.2, 0.1, 0.1, rng=np.random.default_rng(8))
+    assert np.array_equal(first, second)
+    assert not np.array_equal(first, other)
+
+
+def test_generation_batches():
+    batches = generation_batches(10, seed=3, batch_size=4)
+    assert [(start, count) for start, count, _ in batches] == [(0, 4), (4, 4), (8, 2)]
+
+    # batches get independent, reproducible streams
+    again = generation_batches(10, seed=3, batch_size=4)
+    for (_, _, seed_a), (_, _, seed_b) in zip(batches, again):
+        assert seed_a.generate_state(4).tolist() == seed_b.generate_state(4).tolist()
+    assert (
+        batches[0][2].generate_state(4).tolist()
+        != batches[1][2].generate_state(4).tolist()
+    )
+
+
+def test_generate_map_topologies_workers(tmp_path):
+    settings = {"map_width": 12, "map_height": 8}
+
+    serial = tmp_path / "serial"
+    pooled = tmp_path / "pooled"
+    generate_map_topologies(5, settings, seed=11, path=str(serial))
+    generate_map_topologies(5, settings, seed=11, path=str(pooled), workers=2)
+
+    serial_library = MapLibrary(str(serial))
+    pooled_library = MapLibrary(str(pooled))
+    assert len(serial_library) == len(pooled_library) == 5
+    assert np.array_equal(serial_library.maps, pooled_library.maps)
+
+
+def test_map_library(tmp_path):
+    settings = {"map_width": 12, "map_height": 8, "water_budget_per_agent": 0.2}
+    generate_map_topologies(3, settings, seed=4, path=str(tmp_path))
+
+    library = MapLibrary(str(tmp_path))
+    assert len(library) == 3
+    assert library.maps.shape == (3, 8, 12, 2)
+    assert isinstance(library.maps, np.memmap)
+    assert library.get_settings(2)["water_percentage"] == 0.2
+
+    # same maps as generating them directly
+    expected = create_topologies(
+        3,
+        12,
+        8,
+        0.2,
+        0.1,
+        0.1,
+        rng=np.random.default_rng(generation_batches(3, 4)[0][2]),
+    )
+    assert np.array_equal(library.maps, expected)
+
+    # maps are views on the file, the Map copies them
+    assert np.shares_memory(library[1], library.maps)
+    test_map = topology_to_map(library[1])
+    assert test_map.width == 12 and test_map.height == 8
+    assert np.array_equal(test_map.landtype_map, library[1][:, :, 0].T)
+
+    with pytest.raises(IndexError):
+        library[3]
+
+
+def test_map_pool():
+    settings = {"map_width": 12, "map_height": 8}
+    pool = MapPool(settings, size=2, seed=5)
+    try:
+        topologies = [pool.get() for _ in range(4)]
+    finally:
+        pool.close()
+
+    assert all(topology.shape == (8, 12, 2) for topology in topologies)
+    # fresh only, every map is a different one
+    assert not np.array_equal(topologies[0], topologies[1])
+    assert pool.recycled == 0
+    assert pool.hits + pool.misses == 4
+
+    # same seed, same maps
+    pool = MapPool(settings, size=2, seed=5)
+    try:
+        assert np.array_equal(pool.get(), topologies[0])
+    finally:
+        pool.close()
+
+
+def test_map_pool_recycles():
+    pool = MapPool({"map_width": 12, "map_height": 8}, size=1, max_uses=3, seed=5)
+    while pool.generated < 1:
+        time.sleep(0.01)
+    pool.close()
+    # refill stopped with one map in the pool, it is handed out three times
+    first = pool.get()
+    assert pool.hits == 1
+    assert np.array_equal(pool.get(), first)
+    assert np.array_equal(pool.get(), first)
+    assert pool.recycled == 2
+
+    with pytest.raises(RuntimeError):
+        pool.get()
+    assert pool.misses == 1
+
+    with pytest.raises(ValueError):
+        MapPool({}, size=0)
+
+
+def test_get_observation(map_instance):
+    map_instance, mock_city_params = map_instance
+    map_instance.ownership_map[1, 2] = 3
+    map_instance.unit_strength_map[4, 0] = 70
+
+    features = ["tile_ownership", "land_type", "unit_strength"]
+    observation = map_instance.get_observation(features)
+    assert observation.shape == (map_instance.width, map_instance.height, 3)
+    assert observation.dtype == np.float32
+    assert np.array_equal(observation[:, :, 0], map_instance.ownership_map)
+    assert np.array_equal(observation[:, :, 1], map_instance.landtype_map)
+    assert observation[4, 0, 2] == 70
+
+    # filled in place
+    out = np.zeros_like(observation)
+    assert map_instance.get_observation(features, out=out) is out
+    assert np.array_equal(out, observation)
+
+
+def test_get_observation_compact(map_instance):
+    map_instance, mock_city_params = map_instance
+    map_instance.unit_strength_map[4, 0] = 300
+
+    observation = map_instance.get_observation(
+        ["tile_ownership", "unit_strength"], compact=True
+    )
+    assert observation["tile_ownership"].dtype == np.int8
+    assert observation["unit_strength"].dtype == np.uint16
+    assert np.array_equal(observation["tile_ownership"], map_instance.ownership_map)
+    assert observation["unit_strength"][4, 0] == 300
+
+
+def test_get_packed_visibility(map_instance):
+    map_instance, mock_city_params = map_instance
+    map_instance.set_visible(MapPosition(1, 2), 0)
+    map_instance.set_visible(MapPosition(3, 9), 2)
+
+    packed = map_instance.get_packed_visibility(3)
+    assert packed.shape == (3, map_instance.width, (map_instance.height + 7) // 8)
+    visible = np.unpackbits(packed, axis=-1, count=map_instance.height).astype(bool)
+    for agent_id in range(3):
+        expected = (map_instance.visibility_map >> agent_id) & 1 == 1
+        assert np.array_equal(visible[agent_id], expected)
+    assert visible[0, 1, 2] and visible[2, 3, 9] and not visible[1].any()
+
+
+def test_get_visibility_planes(map_instance):
+    map_instance, mock_city_params = map_instance
+    map_instance.set_visible(MapPosition(1, 2), 0)
+    map_instance.set_visible(MapPosition(1, 2), 9)
+    map_instance.set_visible(MapPosition(3, 9), 2)
+
+    visible = map_instance.get_visibility_planes(10)
+    assert visible.shape == (10, map_instance.width, map_instance.height)
+    for agent_id in range(10):
+        expected = (map_instance.visibility_map >> agent_id) & 1 == 1
+        assert np.array_equal(visible[agent_id], expected)
+    assert visible[9, 1, 2] and visible[2, 3, 9] and not visible[1].any()
+
+
+def test_get_partial_observation(map_instance):
+    map_instance, mock_city_params = map_instance
+    map_instance.set_visible(MapPosition(1, 2), 0)
+    map_instance.ownership_map[1, 2] = 1
+    map_instance.ownership_map[3, 3] = 1
+    visible = map_instance.get_visibility_planes(2)
+
+    features = ["tile_ownership", "land_type"]
+    observation = map_instance.get_partial_observation(features, visible)
+    assert observation.shape == (2, map_instance.width, map_instance.height, 2)
+    # agent 0 sees its tile, hidden tiles hold the empty value
+    assert observation[0, 1, 2, 0] == 1
+    assert observation[0, 3, 3, 0] == OWNER_DEFAULT_TILE
+    assert observation[0, 1, 2, 1] == map_instance.landtype_map[1, 2]
+    assert (observation[1, :, :, 0] == OWNER_DEFAULT_TILE).all()
+    assert (observation[1, :, :, 1] == 0).all()
+
+    compact = map_instance.get_partial_observation(features, visible, compact=True)
+    assert compact["tile_ownership"].dtype == np.int8
+    assert np.array_equal(compact["tile_ownership"], observation[..., 0])
+
+
+def test_get_window_observation(map_instance):
+    map_instance, mock_city_params = map_instance
+    map_instance.ownership_map[1, 2] = 1
+    map_instance.set_visible(MapPosition(0, 0), 1)
+    centers = np.array([[1, 2], [0, 0]])
+
+    features = ["tile_ownership", "land_type"]
+    observation = map_instance.get_window_observation(features, centers, 3)
+    assert observation.shape == (2, 3, 3, 2)
+    assert observation[0, 1, 1, 0] == 1
+    assert np.array_equal(observation[0, :, :, 1], map_instance.landtype_map[0:3, 1:4])
+    # tiles outside the map hold the empty value
+    assert (observation[1, 0, :, 0] == OWNER_DEFAULT_TILE).all()
+    assert (observation[1, :, 0, 1] == 0).all()
+    assert observation[1, 1, 1, 1] == map_instance.landtype_map[0, 0]
+
+    # the padded buffer is reused and follows changes of the map
+    map_instance.ownership_map[1, 2] = 0
+    observation = map_instance.get_window_observation(features, centers, 3)
+    assert observation[0, 1, 1, 0] == 0
+
+    compact = map_instance.get_window_observation(features, centers, 3, compact=True)
+    assert compact["land_type"].dtype == np.uint8
+    assert np.array_equal(compact["land_type"], observation[..., 1])
+
+    masked = map_instance.get_window_observation(features, centers, 3, masked=True)
+    visible = map_instance.get_visibility_windows(centers, 3)
+    assert not visible[0].any()
+    assert visible[1, 1, 1]
+    assert visible.sum() == 1
+    assert (masked[0, :, :, 0] == OWNER_DEFAULT_TILE).all()
+    assert masked[1, 1, 1, 1] == map_instance.landtype_map[0, 0]
+
+
 def test_check_position_on_map(map_instance):
     map_instance, mock_city_params = map_instance
     # Valid positions
@@ -118,6 +479,37 @@ def test_check_position_on_map(map_instance):
     assert map_instance.check_position_on_map(MapPosition(5, 100)) is False
 
 
+def test_position(map_instance):
+    map_instance, mock_city_params = map_instance
+    position = map_instance.position(2, 3)
+    assert position == MapPosition(2, 3)
+    assert hash(position) == hash(MapPosition(2, 3))
+    assert len({position, MapPosition(2, 3)}) == 1
+    with pytest.raises(AttributeError):
+        position.x = 4
+
+    # positions on the map are interned
+    assert map_instance.position(2, 3) is position
+    assert map_instance.get_tile(position).position is position
+    assert map_instance.tile_position(map_instance.tile_index(position)) is position
+    assert map_instance.position(-1, 3) == MapPosition(-1, 3)
+
+
+def test_set_visible_area(map_instance):
+    map_instance, mock_city_params = map_instance
+    changed = map_instance.track_changes()
+    map_instance.set_visible_area(MapPosition(0, 1), 1, 3)
+
+    visible = (map_instance.visibility_map >> 3) & 1 == 1
+    assert visible.sum() == 6
+    assert visible[0:2, 0:3].all()
+    assert len(changed) == 6
+
+    changed.clear()
+    map_instance.set_visible_area(MapPosition(0, 1), 1, 3)
+    assert not changed
+
+
 def test_get_tile(map_instance):
     map_instance, mock_city_params = map_instance
     # Valid tile
@@ -215,6 +607,64 @@ def test_add_building(map_instance):
     assert tile.get_building() is None
 
 
+def test_track_changes(map_instance):
+    map_instance, mock_city_params = map_instance
+    changed = map_instance.track_changes()
+    position = MapPosition(2, 4)
+
+    map_instance.claim_tile(Agent(1, map_instance.env), position)
+    map_instance.add_building(City(1, position, mock_city_params), position)
+    map_instance.set_unit_strength(MapPosition(3, 1), 5)
+    assert changed == {
+        map_instance.tile_index(position),
+        map_instance.tile_index(MapPosition(3, 1)),
+    }
+
+    changed.clear()
+    map_instance.reset()
+    assert changed == {ALL_TILES_CHANGED}
+
+    map_instance.untrack_changes(changed)
+    changed.clear()
+    map_instance.unclaim_tile(position)
+    assert not changed
+
+
+def test_block_summary(map_instance):
+    map_instance, mock_city_params = map_instance
+    summary = BlockSummary(map_instance, 3, 2)
+    width, height = summary.shape
+    assert summary.shape == (-(-map_instance.width // 3), -(-map_instance.height // 3))
+    assert summary.tiles_per_block.sum() == map_instance.width * map_instance.height
+    assert np.array_equal(
+        summary.land_type_counts.sum(axis=-1), summary.tiles_per_block
+    )
+    assert not summary.owned_tiles.any()
+
+    position = MapPosition(map_instance.width - 1, map_instance.height - 1)
+    map_instance.claim_tile(Agent(1, map_instance.env), position)
+    map_instance.add_building(City(1, position, mock_city_params), position)
+    map_instance.set_unit_strength(position, 5)
+    summary.update()
+
+    assert summary.owned_tiles[width - 1, height - 1, 1] == 1
+    assert summary.owned_tiles.sum() == 1
+    city = BUILDING_IDS[BuildingType.CITY]
+    assert summary.building_counts[width - 1, height - 1, city] == 1
+    assert summary.unit_strength[width - 1, height - 1] == 5
+    share = summary.ownership_share()
+    assert share.shape == (2, width, height)
+    assert share[1, -1, -1] == 1 / summary.tiles_per_block[-1, -1]
+
+    # the incremental update matches a summary reduced from the whole map
+    fresh = BlockSummary(map_instance, 3, 2)
+    assert np.array_equal(summary.owned_tiles, fresh.owned_tiles)
+    assert np.array_equal(summary.building_counts, fresh.building_counts)
+    assert np.array_equal(summary.unit_strength, fresh.unit_strength)
+    summary.close()
+    fresh.close()
+
+
 # def test_tile_is_next_to_building(map_instance):
 #     position = MapPosition(3, 5)
 #     adjacent_position = MapPosition(4, 5)
@@ -496,3 +946,81 @@ def test_get_surrounding_tiles(map_instance):
         assert (
             tile_position in expected_positions1_no_diagonal
         ), f"Tile ({tile.position.x}, {tile.position.y}) not expected in edge position surroundings."
+
+
+def test_get_surrounding_tile_ids(map_instance):
+    map_instance, mock_city_params = map_instance
+    height = map_instance.height
+
+    tile_ids = map_instance.get_surrounding_tile_ids(MapPosition(0, 0), 1)
+    assert sorted(tile_ids.tolist()) == [1, height, height + 1]
+
+    tile_ids = map_instance.get_surrounding_tile_ids(MapPosition(2, 2), 2, False)
+    expected = [(0, 2), (1, 2), (3, 2), (4, 2), (2, 0), (2, 1), (2, 3), (2, 4)]
+    assert tile_ids.tolist() == [x * height + y for x, y in expected]
+
+    # positions off the map only get the neighbours on the map
+    tile_ids = map_instance.get_surrounding_tile_ids(MapPosition(-1, 0), 1)
+    assert sorted(tile_ids.tolist()) == [0, 1]
+
+    assert len(map_instance.get_surrounding_tile_ids(MapPosition(2, 2), 0)) == 0
+    assert [
+        tile.tile_id
+        for tile in map_instance.get_surrounding_tiles(MapPosition(3, 3), 3)
+    ] == map_instance.get_surrounding_tile_ids(MapPosition(3, 3), 3).tolist()
+
+
+def test_adjacency_counts(map_instance):
+    map_instance, mock_city_params = map_instance
+    city_id = BUILDING_IDS[BuildingType.CITY]
+    position = MapPosition(2, 2)
+    map_instance.add_building(City(1, position, mock_city_params), position)
+
+    # built from the building plane on first use
+    counts = map_instance.adjacency_counts(1, diagonal=False)
+    assert counts[city_id].sum() == 4
+    assert (
+        map_instance.count_buildings_nearby(MapPosition(2, 3), BuildingType.CITY) == 1
+    )
+    assert map_instance.count_buildings_nearby(position, BuildingType.CITY) == 0
+
+    # updated when buildings are added or removed
+    other = MapPosition(2, 4)
+    map_instance.add_building(City(1, other, mock_city_params), other)
+    assert counts[city_id, map_instance.tile_index(MapPosition(2, 3))] == 2
+    mask = map_instance.building_nearby_mask(BuildingType.CITY, 1, diagonal=False)
+    assert mask[2, 3] and mask[1, 2] and not mask[1, 3]
+
+    map_instance.get_tile(position).remove_building(BuildingType.CITY)
+    assert counts[city_id, map_instance.tile_index(MapPosition(2, 3))] == 1
+    assert counts[city_id].sum() == 4
+    next_to_city, tile = map_instance.tile_is_next_to_building_type(
+        MapPosition(2, 3), BuildingType.CITY, diagonal=False
+    )
+    assert next_to_city and tile.position == other
+
+    map_instance.reset()
+    assert not counts.any()
+
+
+def test_city_counts(map_instance):
+    map_instance, mock_city_params = map_instance
+    position = MapPosition(3, 3)
+    map_instance.add_building(City(1, position, mock_city_params), position)
+
+    counts = map_instance.city_counts(2)
+    assert counts.sum() == 25
+    assert map_instance.city_nearby(MapPosition(5, 1), 2)
+    assert not map_instance.city_nearby(MapPosition(6, 3), 2)
+    # the city itself does not block its own tile
+    assert not map_instance.city_nearby(position, 2)
+
+    corner = MapPosition(0, 0)
+    map_instance.add_building(City(1, corner, mock_city_params), corner)
+    assert counts[1, 1] == 2
+    mask = map_instance.city_site_mask(2)
+    assert not mask[2, 2] and mask[6, 6]
+
+    map_instance.get_tile(position).remove_building(BuildingType.CITY)
+    assert counts.sum() == 9
+    assert not map_instance.city_nearby(MapPosition(5, 1), 2)
@@ -1,3 +1,5 @@
+import subprocess
+import sys
 import time
 
 from strategyRLEnv.environment import MapEnvironment
@@ -98,5 +100,21 @@ def timing_test():
             )
 
 
+def import_timing_test(runs=5):
+    # import times in fresh interpreters, the renderer is the only module importing pygame
+    modules = {
+        "simulation": "strategyRLEnv.environment",
+        "with renderer": "strategyRLEnv.environment, strategyRLEnv.Renderer",
+    }
+    for name, module in modules.items():
+        times = []
+        for _ in range(runs):
+            t_0 = time.time()
+            subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+            times.append(time.time() - t_0)
+        print(f"Import {name}: {min(times):.3f}s (best of {runs})")
+
+
 if __name__ == "__main__":
+    import_timing_test()
     timing_test()